@@ -1,13 +1,10 @@
 import os
 from dotenv import load_dotenv
 from pymongo import MongoClient
-import cohere
+from DIYAgentRetry.utils import cohere_embed
 # Load environment variables from .env file
 load_dotenv()
 
-# Initialize the Cohere client
-co = cohere.Client(os.getenv('CO_API_KEY'))
-
 class AtlasClient:
     def __init__(self, atlas_uri, dbname):
         self.mongodb_client = MongoClient(atlas_uri)
@@ -53,15 +50,42 @@ class AtlasClient:
         ])
         return list(results)
 
+    # Chunk-level vector search: chunks carry their own text, so results are prompt-ready
+    # without loading the articles they come from
+    def vector_search_chunks(self, collection_name, index_name, attr_name, embedding_vector, limit=5):
+        collection = self.database[collection_name]
+        results = collection.aggregate([
+            {
+                '$vectorSearch': {
+                    "index": index_name,
+                    "path": attr_name,
+                    "queryVector": embedding_vector,
+                    "numCandidates": 50,
+                    "limit": limit,
+                }
+            },
+            {
+                "$project": {
+                '_id': 0,
+                'url': 1,
+                'title': 1,
+                'content_id': 1,         # Id of the full document in all_data_cohere
+                'chunk_index': 1,
+                'text': 1,               # Chunk text
+                'start_char': 1,         # Span of the chunk in the full document's content
+                'end_char': 1,
+                'search_score': {"$meta": "vectorSearchScore"}
+                }
+            }
+        ])
+        return list(results)
+
     def close_connection(self):
         self.mongodb_client.close()
 
 def _cohere_embed(texts, type='search_query'):
-    return co.embed(
-        model='embed-english-v3.0',
-        texts=texts,
-        input_type=type
-    ).embeddings
+    # Shares the rate limiter and embedding cache of the agent's query embeddings
+    return cohere_embed(texts, type=type)
 
 
 
@@ -1,7 +1,7 @@
 import os
 from dotenv import load_dotenv
 from pymongo import MongoClient
-import cohere
+from Scraper.Resources import cohere_client
 
 # Load environment variables from .env file
 load_dotenv()
@@ -15,7 +15,6 @@ from tavily import TavilyHybridClient
 
 # Ensure CO_API_KEY is set in the environment
 # os.environ['CO_API_PROD_KEY'] = cohere_api_key
-co = cohere.ClientV2(os.getenv('CO_API_KEY'))
 
 
 # Function to get the MongoDB client
@@ -29,7 +28,7 @@ def get_mongo_client(uri):
 #                 time.sleep(sleep_time)
 #                 return res.embeddings.float[0]
 def my_embedding_function(text:str,search_type) -> list[float]:
-    res = co.embed(texts=text, \
+    res = cohere_client().embed(texts=text, \
             model="embed-english-light-v3.0", \
             input_type=search_type, \
             embedding_types=["float"])
@@ -70,6 +69,7 @@ def hybrid_search_try(query):
 
 
 # Example usage
-hybrid_rag_try = hybrid_search_try("Variable Power Supply")
-for result in hybrid_rag_try:
-    print(result)
+if __name__ == "__main__":
+    hybrid_rag_try = hybrid_search_try("Variable Power Supply")
+    for result in hybrid_rag_try:
+        print(result)
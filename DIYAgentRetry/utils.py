@@ -1,27 +1,34 @@
-import cohere
 from dotenv import load_dotenv
-import os
+from typing import TYPE_CHECKING
 from pymongo import MongoClient
-from langchain_core.language_models import BaseChatModel
+from Embeddings.EmbeddingBackend import create_embedding_backend
+
+if TYPE_CHECKING:
+    from langchain_core.language_models import BaseChatModel
 
 # Load environment variables from .env file
 load_dotenv()
 
-# Initialize the Cohere client
-co = cohere.Client(os.getenv('CO_API_KEY'))
+# Query embeddings use the backend selected by EMBEDDING_BACKEND, with the process-wide quota and cache.
+# The backend and its Cohere client are created on the first query, not at import.
+_embedding_backend = None
+
+
 def cohere_embed(texts, type='search_query'):
-    return co.embed(
-        model='embed-english-v3.0',
-        texts=texts,
-        input_type=type
-    ).embeddings
+    global _embedding_backend
+    if _embedding_backend is None:
+        # No client is passed, so EMBEDDING_BACKEND=local runs without a Cohere client or CO_API_KEY
+        _embedding_backend = create_embedding_backend(
+            cohere_model='embed-english-v3.0', embedding_type=None, cohere_client_version=1
+        )
+    return _embedding_backend.embed_batch(texts, input_type=type)
 
 def get_mongo_client(uri):
     """Initialize and return a MongoDB client."""
     return MongoClient(uri)
 
 
-def load_chat_model(fully_specified_name: str) -> BaseChatModel:
+def load_chat_model(fully_specified_name: str) -> "BaseChatModel":
     """Load a chat model from a fully specified name.
 
     Args:
@@ -32,4 +39,6 @@ def load_chat_model(fully_specified_name: str) -> BaseChatModel:
     else:
         provider = ""
         model = fully_specified_name
+    from langchain.chat_models import init_chat_model
+
     return init_chat_model(model, model_provider=provider)
\ No newline at end of file
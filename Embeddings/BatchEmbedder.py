@@ -0,0 +1,204 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from Embeddings.RateLimiter import EmbeddingRateLimiter
+from Scraper.Metrics import REGISTRY, SIZE_BUCKETS
+
+# Cohere's embed endpoint accepts at most 96 texts per request
+COHERE_MAX_BATCH_SIZE = 96
+
+EMBEDDING_SECONDS = REGISTRY.histogram("embedding_request_seconds", "Duration of embedding API calls", ("status",))
+EMBEDDING_BATCH_SIZE = REGISTRY.histogram("embedding_batch_size", "Texts per embedding API call", buckets=SIZE_BUCKETS)
+EMBEDDING_RATE_LIMITED = REGISTRY.counter("embedding_rate_limited_total", "Embedding API calls answered with 429")
+
+
+def _status_code(error):
+    status_code = getattr(error, "status_code", None)
+    if status_code is None:
+        status_code = getattr(getattr(error, "response", None), "status_code", None)
+    return status_code
+
+
+def _retry_after(error):
+    headers = getattr(error, "headers", None) or getattr(getattr(error, "response", None), "headers", None) or {}
+    try:
+        return float(headers.get("retry-after") or headers.get("Retry-After"))
+    except (TypeError, ValueError):
+        return None
+
+
+def _run_sync(coroutine):
+    # asyncio.run cannot nest, so callers already inside an event loop get a private one on a helper thread
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coroutine)
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        return executor.submit(asyncio.run, coroutine).result()
+
+
+class BatchEmbedder:
+    def __init__(self, client, model="embed-english-light-v3.0", input_type="search_document", embedding_type="float",
+                 max_batch_size=COHERE_MAX_BATCH_SIZE, rate_limiter=None, max_concurrency=4, max_retries=5,
+                 cache=None, logger=None):
+        """
+        Embed many texts with as few Cohere requests as possible.
+
+        Texts are sent in requests of up to `max_batch_size` texts, with up to `max_concurrency`
+        requests in flight, and the embeddings are returned in the order of the texts, so
+        callers can collect everything a page (or a batch of pages) needs and map the results
+        back afterwards. Requests are paced by the rate limiter's requests/min and tokens/min
+        quota; 429 answers pause all requests and are retried up to `max_retries` times. With a
+        cache, only texts that were never embedded with the same model and types are sent.
+
+        :param client: Cohere client (or any client with the same `embed` signature).
+        :param model: Embedding model name.
+        :param input_type: Cohere input type, e.g. "search_document" or "search_query".
+        :param embedding_type: Embedding type to request and return, e.g. "float"; None uses the
+                               client's default response, where `embeddings` is the list itself.
+        :param max_batch_size: Maximum number of texts per request.
+        :param rate_limiter: EmbeddingRateLimiter to share the API quota with other embedders.
+        :param max_concurrency: Maximum number of requests in flight.
+        :param max_retries: Number of retries of a request answered with 429.
+        :param cache: EmbeddingCache to look embeddings up in before requesting them.
+        :param logger: Logger instance to log failed requests.
+        """
+        self.client = client
+        self.model = model
+        self.input_type = input_type
+        self.embedding_type = embedding_type
+        self.max_batch_size = max_batch_size
+        self.rate_limiter = rate_limiter or EmbeddingRateLimiter()
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.cache = cache
+        self.logger = logger
+        # Counters are shared by every thread (and event loop) embedding with this instance
+        self._lock = threading.Lock()
+        self.request_count = 0
+        self.text_count = 0
+
+    def _request(self, texts):
+        kwargs = {"embedding_types": [self.embedding_type]} if self.embedding_type else {}
+        EMBEDDING_BATCH_SIZE.observe(len(texts))
+        started = time.perf_counter()
+        try:
+            response = self.client.embed(texts=texts, model=self.model, input_type=self.input_type, **kwargs)
+        except Exception:
+            EMBEDDING_SECONDS.observe(time.perf_counter() - started, status="error")
+            raise
+        EMBEDDING_SECONDS.observe(time.perf_counter() - started, status="ok")
+        embeddings = getattr(response.embeddings, self.embedding_type) if self.embedding_type else response.embeddings
+        billed_units = getattr(getattr(response, "meta", None), "billed_units", None)
+        return list(embeddings), getattr(billed_units, "input_tokens", None)
+
+    async def _embed_batch_async(self, texts, semaphore):
+        loop = asyncio.get_running_loop()
+        attempt = 0
+        async with semaphore:
+            while True:
+                estimated_tokens = self.rate_limiter.estimate_tokens(texts)
+                delay = self.rate_limiter.reserve(estimated_tokens)
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                try:
+                    embeddings, tokens = await loop.run_in_executor(None, self._request, texts)
+                except Exception as e:
+                    if _status_code(e) != 429 or attempt >= self.max_retries:
+                        raise
+                    attempt += 1
+                    EMBEDDING_RATE_LIMITED.inc()
+                    pause = self.rate_limiter.record_rate_limited(_retry_after(e))
+                    if self.logger:
+                        self.logger.warning(f"Embedding request rate limited, retrying in {pause:.1f}s "
+                                            f"(attempt {attempt}/{self.max_retries})")
+                    continue
+                self.rate_limiter.record_success(tokens if tokens is not None else estimated_tokens, estimated_tokens)
+                with self._lock:
+                    self.request_count += 1
+                    self.text_count += len(texts)
+                return embeddings
+
+    async def _embed_uncached_async(self, texts, compute):
+        embeddings = [None] * len(texts)
+        if self.cache is not None:
+            embeddings = self.cache.get_many(self.model, self.input_type, self.embedding_type, texts)
+        missing = list(dict.fromkeys(text for text, embedding in zip(texts, embeddings) if embedding is None))
+        if not missing:
+            return embeddings
+        computed = await compute(missing)
+        if self.cache is not None:
+            self.cache.put_many(self.model, self.input_type, self.embedding_type, missing, computed)
+        computed = dict(zip(missing, computed))
+        return [computed[text] if embedding is None else embedding for text, embedding in zip(texts, embeddings)]
+
+    def _batches(self, texts):
+        return [texts[start:start + self.max_batch_size] for start in range(0, len(texts), self.max_batch_size)]
+
+    async def _embed_batches_async(self, texts):
+        # Any failed request fails the whole call
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        results = await asyncio.gather(*(self._embed_batch_async(batch, semaphore) for batch in self._batches(texts)))
+        return [embedding for result in results for embedding in result]
+
+    async def _embed_all_async(self, texts):
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        batches = self._batches(texts)
+        results = await asyncio.gather(*(self._embed_batch_async(batch, semaphore) for batch in batches),
+                                       return_exceptions=True)
+        embeddings = []
+        for batch, result in zip(batches, results):
+            if isinstance(result, Exception):
+                if self.logger:
+                    self.logger.error(f"Error generating embeddings for a batch of {len(batch)} texts: {result}")
+                result = [None] * len(batch)
+            embeddings.extend(result)
+        return embeddings
+
+    async def embed_async(self, texts):
+        """
+        Embed any number of texts, with up to `max_concurrency` batch requests in flight.
+
+        A failed request does not fail the others: its texts get None embeddings.
+
+        :param texts: List of texts.
+        :return: List of embeddings (or None), in the order of the texts.
+        """
+        return await self._embed_uncached_async(texts, self._embed_all_async)
+
+    def embed_batch(self, texts):
+        """
+        Embed texts with requests of up to `max_batch_size` texts each (retried on 429), failing as a whole.
+
+        :param texts: List of texts.
+        :return: List of embeddings, in the order of the texts.
+        :raises Exception: Whatever the client raises if a request fails.
+        """
+        return _run_sync(self._embed_uncached_async(texts, self._embed_batches_async))
+
+    def embed(self, texts):
+        """
+        Embed any number of texts from synchronous code; see `embed_async`.
+
+        :param texts: List of texts.
+        :return: List of embeddings (or None), in the order of the texts.
+        """
+        return _run_sync(self.embed_async(texts)) if texts else []
+
+    def stats(self):
+        """
+        Return the number of requests sent and texts embedded, the throughput against the quota and the
+        cache hit rates.
+
+        :return: Dictionary of embedder statistics.
+        """
+        with self._lock:
+            request_count, text_count = self.request_count, self.text_count
+        return {
+            "requests": request_count,
+            "texts": text_count,
+            "texts_per_request": round(text_count / request_count, 2) if request_count else None,
+            "quota": self.rate_limiter.stats(),
+            "cache": self.cache.stats() if self.cache is not None else None,
+        }
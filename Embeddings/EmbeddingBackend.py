@@ -0,0 +1,268 @@
+import importlib.util
+import os
+import threading
+import time
+from Embeddings.BatchEmbedder import BatchEmbedder
+from Embeddings.EmbeddingCache import shared_embedding_cache
+from Embeddings.RateLimiter import shared_rate_limiter
+from Scraper.Metrics import REGISTRY, SIZE_BUCKETS
+from Scraper.Resources import cohere_client
+
+BACKENDS = ("cohere", "local")
+DEFAULT_BACKEND = "cohere"
+DEFAULT_LOCAL_MODEL = "BAAI/bge-large-en-v1.5"
+DEFAULT_LOCAL_BATCH_SIZE = 32
+# BGE models expect this prefix on queries (but not on documents) for retrieval
+BGE_QUERY_INSTRUCTION = "Represent this sentence for searching relevant passages: "
+# Dynamic int8 quantisation config of the exported ONNX model; avx512_vnni covers current x86 servers
+ONNX_QUANTIZATION_CONFIG = "avx512_vnni"
+
+LOCAL_EMBEDDING_SECONDS = REGISTRY.histogram("local_embedding_batch_seconds", "Duration of local embedding batches")
+LOCAL_EMBEDDING_BATCH_SIZE = REGISTRY.histogram(
+    "local_embedding_batch_size", "Texts per local embedding batch", buckets=SIZE_BUCKETS
+)
+
+
+class CohereEmbeddingBackend:
+    name = "cohere"
+
+    def __init__(self, client, model="embed-english-light-v3.0", embedding_type="float", rate_limiter=None,
+                 cache=None, logger=None, client_version=2):
+        """
+        Embed texts with the Cohere API.
+
+        One BatchEmbedder per input type shares the rate limiter and cache, so documents and
+        queries draw from the same quota.
+
+        :param client: Cohere client; None uses the shared client, created on first request.
+        :param model: Embedding model name.
+        :param embedding_type: Embedding type to request, or None for the client's default response.
+        :param rate_limiter: EmbeddingRateLimiter for the API key.
+        :param cache: Optional EmbeddingCache.
+        :param logger: Logger instance to log failed requests.
+        :param client_version: Version of the shared client used when `client` is None (see Resources.cohere_client).
+        """
+        self.client = client
+        self.client_version = client_version
+        self.model = model
+        self.embedding_type = embedding_type
+        self.rate_limiter = rate_limiter
+        self.cache = cache
+        self.logger = logger
+        self._embedders = {}
+
+    def _embedder(self, input_type):
+        if input_type not in self._embedders:
+            if self.client is None:
+                self.client = cohere_client(version=self.client_version)
+            self._embedders[input_type] = BatchEmbedder(
+                self.client, model=self.model, input_type=input_type, embedding_type=self.embedding_type,
+                rate_limiter=self.rate_limiter, cache=self.cache, logger=self.logger
+            )
+        return self._embedders[input_type]
+
+    def embed(self, texts, input_type="search_document"):
+        """
+        Embed any number of texts; texts whose request failed get None.
+
+        :param texts: List of texts.
+        :param input_type: "search_document" for stored content, "search_query" for queries.
+        :return: List of embeddings (or None), in the order of the texts.
+        """
+        return self._embedder(input_type).embed(texts)
+
+    def embed_batch(self, texts, input_type="search_document"):
+        """
+        Embed a single batch of texts, raising if it fails.
+
+        :param texts: List of texts.
+        :param input_type: "search_document" for stored content, "search_query" for queries.
+        :return: List of embeddings, in the order of the texts.
+        """
+        return self._embedder(input_type).embed_batch(texts)
+
+    def stats(self):
+        """
+        Return the statistics of every input type's embedder.
+
+        :return: Dictionary of embedder statistics by input type.
+        """
+        return {input_type: embedder.stats() for input_type, embedder in self._embedders.items()}
+
+
+class LocalEmbeddingBackend:
+    name = "local"
+
+    def __init__(self, model_name=DEFAULT_LOCAL_MODEL, batch_size=DEFAULT_LOCAL_BATCH_SIZE, use_onnx=False,
+                 quantize=False, device="cpu", query_instruction=BGE_QUERY_INSTRUCTION, onnx_dir=None, cache=None,
+                 logger=None):
+        """
+        Embed texts on the local CPU with a sentence-transformers model (BGE by default).
+
+        Texts are encoded in batches of `batch_size` with normalised embeddings, so bulk
+        re-embedding runs at local throughput without API quotas, and the stack can run offline
+        once the model is in the Hugging Face cache. With `use_onnx` the model runs on ONNX Runtime;
+        with `quantize` it is dynamically quantised to int8 (an exported ONNX model when `use_onnx`
+        is set, torch dynamic quantisation otherwise). Vector indexes must be built with the same
+        model, since its dimension and space differ from Cohere's.
+
+        :param model_name: Hugging Face model name or local path.
+        :param batch_size: Texts per inference batch.
+        :param use_onnx: Whether to run the model with ONNX Runtime.
+        :param quantize: Whether to run an int8-quantised model.
+        :param device: Torch device.
+        :param query_instruction: Prefix added to queries (not documents), as BGE expects.
+        :param onnx_dir: Directory of the exported quantised ONNX model (defaults to a directory in the cache).
+        :param cache: Optional EmbeddingCache.
+        :param logger: Logger instance to log failed batches.
+        """
+        # sentence-transformers imports torch, so it is only imported by `_load`
+        if importlib.util.find_spec("sentence_transformers") is None:
+            raise ValueError("The local embedding backend requires the sentence-transformers package")
+
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self.use_onnx = use_onnx
+        self.quantize = quantize
+        self.query_instruction = query_instruction
+        self.cache = cache
+        self.logger = logger
+        # Cache entries are per model variant, since quantised vectors differ slightly
+        self.model = model_name + ("+int8" if quantize else "")
+        # Embedding stage threads share one model, and inference already uses every core
+        self._lock = threading.Lock()
+        self.encoder = self._load(device, onnx_dir)
+        self.batch_count = 0
+        self.text_count = 0
+        self.encode_seconds = 0.0
+
+    def _load(self, device, onnx_dir):
+        from sentence_transformers import SentenceTransformer
+
+        if self.use_onnx and self.quantize:
+            from sentence_transformers import export_dynamic_quantized_onnx_model
+
+            file_name = f"model_qint8_{ONNX_QUANTIZATION_CONFIG}.onnx"
+            onnx_dir = onnx_dir or os.path.join(
+                os.path.expanduser("~"), ".cache", "diy_llm_agent", self.model_name.replace("/", "--") + "-onnx"
+            )
+            if not os.path.exists(os.path.join(onnx_dir, "onnx", file_name)):
+                exported = SentenceTransformer(self.model_name, device=device, backend="onnx")
+                exported.save_pretrained(onnx_dir)
+                export_dynamic_quantized_onnx_model(exported, ONNX_QUANTIZATION_CONFIG, onnx_dir)
+            return SentenceTransformer(onnx_dir, device=device, backend="onnx",
+                                       model_kwargs={"file_name": os.path.join("onnx", file_name)})
+        if self.use_onnx:
+            return SentenceTransformer(self.model_name, device=device, backend="onnx")
+
+        encoder = SentenceTransformer(self.model_name, device=device)
+        if self.quantize:
+            import torch
+
+            encoder = torch.quantization.quantize_dynamic(encoder, {torch.nn.Linear}, dtype=torch.qint8)
+        return encoder
+
+    def _encode(self, texts):
+        LOCAL_EMBEDDING_BATCH_SIZE.observe(len(texts))
+        started = time.perf_counter()
+        with self._lock:
+            embeddings = self.encoder.encode(texts, batch_size=self.batch_size, normalize_embeddings=True,
+                                             convert_to_numpy=True)
+        elapsed = time.perf_counter() - started
+        LOCAL_EMBEDDING_SECONDS.observe(elapsed)
+        self.batch_count += 1
+        self.text_count += len(texts)
+        self.encode_seconds += elapsed
+        return embeddings.tolist()
+
+    def embed_batch(self, texts, input_type="search_document"):
+        """
+        Embed a batch of texts, raising if inference fails.
+
+        :param texts: List of texts.
+        :param input_type: "search_document" for stored content, "search_query" for queries.
+        :return: List of embeddings, in the order of the texts.
+        """
+        embeddings = [None] * len(texts)
+        if self.cache is not None:
+            embeddings = self.cache.get_many(self.model, input_type, "float", texts)
+        missing = list(dict.fromkeys(text for text, embedding in zip(texts, embeddings) if embedding is None))
+        if not missing:
+            return embeddings
+        prefix = self.query_instruction if input_type == "search_query" else ""
+        computed = self._encode([prefix + text for text in missing])
+        if self.cache is not None:
+            self.cache.put_many(self.model, input_type, "float", missing, computed)
+        computed = dict(zip(missing, computed))
+        return [computed[text] if embedding is None else embedding for text, embedding in zip(texts, embeddings)]
+
+    def embed(self, texts, input_type="search_document"):
+        """
+        Embed any number of texts; if inference fails, every text gets None.
+
+        :param texts: List of texts.
+        :param input_type: "search_document" for stored content, "search_query" for queries.
+        :return: List of embeddings (or None), in the order of the texts.
+        """
+        if not texts:
+            return []
+        try:
+            return self.embed_batch(texts, input_type)
+        except Exception as e:
+            if self.logger:
+                self.logger.error(f"Error generating local embeddings for {len(texts)} texts: {e}")
+            return [None] * len(texts)
+
+    def stats(self):
+        """
+        Return the number of batches and texts embedded, the throughput and the cache hit rates.
+
+        :return: Dictionary of embedder statistics.
+        """
+        return {
+            "model": self.model,
+            "batches": self.batch_count,
+            "texts": self.text_count,
+            "texts_per_second": round(self.text_count / self.encode_seconds, 1) if self.encode_seconds else None,
+            "cache": self.cache.stats() if self.cache is not None else None,
+        }
+
+
+def _env_flag(name):
+    return os.getenv(name, "").lower() in ("1", "true", "yes")
+
+
+def create_embedding_backend(cohere_client=None, cohere_model="embed-english-light-v3.0", embedding_type="float",
+                             backend=None, logger=None, cohere_client_version=2):
+    """
+    Create the embedding backend selected by configuration.
+
+    EMBEDDING_BACKEND chooses "cohere" (the default) or "local". The local backend reads
+    LOCAL_EMBEDDING_MODEL, LOCAL_EMBEDDING_BATCH_SIZE, LOCAL_EMBEDDING_ONNX and LOCAL_EMBEDDING_INT8.
+    Both backends use the process-wide embedding cache; the Cohere one also uses the shared rate limiter.
+
+    :param cohere_client: Cohere client for the Cohere backend; None uses the shared client.
+    :param cohere_model: Cohere embedding model name.
+    :param embedding_type: Cohere embedding type, or None for the client's default response.
+    :param backend: Backend name overriding EMBEDDING_BACKEND.
+    :param logger: Logger instance passed to the backend.
+    :param cohere_client_version: Version of the shared Cohere client, created on the first request if
+                                  `cohere_client` is None (never with the local backend).
+    :return: A CohereEmbeddingBackend or LocalEmbeddingBackend.
+    """
+    backend = backend or os.getenv("EMBEDDING_BACKEND", DEFAULT_BACKEND)
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown embedding backend: {backend}")
+    if backend == "local":
+        return LocalEmbeddingBackend(
+            model_name=os.getenv("LOCAL_EMBEDDING_MODEL", DEFAULT_LOCAL_MODEL),
+            batch_size=int(os.getenv("LOCAL_EMBEDDING_BATCH_SIZE", DEFAULT_LOCAL_BATCH_SIZE)),
+            use_onnx=_env_flag("LOCAL_EMBEDDING_ONNX"),
+            quantize=_env_flag("LOCAL_EMBEDDING_INT8"),
+            cache=shared_embedding_cache(),
+            logger=logger,
+        )
+    return CohereEmbeddingBackend(
+        cohere_client, model=cohere_model, embedding_type=embedding_type, rate_limiter=shared_rate_limiter(),
+        cache=shared_embedding_cache(), logger=logger, client_version=cohere_client_version
+    )
@@ -0,0 +1,263 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from array import array
+from collections import OrderedDict
+from Scraper.Metrics import REGISTRY
+
+# Anchored to the project directory, so every entry point shares one cache whatever its working directory
+DEFAULT_CACHE_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "embedding_cache", "embeddings.db"
+)
+DEFAULT_MAX_BYTES = 1024 * 1024 * 1024
+DEFAULT_MEMORY_ENTRIES = 10000
+# Eviction removes the least recently used entries until the cache is back under this share of its limit
+EVICTION_TARGET = 0.9
+# Processes sharing the cache file wait this long for each other's writes
+BUSY_TIMEOUT_SECONDS = 60
+
+EMBEDDING_CACHE_LOOKUPS = REGISTRY.counter("embedding_cache_lookups_total", "Embedding cache lookups", ("result",))
+
+
+def text_hash(text):
+    """
+    Return the content address of a text.
+
+    :param text: Text to embed.
+    :return: Hex SHA-256 digest of the UTF-8 encoded text.
+    """
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def _encode(embedding):
+    # Integer embedding types (int8, binary, ...) keep their integers; everything else is stored as float64
+    typecode = "q" if all(isinstance(value, int) for value in embedding) else "d"
+    return typecode, array(typecode, embedding).tobytes()
+
+
+def _decode(typecode, blob):
+    return array(typecode, blob).tolist()
+
+
+class EmbeddingCache:
+    def __init__(self, db_path=DEFAULT_CACHE_PATH, max_bytes=DEFAULT_MAX_BYTES, memory_entries=DEFAULT_MEMORY_ENTRIES):
+        """
+        Initialize a persistent, content-addressed embedding cache.
+
+        Embeddings are keyed by (model, input_type, embedding_type, sha256(text)), so the same chunk,
+        summary or query is only embedded once, whichever crawl, recrawl or agent run asks for it.
+        They are stored in SQLite behind an in-memory LRU of the most recently used entries. When
+        the stored vectors exceed `max_bytes`, the least recently used ones are evicted. The size
+        is re-read inside every write transaction, so processes sharing the file respect the limit together.
+
+        :param db_path: Path of the SQLite database file.
+        :param max_bytes: Upper bound of the stored vector bytes.
+        :param memory_entries: Number of embeddings kept in memory.
+        """
+        directory = os.path.dirname(db_path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+
+        self.db_path = db_path
+        self.max_bytes = max_bytes
+        self.memory_entries = memory_entries
+        # The cache is shared by embedding threads, so access is serialized
+        self._lock = threading.Lock()
+        self._memory = OrderedDict()
+        self.connection = sqlite3.connect(db_path, timeout=BUSY_TIMEOUT_SECONDS, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.executescript("""
+            CREATE TABLE IF NOT EXISTS embeddings (
+                model TEXT NOT NULL,
+                input_type TEXT NOT NULL,
+                embedding_type TEXT NOT NULL,
+                text_hash TEXT NOT NULL,
+                typecode TEXT NOT NULL,
+                vector BLOB NOT NULL,
+                size INTEGER NOT NULL,
+                last_used REAL NOT NULL,
+                PRIMARY KEY (model, input_type, embedding_type, text_hash)
+            );
+            CREATE INDEX IF NOT EXISTS embeddings_last_used ON embeddings (last_used);
+        """)
+        self.connection.commit()
+        self.total_bytes = self.connection.execute("SELECT COALESCE(SUM(size), 0) FROM embeddings").fetchone()[0]
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evicted = 0
+
+    def _remember(self, key, embedding):
+        self._memory[key] = embedding
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def get_many(self, model, input_type, embedding_type, texts):
+        """
+        Look up the embeddings of a batch of texts.
+
+        :param model: Embedding model name.
+        :param input_type: Input type the embeddings were made for.
+        :param embedding_type: Embedding type, or None for the provider's default.
+        :param texts: List of texts.
+        :return: List of embeddings, with None for every text that is not cached.
+        """
+        namespace = (model, input_type, embedding_type or "")
+        keys = [namespace + (text_hash(text),) for text in texts]
+        results = [None] * len(texts)
+        memory_hits = disk_hits = 0
+        with self._lock:
+            missing = {}
+            for index, key in enumerate(keys):
+                if key in self._memory:
+                    self._memory.move_to_end(key)
+                    results[index] = self._memory[key]
+                    memory_hits += 1
+                else:
+                    missing.setdefault(key[3], []).append(index)
+
+            found = []
+            hashes = list(missing)
+            # Stay well below SQLite's limit on query parameters
+            for start in range(0, len(hashes), 500):
+                chunk = hashes[start:start + 500]
+                rows = self.connection.execute(
+                    "SELECT text_hash, typecode, vector FROM embeddings "
+                    "WHERE model = ? AND input_type = ? AND embedding_type = ? "
+                    f"AND text_hash IN ({','.join('?' * len(chunk))})",
+                    namespace + tuple(chunk)
+                ).fetchall()
+                for digest, typecode, blob in rows:
+                    embedding = _decode(typecode, blob)
+                    self._remember(namespace + (digest,), embedding)
+                    for index in missing[digest]:
+                        results[index] = embedding
+                    disk_hits += len(missing[digest])
+                    found.append(digest)
+            if found:
+                now = time.time()
+                with self.connection:
+                    self.connection.executemany(
+                        "UPDATE embeddings SET last_used = ? "
+                        "WHERE model = ? AND input_type = ? AND embedding_type = ? AND text_hash = ?",
+                        [(now,) + namespace + (digest,) for digest in found]
+                    )
+            misses = len(texts) - memory_hits - disk_hits
+            self.memory_hits += memory_hits
+            self.disk_hits += disk_hits
+            self.misses += misses
+
+        EMBEDDING_CACHE_LOOKUPS.inc(memory_hits, result="memory")
+        EMBEDDING_CACHE_LOOKUPS.inc(disk_hits, result="disk")
+        EMBEDDING_CACHE_LOOKUPS.inc(misses, result="miss")
+        return results
+
+    def put_many(self, model, input_type, embedding_type, texts, embeddings):
+        """
+        Store the embeddings of a batch of texts, evicting old entries when the cache is full.
+
+        :param model: Embedding model name.
+        :param input_type: Input type the embeddings were made for.
+        :param embedding_type: Embedding type, or None for the provider's default.
+        :param texts: List of texts.
+        :param embeddings: List of embeddings in the order of the texts; None entries are skipped.
+        """
+        namespace = (model, input_type, embedding_type or "")
+        now = time.time()
+        rows = {}
+        for text, embedding in zip(texts, embeddings):
+            if embedding is not None:
+                typecode, blob = _encode(embedding)
+                rows[text_hash(text)] = (typecode, blob, list(embedding))
+        if not rows:
+            return
+        with self._lock:
+            with self.connection:
+                # Take the write lock up front, so the size read below includes other processes' writes
+                self.connection.execute("BEGIN IMMEDIATE")
+                for digest, (typecode, blob, embedding) in rows.items():
+                    self.connection.execute(
+                        "INSERT OR REPLACE INTO embeddings "
+                        "(model, input_type, embedding_type, text_hash, typecode, vector, size, last_used) "
+                        "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                        namespace + (digest, typecode, blob, len(blob), now)
+                    )
+                    self._remember(namespace + (digest,), embedding)
+                self.total_bytes = self.connection.execute(
+                    "SELECT COALESCE(SUM(size), 0) FROM embeddings"
+                ).fetchone()[0]
+                if self.total_bytes > self.max_bytes:
+                    self._evict()
+
+    def _evict(self):
+        target = self.max_bytes * EVICTION_TARGET
+        rows = self.connection.execute(
+            "SELECT model, input_type, embedding_type, text_hash, size FROM embeddings ORDER BY last_used"
+        )
+        evicted = []
+        for model, input_type, embedding_type, digest, size in rows:
+            if self.total_bytes <= target:
+                break
+            evicted.append((model, input_type, embedding_type, digest))
+            self.total_bytes -= size
+        self.connection.executemany(
+            "DELETE FROM embeddings WHERE model = ? AND input_type = ? AND embedding_type = ? AND text_hash = ?",
+            evicted
+        )
+        for key in evicted:
+            self._memory.pop(key, None)
+        self.evicted += len(evicted)
+
+    def stats(self):
+        """
+        Return the cache hit rates and size.
+
+        :return: Dictionary of cache statistics.
+        """
+        with self._lock:
+            lookups = self.memory_hits + self.disk_hits + self.misses
+            return {
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": round((self.memory_hits + self.disk_hits) / lookups, 3) if lookups else None,
+                "memory_entries": len(self._memory),
+                "bytes": self.total_bytes,
+                "evicted": self.evicted,
+            }
+
+    def close(self):
+        """
+        Close the database connection.
+        """
+        with self._lock:
+            self.connection.close()
+
+
+_shared_cache = None
+_shared_cache_lock = threading.Lock()
+
+
+def shared_embedding_cache():
+    """
+    Return the process-wide embedding cache, configured from the environment.
+
+    EMBEDDING_CACHE_PATH sets the database file (an empty value disables the cache) and
+    EMBEDDING_CACHE_MAX_MB its size limit.
+
+    :return: The shared EmbeddingCache, or None if caching is disabled.
+    """
+    global _shared_cache
+    with _shared_cache_lock:
+        db_path = os.getenv("EMBEDDING_CACHE_PATH", DEFAULT_CACHE_PATH)
+        if _shared_cache is None and db_path:
+            max_mb = os.getenv("EMBEDDING_CACHE_MAX_MB")
+            _shared_cache = EmbeddingCache(
+                db_path, max_bytes=int(float(max_mb) * 1024 * 1024) if max_mb else DEFAULT_MAX_BYTES
+            )
+        return _shared_cache
@@ -0,0 +1,148 @@
+import os
+import threading
+import time
+from Scraper.TokenBucket import TokenBucket
+
+DEFAULT_REQUESTS_PER_MINUTE = 1000
+# Rough token estimate used to reserve the token quota before the provider reports the real count
+CHARS_PER_TOKEN = 4
+
+
+class EmbeddingRateLimiter:
+    def __init__(self, requests_per_minute=DEFAULT_REQUESTS_PER_MINUTE, tokens_per_minute=None, burst_seconds=1.0,
+                 initial_backoff=1.0, max_backoff=60.0):
+        """
+        Pace embedding requests to a requests/min and tokens/min quota.
+
+        Two token buckets (one counting requests, one counting input tokens) decide when the
+        next request may start, so concurrent batches use the whole quota without bursting
+        past it. When the provider still answers 429, every caller pauses for the Retry-After
+        delay or an exponential backoff that grows with consecutive 429s and resets on success.
+
+        :param requests_per_minute: Request quota.
+        :param tokens_per_minute: Optional input-token quota.
+        :param burst_seconds: How many seconds of quota may be spent in a single burst.
+        :param initial_backoff: First backoff after a 429 without Retry-After, in seconds.
+        :param max_backoff: Upper bound of a single backoff, in seconds.
+        """
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.request_bucket = TokenBucket(
+            requests_per_minute / 60, capacity=max(1.0, requests_per_minute / 60 * burst_seconds)
+        )
+        self.token_bucket = TokenBucket(
+            tokens_per_minute / 60, capacity=max(1.0, tokens_per_minute / 60 * burst_seconds)
+        ) if tokens_per_minute else None
+        self.initial_backoff = initial_backoff
+        self.max_backoff = max_backoff
+
+        self._lock = threading.Lock()
+        self._backoff = 0.0
+        self._paused_until = 0.0
+        self._started_at = time.monotonic()
+        self.request_count = 0
+        self.token_count = 0
+        self.rate_limited_count = 0
+        self.waited_seconds = 0.0
+
+    @staticmethod
+    def estimate_tokens(texts):
+        """
+        Estimate the number of input tokens of a batch of texts.
+
+        :param texts: List of texts.
+        :return: Estimated token count.
+        """
+        return sum(max(1, len(text) // CHARS_PER_TOKEN) for text in texts)
+
+    def reserve(self, tokens):
+        """
+        Reserve one request and `tokens` input tokens, and return how long to wait before sending.
+
+        :param tokens: Estimated input tokens of the request.
+        :return: Delay in seconds.
+        """
+        delay = self.request_bucket.reserve(1)
+        if self.token_bucket:
+            delay = max(delay, self.token_bucket.reserve(tokens))
+        with self._lock:
+            delay = max(delay, self._paused_until - time.monotonic())
+            self.waited_seconds += delay
+        return delay
+
+    def record_success(self, tokens, estimated_tokens=None):
+        """
+        Record a successful request and correct the token reservation with the real count.
+
+        :param tokens: Input tokens billed for the request.
+        :param estimated_tokens: Tokens reserved for it, if different.
+        """
+        if self.token_bucket and estimated_tokens is not None:
+            if tokens > estimated_tokens:
+                self.token_bucket.reserve(tokens - estimated_tokens)
+            elif tokens < estimated_tokens:
+                self.token_bucket.refund(estimated_tokens - tokens)
+        with self._lock:
+            self.request_count += 1
+            self.token_count += tokens
+            self._backoff = 0.0
+
+    def record_rate_limited(self, retry_after=None):
+        """
+        Pause all requests after a 429 answer.
+
+        :param retry_after: Delay requested by the provider in seconds, if any.
+        :return: The pause in seconds.
+        """
+        with self._lock:
+            self.rate_limited_count += 1
+            self._backoff = min(self.max_backoff, self._backoff * 2 if self._backoff else self.initial_backoff)
+            delay = min(self.max_backoff, retry_after) if retry_after is not None else self._backoff
+            self._paused_until = max(self._paused_until, time.monotonic() + delay)
+            return delay
+
+    def stats(self):
+        """
+        Return the achieved throughput against the quota.
+
+        :return: Dictionary with requests and tokens per minute, quota utilisation and 429 counts.
+        """
+        with self._lock:
+            minutes = max((time.monotonic() - self._started_at) / 60, 1e-9)
+            requests_per_minute = self.request_count / minutes
+            tokens_per_minute = self.token_count / minutes
+            return {
+                "requests": self.request_count,
+                "tokens": self.token_count,
+                "requests_per_minute": round(requests_per_minute, 1),
+                "tokens_per_minute": round(tokens_per_minute, 1),
+                "request_quota_used": round(requests_per_minute / self.requests_per_minute, 3),
+                "token_quota_used": round(tokens_per_minute / self.tokens_per_minute, 3)
+                if self.tokens_per_minute else None,
+                "rate_limited": self.rate_limited_count,
+                "waited_seconds": round(self.waited_seconds, 2),
+            }
+
+
+_shared_limiter = None
+_shared_limiter_lock = threading.Lock()
+
+
+def shared_rate_limiter():
+    """
+    Return the process-wide limiter for the Cohere API key, configured from the environment.
+
+    COHERE_REQUESTS_PER_MINUTE and COHERE_TOKENS_PER_MINUTE set the quota; every embedder of
+    the process shares it, since the quota belongs to the key.
+
+    :return: The shared EmbeddingRateLimiter.
+    """
+    global _shared_limiter
+    with _shared_limiter_lock:
+        if _shared_limiter is None:
+            tokens_per_minute = os.getenv("COHERE_TOKENS_PER_MINUTE")
+            _shared_limiter = EmbeddingRateLimiter(
+                requests_per_minute=float(os.getenv("COHERE_REQUESTS_PER_MINUTE", DEFAULT_REQUESTS_PER_MINUTE)),
+                tokens_per_minute=float(tokens_per_minute) if tokens_per_minute else None,
+            )
+        return _shared_limiter
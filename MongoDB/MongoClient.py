@@ -1,5 +1,11 @@
 from pymongo import MongoClient
+from bson import ObjectId
 from datetime import datetime
+from Scraper.Metrics import REGISTRY
+
+MONGO_WRITE_SECONDS = REGISTRY.histogram("mongo_write_seconds", "Duration of MongoDB writes", ("operation",))
+MONGO_WRITE_ERRORS = REGISTRY.counter("mongo_write_errors_total", "Failed MongoDB writes", ("operation",))
+MONGO_READ_SECONDS = REGISTRY.histogram("mongo_read_seconds", "Duration of MongoDB reads", ("operation",))
 
 class MongoDBClient:
     def __init__(self, uri, logger=None):
@@ -15,6 +21,9 @@ class MongoDBClient:
         # Databases
         self.all_data_db = self.client["all_scraped_data"]
         self.chunks_db = self.client["chunks"]
+        # Chunk collections whose (content_id, chunk_index) index is known to exist
+        self._indexed_chunk_collections = set()
+        self._full_data_indexed = False
 
     def setup_default_logger(self):
         import logging
@@ -24,22 +33,62 @@ class MongoDBClient:
         logger.addHandler(handler)
         return logger
 
+    def full_data_collection(self):
+        """
+        Return the 'all_data_cohere' collection, creating its url index on first use.
+
+        :return: The pymongo collection.
+        """
+        collection = self.all_data_db["all_data_cohere"]
+        if not self._full_data_indexed:
+            collection.create_index("url")
+            self._full_data_indexed = True
+        return collection
+
     def save_full_data(self, data):
         """
         Save full scraped content to the 'all_data' collection in 'all_scraped_data' database.
 
+        A page is stored once per URL: storing it again (e.g. after it changed) replaces the
+        document in place, keeping its id, and deletes its old chunks so the caller can save
+        the new ones.
+
         :param data: The scraped content data (dictionary).
+        :return: The id of the stored document, or None if the write failed.
         """
         try:
-            collection = self.all_data_db["all_data_cohere"]
+            collection = self.full_data_collection()
             data["created_at"] = datetime.utcnow()  # Add timestamp
-            response = collection.insert_one(data)
-            data_id = response.inserted_id
+            with MONGO_WRITE_SECONDS.time(operation="save_full_data"):
+                existing = collection.find_one({"url": data.get("url")}, {"_id": 1, "category": 1})
+                if existing is None:
+                    data_id = collection.insert_one(data).inserted_id
+                else:
+                    data_id = existing["_id"]
+                    collection.replace_one({"_id": data_id}, data)
+                    if existing.get("category"):
+                        self.chunk_collection(existing["category"]).delete_many({"content_id": data_id})
             self.logger.info(f"Successfully saved full data for URL: {data.get('url')}")
             return data_id
         except Exception as e:
+            MONGO_WRITE_ERRORS.inc(operation="save_full_data")
             self.logger.error(f"Error saving full data: {e}")
 
+    def save_duplicate_reference(self, data, duplicate_of):
+        """
+        Save a near-duplicate page as a reference to the document it duplicates.
+
+        The reference has no content, summary or embeddings of its own; it is stored in the
+        'all_data' collection with a 'duplicate_of' field holding the original document's id.
+
+        :param data: The page metadata (dictionary).
+        :param duplicate_of: Id of the original document (ObjectId or its string form), if known.
+        """
+        if isinstance(duplicate_of, str) and ObjectId.is_valid(duplicate_of):
+            duplicate_of = ObjectId(duplicate_of)
+        data["duplicate_of"] = duplicate_of
+        return self.save_full_data(data)
+
     def save_chunk(self, chunk_data,content_id):
         """
         Save chunk data to a collection based on the category in the 'chunks' database.
@@ -52,11 +101,8 @@ class MongoDBClient:
             if not category:
                 raise ValueError("Category not found in chunk_data")
 
-            # Ensure category is a valid string for collection name
-            collection_name = category.replace(" ", "_").lower()  # e.g., "Machine Learning" -> "machine_learning"
-
             # Access the collection based on the category
-            collection = self.chunks_db[collection_name]
+            collection = self.chunk_collection(category)
 
             # Add the content_id to the chunk data
             chunk_data["content_id"] = content_id
@@ -65,11 +111,49 @@ class MongoDBClient:
             chunk_data["created_at"] = datetime.utcnow()
 
             # Insert the chunk data into the collection
-            collection.insert_one(chunk_data)
+            with MONGO_WRITE_SECONDS.time(operation="save_chunk"):
+                collection.insert_one(chunk_data)
             self.logger.info(f"Successfully saved chunk data for : {chunk_data.get('title')} Chunk  #{chunk_data.get('chunk_index')}, URL: {chunk_data.get('url')}")
         except Exception as e:
+            MONGO_WRITE_ERRORS.inc(operation="save_chunk")
             self.logger.error(f"Error saving chunk data for URL {chunk_data.get('url')}: {e}")
 
+    def chunk_collection(self, category):
+        """
+        Return the chunk collection of a category, creating its (content_id, chunk_index) index on first use.
+
+        :param category: Category name, e.g. "Machine Learning".
+        :return: The pymongo collection.
+        """
+        # Ensure category is a valid string for collection name
+        collection_name = category.replace(" ", "_").lower()  # e.g., "Machine Learning" -> "machine_learning"
+        collection = self.chunks_db[collection_name]
+        if collection_name not in self._indexed_chunk_collections:
+            collection.create_index([("content_id", 1), ("chunk_index", 1)])
+            self._indexed_chunk_collections.add(collection_name)
+        return collection
+
+    def get_chunk_texts(self, category, content_id, chunk_indexes=None):
+        """
+        Return the text of a document's chunks with a single indexed query, without loading the document.
+
+        Chunks carry their text and their character span in the document's content ("start_char",
+        "end_char"); chunks stored before spans were recorded have neither and come back without text.
+
+        :param category: Category of the document.
+        :param content_id: Id of the document (ObjectId or its string form).
+        :param chunk_indexes: Optional list of chunk indexes to return; all chunks by default.
+        :return: List of chunk dictionaries (url, title, chunk_index, text, start_char, end_char) in chunk order.
+        """
+        if isinstance(content_id, str) and ObjectId.is_valid(content_id):
+            content_id = ObjectId(content_id)
+        query = {"content_id": content_id}
+        if chunk_indexes is not None:
+            query["chunk_index"] = {"$in": list(chunk_indexes)}
+        projection = {"_id": 0, "url": 1, "title": 1, "chunk_index": 1, "text": 1, "start_char": 1, "end_char": 1}
+        with MONGO_READ_SECONDS.time(operation="get_chunk_texts"):
+            return list(self.chunk_collection(category).find(query, projection).sort("chunk_index", 1))
+
     def close(self):
         """
         Close the MongoDB connection.
@@ -0,0 +1,65 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+
+from Scraper.PolitenessScheduler import RETRY_LATER
+
+
+class AsyncFetcher:
+    def __init__(self, fetch_func, concurrency=16, per_host_concurrency=4, scheduler=None):
+        """
+        Run a blocking fetch function concurrently from asyncio, with a global and a per-host cap.
+
+        The fetch function is executed on a thread pool sized to the global cap, so at most
+        `concurrency` requests are in flight overall and at most `per_host_concurrency`
+        of them target the same host.
+
+        :param fetch_func: Callable taking a URL and returning the page content (or None on failure).
+        :param concurrency: Maximum number of fetches in flight across all hosts.
+        :param per_host_concurrency: Maximum number of fetches in flight for a single host.
+        :param scheduler: Optional PolitenessScheduler; fetches wait for their domain's rate before taking a slot.
+        """
+        self.fetch_func = fetch_func
+        self.scheduler = scheduler
+        self.concurrency = concurrency
+        self.per_host_concurrency = min(per_host_concurrency, concurrency)
+        self._executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="crawler-fetch")
+        # Semaphores are created lazily so they bind to the loop that is actually running
+        self._global_semaphore = None
+        self._host_semaphores = {}
+
+    def _host_semaphore(self, url):
+        host = urlparse(url).netloc.lower()
+        if host not in self._host_semaphores:
+            self._host_semaphores[host] = asyncio.Semaphore(self.per_host_concurrency)
+        return self._host_semaphores[host]
+
+    async def fetch(self, url):
+        """
+        Fetch a URL once both the global and the per-host slots are available.
+
+        :param url: URL to fetch.
+        :return: Whatever `fetch_func` returns for the URL, None if robots.txt disallows it,
+                 or RETRY_LATER if robots.txt is unreachable.
+        """
+        if self._global_semaphore is None:
+            self._global_semaphore = asyncio.Semaphore(self.concurrency)
+
+        loop = asyncio.get_running_loop()
+        if self.scheduler:
+            # Wait for the domain's rate without holding a fetch slot (robots.txt may be fetched here)
+            delay = await loop.run_in_executor(self._executor, self.scheduler.reserve, url)
+            if delay is None or delay is RETRY_LATER:
+                return delay
+            if delay:
+                await asyncio.sleep(delay)
+
+        async with self._host_semaphore(url):
+            async with self._global_semaphore:
+                return await loop.run_in_executor(self._executor, self.fetch_func, url)
+
+    def close(self):
+        """
+        Shut down the fetch thread pool.
+        """
+        self._executor.shutdown(wait=True)
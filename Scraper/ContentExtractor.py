@@ -1,5 +1,4 @@
 import requests
-from bs4 import BeautifulSoup
 import os
 import json
 import hashlib
@@ -9,6 +8,7 @@ import time
 import cohere
 from dotenv import load_dotenv
 import asyncio
+from Scraper.ParsedPage import ParsedPage
 # Load environment variables from .env file
 load_dotenv()
 
@@ -71,16 +71,16 @@ class ContentExtractor:
         else:
             return None  # If embeddings are disabled, return None
 
-    def extract_youtube_link(self, soup):
+    def extract_youtube_link(self, page):
         """
         Extract the YouTube link from an iframe if present in the HTML.
 
-        :param soup: BeautifulSoup object of the webpage content.
+        :param page: ParsedPage of the webpage content.
         :return: YouTube video link if present, else None.
         """
-        yt_iframe = soup.find("iframe")
-        if yt_iframe and 'src' in yt_iframe.attrs:
-            youtube_url = yt_iframe['src']
+        yt_iframe = page.find("iframe")
+        if yt_iframe is not None and yt_iframe.get('src'):
+            youtube_url = yt_iframe.get('src')
             if 'youtube' in youtube_url:
                 return youtube_url
         return None
@@ -123,34 +123,31 @@ class ContentExtractor:
             print(f"Error saving content from {url}: {e}")
             self.logger.warning(f"Error saving content from {url}: {e}")
 
-    def extract_content_from_html(self, url, html_content):
+    def extract_content_from_html(self, url, html_content, on_done=None):
         """
         Extract and process the content from the HTML content of a URL.
 
         :param url: URL of the webpage.
-        :param html_content: The fetched HTML content of the webpage.
+        :param html_content: The fetched HTML content of the webpage, or a ParsedPage sharing its parsed tree.
+        :param on_done: Optional callable invoked once the page was saved or failed.
         """
         try:
+            page = html_content if isinstance(html_content, ParsedPage) else ParsedPage(url, html_content)
+
+            # Read metadata first: trafilatura may prune the shared tree
+            category_text = page.find_text("a", "category") or "Uncategorized"
+            sub_category_text = page.find_text("a", "channel") or "General"
+            header_title_text = page.find_text("h1", "header-title") or "No Title Found"
+            youtube_url = self.extract_youtube_link(page)
+
             start_extraction = time.time()
-            content = trafilatura.extract(html_content)
+            content = trafilatura.extract(page.tree, url=url)
             end_extraction = time.time()
             print(f'Extracted time for {url}: {end_extraction - start_extraction}')
 
             # Conditionally generate the embedding if enabled
             embedding = self.generate_embedding(content) if self.use_embeddings else None
 
-            soup = BeautifulSoup(html_content, 'html.parser')
-
-            category = soup.find("a", {"class": "category"})
-            sub_category = soup.find("a", {"class": "channel"})
-            header_title = soup.find("h1", {"class": "header-title"})
-
-            category_text = category.text.strip() if category else "Uncategorized"
-            sub_category_text = sub_category.text.strip() if sub_category else "General"
-            header_title_text = header_title.text.strip() if header_title else "No Title Found"
-
-            youtube_url = self.extract_youtube_link(soup)
-
             data = {
                 "url": url,
                 "category": category_text,
@@ -170,6 +167,9 @@ class ContentExtractor:
 
         except Exception as e:
             self.logger.error(f"Error extracting html for {url}: {e}")
+        finally:
+            if on_done:
+                on_done()
 
 if __name__ == '__main__':
     extractor = ContentExtractor(use_embeddings=False, main_save_path=None,save_content=False)
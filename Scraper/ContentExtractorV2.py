@@ -1,30 +1,29 @@
 import requests
-from bs4 import BeautifulSoup
 import os
 import json
 import hashlib
-import trafilatura
-from langchain_community.embeddings import HuggingFaceBgeEmbeddings
 import time
-import cohere
 from dotenv import load_dotenv
 import asyncio
-from sumy.parsers.plaintext import PlaintextParser
-from sumy.nlp.tokenizers import Tokenizer
-from sumy.summarizers.lex_rank import LexRankSummarizer
-import nltk
+import bisect
 import uuid
-from transformers import GPT2TokenizerFast
-nltk.download('punkt_tab')
-nltk.download('punkt')
+from functools import cached_property
+from Scraper.NearDuplicateIndex import PENDING
+from Scraper.ParsedPage import ParsedPage
+from Scraper.Metrics import REGISTRY, SIZE_BUCKETS
+from Scraper.Resources import english_stop_words, gpt2_tokenizer, sentence_splitter
+from Embeddings.EmbeddingBackend import LocalEmbeddingBackend, create_embedding_backend
+from Embeddings.EmbeddingCache import shared_embedding_cache
 
 load_dotenv()
 
-# Initialize the Cohere client
-co = cohere.ClientV2(os.getenv('CO_API_KEY'))
+TRAFILATURA_SECONDS = REGISTRY.histogram("ingest_trafilatura_seconds", "Duration of trafilatura main-text extraction")
+LEXRANK_SECONDS = REGISTRY.histogram("ingest_lexrank_seconds", "Duration of LexRank summarisation")
+CHUNK_TOKENS = REGISTRY.histogram("ingest_chunk_tokens", "Tokens per content chunk", buckets=SIZE_BUCKETS)
 
 class ContentExtractor:
-    def __init__(self, mongo_client,save_content=True, main_save_path=None, logger=None, use_embeddings=True):
+    def __init__(self, mongo_client,save_content=True, main_save_path=None, logger=None, use_embeddings=True, recrawl_cache=None,
+                 near_duplicate_index=None):
         """
         Initialize the content extractor system.
 
@@ -32,23 +31,42 @@ class ContentExtractor:
         :param main_save_path: The main directory path where the content will be saved.
         :param logger: Logger instance for logging.
         :param use_embeddings: Whether to generate embeddings for the content (default is True).
+        :param recrawl_cache: Optional RecrawlCache used to skip pages whose extracted content did not change.
+        :param near_duplicate_index: Optional NearDuplicateIndex; near-duplicate pages are stored as references
+                                     to the page they duplicate instead of being summarised and embedded.
         """
+        self.recrawl_cache = recrawl_cache
+        self.near_duplicate_index = near_duplicate_index
         self.main_save_path = main_save_path
         self.save_content = save_content
         self.logger = logger
         self.use_embeddings = use_embeddings  # Flag to enable or disable embeddings
         self.mongo_client = mongo_client  # MongoDB client to store data
-        self.tokenizer = GPT2TokenizerFast.from_pretrained("gpt2")
-        if self.use_embeddings:
-            # model_name = "BAAI/bge-large-en-v1.5"
-            # model_kwargs = {'device': 'cpu'}
-            # encode_kwargs = {'normalize_embeddings': True}
-            # self.hf_embeddings = HuggingFaceBgeEmbeddings(
-            #     model_name=model_name,
-            #     model_kwargs=model_kwargs,
-            #     encode_kwargs=encode_kwargs
-            # )
-            self.cohere_api_embed = co
+        # Optional Cohere client override; the shared client is created on first use otherwise
+        self.cohere_api_embed = None
+        self.hf_embedder = None
+        # The tokenizer, sentence splitter, summarizer and embedder are loaded on first use (see the
+        # properties below), so worker processes and runs that never reach a stage do not pay for it
+
+    @property
+    def tokenizer(self):
+        return gpt2_tokenizer()
+
+    @property
+    def sentence_splitter(self):
+        # Punkt's span_tokenize gives the character span of every sentence
+        return sentence_splitter()
+
+    @cached_property
+    def summarizer(self):
+        from Scraper.FastLexRank import FastLexRankSummarizer
+
+        return FastLexRankSummarizer(stop_words=english_stop_words())
+
+    @cached_property
+    def embedder(self):
+        # EMBEDDING_BACKEND selects the Cohere API or a local BGE model
+        return create_embedding_backend(self.cohere_api_embed, logger=self.logger)
 
     def generate_summary_text_lexrank(self, text, url, sentence_count=5):
         """
@@ -63,17 +81,15 @@ class ContentExtractor:
         - str: The summarized text.
         """
         try:
-            # Parse the text using PlaintextParser and Tokenizer
-            parser = PlaintextParser.from_string(text, Tokenizer("english"))
-
-            # Initialize LexRank summarizer
-            summarizer = LexRankSummarizer()
+            # Split the text into sentences with the shared Punkt tokenizer
+            sentences = self.sentence_splitter.tokenize(text)
 
-            # Generate the summary
-            summary = summarizer(parser.document, sentence_count)
+            # Generate the summary with the shared vectorised LexRank summarizer
+            with LEXRANK_SECONDS.time():
+                summary = self.summarizer.summarize(sentences, sentence_count)
 
             # Combine the summary sentences into a single string
-            summary_text = " ".join([str(sentence) for sentence in summary])
+            summary_text = " ".join(summary)
 
             return summary_text
         except Exception as e:
@@ -82,14 +98,19 @@ class ContentExtractor:
 
     def generate_embedding_hf(self, text):
         """
-        Generate an embedding for the given text using the HuggingFace BGE model.
+        Generate an embedding for the given text using the HuggingFace BGE model on the local CPU.
+
+        The model is loaded on first use unless it is already the configured embedding backend.
 
         :param text: The content text to embed.
         :return: Embedding of the text.
         """
         if self.use_embeddings:
             try:
-                return self.hf_embeddings.embed_documents([text])[0]
+                if self.hf_embedder is None:
+                    self.hf_embedder = self.embedder if isinstance(self.embedder, LocalEmbeddingBackend) \
+                        else LocalEmbeddingBackend(cache=shared_embedding_cache(), logger=self.logger)
+                return self.hf_embedder.embed_batch([text])[0]
             except Exception as e:
                 self.logger.error(f"Error generating embeddings for {text}: {e}")
                 return None
@@ -98,26 +119,19 @@ class ContentExtractor:
 
     def generate_embedding_co(self, text,url, data_type=float, sleep_time=0.05, summary=False,chunk=False):
         """
-        Generate an embedding for the given text with a sleep delay to avoid exceeding API limits.
+        Generate an embedding for the given text, paced by the embedder's rate limiter to stay within API limits.
 
         Args:
         - text (str): The text to be embedded.
         - data_type (type): The data type for the embeddings (default: float).
-        - sleep_time (float): Time to sleep between API calls, in seconds (default: 0.6s to ensure < 100 calls per minute).
+        - sleep_time (float): Unused; requests are paced by `self.embedder.rate_limiter`.
 
         Returns:
         - embedding: The generated embedding or None if an error occurs.
         """
         if self.use_embeddings:
             try:
-                # Sleep to ensure we don't exceed API rate limits
-
-                res = self.cohere_api_embed.embed(texts=[text], \
-                                                  model="embed-english-light-v3.0", \
-                                                  input_type="search_document", \
-                                                  embedding_types=["float"])
-                time.sleep(sleep_time)
-                return res.embeddings.float[0]
+                return self.embedder.embed_batch([text])[0]
             except Exception as e:
                 # Log based on whether it's a summary or a chunk
                 if summary and chunk:
@@ -131,65 +145,93 @@ class ContentExtractor:
         else:
             return None  # If embeddings are disabled, return None
 
-    def chunk_content_and_generate_embeddings(self, url,category,sub_category ,title,content, max_tokens=512):
+    def chunk_content(self, url, category, sub_category, title, content, max_tokens=512):
         """
         Split content into chunks of max_tokens length, preserving sentence boundaries.
-        Generate embeddings for each chunk and return the embeddings and the start/end pointers.
 
-        Returns a list of chunk embeddings and their corresponding start and end token positions.
+        The whole content is tokenised in a single fast-tokenizer call with offset mappings, and
+        each sentence gets the tokens that start before its end. Returns a list of chunk infos with
+        their start/end token positions, their exact character span in the content ("start_char",
+        "end_char", so the chunk text is `content[start_char:end_char]`), their token count and the
+        chunk text under "text"; the embeddings are added separately by `embed_chunks`.
         """
-        sentences = nltk.sent_tokenize(content)
-        current_chunk = []
-        current_length = 0
-        start_token_pos = 0
-        chunk_index=1
+        encoding = self.tokenizer(content, add_special_tokens=False, return_offsets_mapping=True, verbose=False)
+        token_starts = [start for start, _ in encoding["offset_mapping"]]
         chunks_info = []
 
-        for idx,sentence in enumerate(sentences):
-            tokenized_sentence = self.tokenizer.tokenize(sentence)
-            sentence_length = len(tokenized_sentence)
+        def add_chunk(start_token_pos, end_token_pos, start_char, end_char):
+            CHUNK_TOKENS.observe(end_token_pos - start_token_pos)
+            chunks_info.append({
+                "url": url,
+                "category": category,
+                "sub_category": sub_category,
+                "title": title,
+                "start_pointer": start_token_pos,
+                "end_pointer": end_token_pos,
+                "start_char": start_char,
+                "end_char": end_char,
+                "token_count": end_token_pos - start_token_pos,
+                "chunk_index": len(chunks_info) + 1,
+                "text": content[start_char:end_char]
+            })
+
+        start_token_pos = end_token_pos = 0
+        start_char = end_char = None
+        for sentence_start, sentence_end in self.sentence_splitter.span_tokenize(content):
+            sentence_end_token = bisect.bisect_left(token_starts, sentence_end)
 
             # If adding the next sentence exceeds the max token limit, finalize the current chunk
-            if current_length + sentence_length > max_tokens:
-                chunk_text = " ".join(current_chunk)
-                embedding = self.generate_embedding_co(chunk_text, url,chunk=True)
-                chunks_info.append({
-                    "url": url,
-                    "category": category,
-                    "sub_category": sub_category,
-                    "title": title,
-                    "start_pointer": start_token_pos,
-                    "end_pointer": start_token_pos + current_length,
-                    "embedding": embedding,
-                    "chunk_index":chunk_index
-                })
-                # Reset for the next chunk
-                current_chunk = []
-                start_token_pos += current_length
-                current_length = 0
-                chunk_index+=1
-
-
-            current_chunk.append(sentence)
-            current_length += sentence_length
+            if start_char is not None and sentence_end_token - start_token_pos > max_tokens:
+                add_chunk(start_token_pos, end_token_pos, start_char, end_char)
+                start_token_pos = end_token_pos
+                start_char = None
+
+            if start_char is None:
+                start_char = sentence_start
+            end_char = sentence_end
+            end_token_pos = sentence_end_token
 
         # Add any remaining chunk
-        if current_chunk:
-            chunk_text = " ".join(current_chunk)
-            embedding = self.generate_embedding_co(chunk_text, url,chunk=True)
-            chunks_info.append({
-                "url": url,
-                    "category": category,
-                    "sub_category": sub_category,
-                    "title": title,
-                    "start_pointer": start_token_pos,
-                    "end_pointer": start_token_pos + current_length,
-                    "embedding": embedding,
-                    "chunk_index": chunk_index
-            })
+        if start_char is not None:
+            add_chunk(start_token_pos, end_token_pos, start_char, end_char)
 
         return chunks_info
 
+    def embed_texts(self, texts):
+        """
+        Embed many texts with batched requests.
+
+        :param texts: List of texts.
+        :return: List of embeddings (None where the request failed or embeddings are disabled).
+        """
+        if not self.use_embeddings:
+            return [None] * len(texts)
+        return self.embedder.embed(texts)
+
+    def embed_chunks(self, url, chunks_info):
+        """
+        Add the embedding of each chunk info's text.
+
+        The text is kept, so stored chunks are prompt-ready without loading the full document.
+
+        :param url: URL the chunks were extracted from.
+        :param chunks_info: Chunk infos returned by `chunk_content`.
+        :return: The same chunk infos, each with an "embedding".
+        """
+        embeddings = self.embed_texts([chunk["text"] for chunk in chunks_info])
+        for chunk, embedding in zip(chunks_info, embeddings):
+            chunk["embedding"] = embedding
+        return chunks_info
+
+    def chunk_content_and_generate_embeddings(self, url,category,sub_category ,title,content, max_tokens=512):
+        """
+        Split content into chunks of max_tokens length, preserving sentence boundaries.
+        Generate embeddings for each chunk and return the embeddings and the start/end pointers.
+
+        Returns a list of chunk embeddings and their corresponding start and end token positions.
+        """
+        return self.embed_chunks(url, self.chunk_content(url, category, sub_category, title, content, max_tokens))
+
     def save_chunk_as_json(self, chunk_data, category, sub_category):
         """
         Save each chunk as a JSON file under the category_chunk/sub-category folder.
@@ -238,16 +280,16 @@ class ContentExtractor:
             print(f"Error saving chunk from {chunk_data['url']}: {e}")
             self.logger.warning(f"Error saving chunk from {chunk_data['url']}: {e}")
 
-    def extract_youtube_link(self, soup):
+    def extract_youtube_link(self, page):
         """
         Extract the YouTube link from an iframe if present in the HTML.
 
-        :param soup: BeautifulSoup object of the webpage content.
+        :param page: ParsedPage of the webpage content.
         :return: YouTube video link if present, else None.
         """
-        yt_iframe = soup.find("iframe")
-        if yt_iframe and 'src' in yt_iframe.attrs:
-            youtube_url = yt_iframe['src']
+        yt_iframe = page.find("iframe")
+        if yt_iframe is not None and yt_iframe.get('src'):
+            youtube_url = yt_iframe.get('src')
             if 'youtube' in youtube_url:
                 return youtube_url
         return None
@@ -290,57 +332,218 @@ class ContentExtractor:
             print(f"Error saving content from {url}: {e}")
             self.logger.warning(f"Error saving content from {url}: {e}")
 
-    def extract_content_from_html(self, url, html_content):
+    def extract_document(self, url, html_content):
         """
-        Extract and process the content from the HTML content of a URL.
+        Parse a page and extract its metadata and main text (the parse/extract stage).
 
         :param url: URL of the webpage.
-        :param html_content: The fetched HTML content of the webpage.
+        :param html_content: The fetched HTML content of the webpage, or a ParsedPage sharing its parsed tree.
+        :return: Document dictionary with the page's metadata, main text and content hash.
         """
-        try:
-            start_extraction = time.time()
-            content = trafilatura.extract(html_content)
-            end_extraction = time.time()
-            # print(f'Extracted time for {url}: {end_extraction - start_extraction}')
+        page = html_content if isinstance(html_content, ParsedPage) else ParsedPage(url, html_content)
+
+        # Read metadata first: trafilatura may prune the shared tree
+        document = {
+            "url": url,
+            "category": page.find_text("a", "category") or "Uncategorized",
+            "sub_category": page.find_text("a", "channel") or "General",
+            "title": page.find_text("h1", "header-title") or "No Title Found",
+            "youtube_url": self.extract_youtube_link(page),
+        }
+
+        # Imported on first use, since importing trafilatura is slow
+        import trafilatura
+
+        tree = page.tree
+        start_extraction = time.time()
+        content = trafilatura.extract(tree, url=url)
+        end_extraction = time.time()
+        TRAFILATURA_SECONDS.observe(end_extraction - start_extraction)
+
+        document["content"] = content
+        document["content_hash"] = hashlib.sha256(content.encode('utf-8')).hexdigest() if content else None
+        return document
+
+    def deduplicate_document(self, document):
+        """
+        Drop documents whose content did not change since the last crawl, and store near-duplicates as references.
 
-            # Conditionally generate the embedding if enabled
-            soup = BeautifulSoup(html_content, 'html.parser')
+        A document that passes is reserved in the near-duplicate index right away, so
+        near-duplicates of it that are still in flight are detected before it is stored. They
+        are skipped rather than stored as references to a document that has no id yet, and
+        picked up by the next crawl.
 
-            category = soup.find("a", {"class": "category"})
-            sub_category = soup.find("a", {"class": "channel"})
-            header_title = soup.find("h1", {"class": "header-title"})
+        :param document: Document returned by `extract_document`.
+        :return: True if the document must be summarised, embedded and stored, False otherwise.
+        """
+        url = document["url"]
+        content_hash = document["content_hash"]
+
+        # Skip summarisation, embedding and storage if the main text did not change
+        if self.recrawl_cache and content_hash and self.recrawl_cache.is_content_unchanged(url, content_hash):
+            self.logger.info(f"Content unchanged since last crawl, skipping {url}")
+            # The stored document is current, which also commits the page's new validators
+            self.recrawl_cache.record_content_hash(url, content_hash)
+            return False
+
+        # Store near-duplicates as a reference before the expensive summary and embedding stages
+        document["fingerprint"] = None
+        if not (self.near_duplicate_index and document["content"]):
+            return True
+        fingerprint = self.near_duplicate_index.fingerprint(document["content"])
+        duplicate = self.near_duplicate_index.find_duplicate(fingerprint, exclude_url=url)
+        # Fingerprints persisted without a document id have nothing to refer to, so the page is stored in full
+        if duplicate is None or (duplicate[1] is None and self.save_content):
+            document["fingerprint"] = fingerprint
+            self.near_duplicate_index.reserve(url, fingerprint)
+            return True
+
+        duplicate_url, duplicate_id = duplicate
+        if duplicate_id is PENDING:
+            self.logger.info(f"Near-duplicate of {duplicate_url}, which is not stored yet, skipping {url}")
+            if self.recrawl_cache:
+                self.recrawl_cache.discard_pending(url)
+            return False
+        self.logger.info(f"Near-duplicate of {duplicate_url}, storing a reference for {url}")
+        data = {
+            "url": url,
+            "category": document["category"],
+            "sub_category": document["sub_category"],
+            "title": document["title"],
+            "youtube_url": document["youtube_url"],
+            "duplicate_of_url": duplicate_url
+        }
+        if self.save_content:
+            self.mongo_client.save_duplicate_reference(data, duplicate_id)
+        else:
+            print(f"--- Near-duplicate from {url} ---")
+            print(json.dumps(data, ensure_ascii=False, indent=4))
+        if self.recrawl_cache and content_hash:
+            self.recrawl_cache.record_content_hash(url, content_hash)
+        return False
 
-            category_text = category.text.strip() if category else "Uncategorized"
-            sub_category_text = sub_category.text.strip() if sub_category else "General"
-            header_title_text = header_title.text.strip() if header_title else "No Title Found"
+    def summarize_document(self, document):
+        """
+        Summarise a document with LexRank and split its content into chunks (the CPU-bound stage).
 
-            # content_embedding = self.generate_embedding_co(content, url) if self.use_embeddings else None
-            summary = self.generate_summary_text_lexrank(content, url)
-            summary_embedding = self.generate_embedding_co(summary, url, summary=True) if summary else None
-            chunks_data = self.chunk_content_and_generate_embeddings(url,category_text,sub_category_text ,header_title_text,content)
-            youtube_url = self.extract_youtube_link(soup)
+        :param document: Document that passed `deduplicate_document`.
+        :return: The document, with its "summary" and its chunk infos under "chunks".
+        """
+        document["summary"] = self.generate_summary_text_lexrank(document["content"], document["url"])
+        document["chunks"] = self.chunk_content(
+            document["url"], document["category"], document["sub_category"], document["title"], document["content"]
+        )
+        return document
 
-            data = {
-                "url": url,
-                "category": category_text,
-                "sub_category": sub_category_text,
-                "title": header_title_text,
-                "youtube_url": youtube_url,
-                "content": content,
-                # "content_embedding": content_embedding,  # Add embedding only if enabled,
-                "summary": summary,
-                "summary_embedding": summary_embedding
-
-            }
-
-            # For demonstration purposes, display the content
-            if self.save_content:
-                content_id = self.mongo_client.save_full_data(data)
-                for chunk in chunks_data:
-                    self.mongo_client.save_chunk(chunk,content_id)
-            else:
-                print(f"--- Content from {url} ---")
-                print(json.dumps(data, ensure_ascii=False, indent=4))
+    def embed_documents(self, documents):
+        """
+        Embed the summaries and chunks of several documents with as few requests as possible (the embedding stage).
+
+        :param documents: Documents returned by `summarize_document`.
+        :return: The documents, with their "summary_embedding" and embedded chunks.
+        """
+        # Collect every text first, then map the embeddings back in the same order
+        texts = []
+        for document in documents:
+            if document["summary"]:
+                texts.append(document["summary"])
+            texts.extend(chunk["text"] for chunk in document["chunks"])
+        embeddings = iter(self.embed_texts(texts))
+
+        for document in documents:
+            document["summary_embedding"] = next(embeddings) if document["summary"] else None
+            for chunk in document["chunks"]:
+                chunk["embedding"] = next(embeddings)
+        return documents
+
+    def embed_document(self, document):
+        """
+        Embed a document's summary and all its chunks, in one request for most pages.
+
+        :param document: Document returned by `summarize_document`.
+        :return: The document, with its "summary_embedding" and embedded chunks.
+        """
+        return self.embed_documents([document])[0]
+
+    def store_document(self, document):
+        """
+        Store a document and its chunks, and record it for near-duplicate and recrawl checks (the store stage).
+
+        :param document: Document returned by `embed_document`.
+        :return: The id of the stored document, if any.
+        """
+        url = document["url"]
+        data = {
+            "url": url,
+            "category": document["category"],
+            "sub_category": document["sub_category"],
+            "title": document["title"],
+            "youtube_url": document["youtube_url"],
+            "content": document["content"],
+            # "content_embedding": content_embedding,  # Add embedding only if enabled,
+            "summary": document["summary"],
+            "summary_embedding": document["summary_embedding"]
+
+        }
+
+        # For demonstration purposes, display the content
+        content_id = None
+        if self.save_content:
+            content_id = self.mongo_client.save_full_data(data)
+            if content_id is None:
+                # Not recorded below, so the page is processed again on the next crawl
+                self.logger.warning(f"Document for {url} was not stored, skipping its chunks")
+                self.discard_document(url)
+                return None
+            for chunk in document["chunks"]:
+                self.mongo_client.save_chunk(chunk,content_id)
+        else:
+            print(f"--- Content from {url} ---")
+            print(json.dumps(data, ensure_ascii=False, indent=4))
+
+        if document["fingerprint"] is not None:
+            # Point the near-duplicate index at the stored document
+            self.near_duplicate_index.add(url, document["fingerprint"], content_id)
+
+        if self.recrawl_cache and document["content_hash"]:
+            self.recrawl_cache.record_content_hash(url, document["content_hash"])
+        elif self.recrawl_cache:
+            self.recrawl_cache.discard_pending(url)
+        return content_id
+
+    def discard_document(self, url):
+        """
+        Forget a document whose ingestion failed, so it is processed again on the next crawl.
+
+        Releases its near-duplicate reservation and drops its held-back recrawl validators.
+
+        :param url: URL of the document.
+        """
+        if self.near_duplicate_index:
+            self.near_duplicate_index.release(url)
+        if self.recrawl_cache:
+            self.recrawl_cache.discard_pending(url)
+
+    def extract_content_from_html(self, url, html_content, on_done=None):
+        """
+        Extract and process the content from the HTML content of a URL.
+
+        Runs all ingestion stages inline; IngestionPipeline runs the same stages concurrently.
+
+        :param url: URL of the webpage.
+        :param html_content: The fetched HTML content of the webpage, or a ParsedPage sharing its parsed tree.
+        :param on_done: Optional callable invoked once the page was stored, skipped or failed.
+        """
+        try:
+            document = self.extract_document(url, html_content)
+            if not self.deduplicate_document(document):
+                return
+            # content_embedding = self.generate_embedding_co(content, url) if self.use_embeddings else None
+            self.store_document(self.embed_document(self.summarize_document(document)))
 
         except Exception as e:
-            self.logger.error(f"Error extracting html for {url}: {e}")
\ No newline at end of file
+            self.logger.error(f"Error extracting html for {url}: {e}")
+            self.discard_document(url)
+        finally:
+            if on_done:
+                on_done()
@@ -0,0 +1,355 @@
+import random
+from collections import deque
+
+
+class CrawlFrontier:
+    def __init__(self, urls=None):
+        """
+        Initialize a deduplicating crawl frontier.
+
+        URLs are dequeued in FIFO order with `popleft`, or uniformly at random with `pop_random`.
+        Both operations, as well as enqueueing, are O(1). A URL that has ever been enqueued
+        is rejected on later enqueues, so the frontier never holds duplicates. Each entry can
+        carry a metadata dictionary (e.g. a sitemap `lastmod`), returned by the `*_entry` pops.
+
+        :param urls: Optional iterable of URLs to seed the frontier with.
+        """
+        self._queue = deque()   # FIFO order, may hold entries already removed by pop_random
+        self._pool = []         # Currently queued URLs, for O(1) random sampling
+        self._positions = {}    # URL -> index in self._pool
+        self._seen = set()      # Every URL ever accepted into the frontier
+        self._metadata = {}     # URL -> metadata dictionary, for queued entries that have one
+        self.enqueued_count = 0
+        self.duplicate_count = 0
+
+        if urls:
+            self.extend(urls)
+
+    def add(self, url, metadata=None):
+        """
+        Enqueue a URL unless it has been enqueued before.
+
+        :param url: URL to enqueue.
+        :param metadata: Optional dictionary stored with the entry.
+        :return: True if the URL was added, False if it was rejected as a duplicate.
+        """
+        if url in self._seen:
+            self.duplicate_count += 1
+            return False
+
+        self._seen.add(url)
+        self._enqueue(url, metadata)
+        self.enqueued_count += 1
+        return True
+
+    def _enqueue(self, url, metadata):
+        if metadata:
+            self._metadata[url] = metadata
+        self._queue.append(url)
+        self._positions[url] = len(self._pool)
+        self._pool.append(url)
+
+    def requeue(self, url, metadata=None):
+        """
+        Enqueue a URL that was dequeued but not visited again, e.g. when its fetch must be retried later.
+
+        :param url: URL to enqueue again.
+        :param metadata: Optional dictionary stored with the entry.
+        :return: True if the URL was queued, False if it is still queued.
+        """
+        if url in self._positions:
+            return False
+        self._seen.add(url)
+        self._enqueue(url, metadata)
+        return True
+
+    def extend(self, urls):
+        """
+        Enqueue several URLs, skipping duplicates.
+
+        :param urls: Iterable of URLs to enqueue.
+        :return: The number of URLs actually added.
+        """
+        return sum(1 for url in urls if self.add(url))
+
+    def mark_seen(self, urls):
+        """
+        Mark URLs as seen without queueing them, so later enqueues reject them.
+
+        :param urls: Iterable of URLs, e.g. pages already visited in a resumed crawl.
+        """
+        self._seen.update(urls)
+
+    def _remove_from_pool(self, url):
+        index = self._positions.pop(url)
+        last_url = self._pool.pop()
+        if last_url != url:
+            # Move the last URL into the freed slot to keep removal O(1)
+            self._pool[index] = last_url
+            self._positions[last_url] = index
+
+    def popleft_entry(self):
+        """
+        Dequeue the oldest queued URL together with its metadata.
+
+        :return: Tuple of (URL, metadata dictionary).
+        :raises IndexError: If the frontier is empty.
+        """
+        while self._queue:
+            url = self._queue.popleft()
+            # Skip entries that were already taken by pop_random
+            if url in self._positions:
+                self._remove_from_pool(url)
+                return url, self._metadata.pop(url, {})
+        raise IndexError("pop from an empty frontier")
+
+    def pop_random_entry(self, rng=random):
+        """
+        Dequeue a uniformly random queued URL together with its metadata.
+
+        :param rng: Random number generator to use (defaults to the `random` module).
+        :return: Tuple of (URL, metadata dictionary).
+        :raises IndexError: If the frontier is empty.
+        """
+        if not self._pool:
+            raise IndexError("pop from an empty frontier")
+        url = self._pool[rng.randrange(len(self._pool))]
+        self._remove_from_pool(url)
+        return url, self._metadata.pop(url, {})
+
+    def popleft(self):
+        """
+        Dequeue the oldest queued URL.
+
+        :return: The dequeued URL.
+        :raises IndexError: If the frontier is empty.
+        """
+        return self.popleft_entry()[0]
+
+    def pop_random(self, rng=random):
+        """
+        Dequeue a uniformly random queued URL.
+
+        :param rng: Random number generator to use (defaults to the `random` module).
+        :return: The dequeued URL.
+        :raises IndexError: If the frontier is empty.
+        """
+        return self.pop_random_entry(rng)[0]
+
+    def stats(self):
+        """
+        Return the frontier counters.
+
+        :return: Dictionary with the current size, total enqueued URLs and rejected duplicates.
+        """
+        return {
+            "size": len(self._pool),
+            "enqueued": self.enqueued_count,
+            "duplicates_rejected": self.duplicate_count,
+        }
+
+    def __len__(self):
+        return len(self._pool)
+
+    def __bool__(self):
+        return bool(self._pool)
+
+    def __contains__(self, url):
+        return url in self._positions
+
+    def __iter__(self):
+        # Iterate over queued URLs in FIFO order
+        return (url for url in self._queue if url in self._positions)
+
+
+class TopicFrontier:
+    def __init__(self, topics, is_topic_full, topic_fill_ratio, urls=None):
+        """
+        Initialize a frontier with one priority queue per topic.
+
+        Entries whose metadata carries a `topic_hint` go to that topic's queue; all others go
+        to a shared queue of unrouted links (navigation pages, unknown articles). Dequeuing
+        serves the open topic with the lowest fill ratio, alternating with the unrouted queue,
+        so all topic quotas fill in parallel. Links hinted for a topic that already reached its
+        quota are dropped before they are fetched. It is a drop-in for CrawlFrontier.
+
+        :param topics: Iterable of topic names.
+        :param is_topic_full: Callable telling whether a topic reached its quota.
+        :param topic_fill_ratio: Callable returning how full a topic is (count / quota).
+        :param urls: Optional iterable of URLs to seed the unrouted queue with.
+        """
+        self.is_topic_full = is_topic_full
+        self.topic_fill_ratio = topic_fill_ratio
+        self._buckets = {topic: CrawlFrontier() for topic in topics}
+        self._unrouted = CrawlFrontier()
+        self._seen = set()
+        self._prefer_unrouted = False
+        self.enqueued_count = 0
+        self.duplicate_count = 0
+        self.dropped_count = 0
+
+        if urls:
+            self.extend(urls)
+
+    def add(self, url, metadata=None):
+        """
+        Enqueue a URL in its topic's queue, unless it is a duplicate or its topic is full.
+
+        :param url: URL to enqueue.
+        :param metadata: Optional dictionary stored with the entry; `topic_hint` routes it.
+        :return: True if the URL was added, False if it was a duplicate or dropped.
+        """
+        if url in self._seen:
+            self.duplicate_count += 1
+            return False
+        self._seen.add(url)
+
+        topic = metadata.get("topic_hint") if metadata else None
+        if topic in self._buckets:
+            if self.is_topic_full(topic):
+                self.dropped_count += 1
+                return False
+            bucket = self._buckets[topic]
+        else:
+            bucket = self._unrouted
+
+        bucket.add(url, metadata)
+        self.enqueued_count += 1
+        return True
+
+    def requeue(self, url, metadata=None):
+        """
+        Enqueue a URL that was dequeued but not visited again, unless its topic is full by now.
+
+        :param url: URL to enqueue again.
+        :param metadata: Optional dictionary stored with the entry; `topic_hint` routes it.
+        :return: True if the URL was queued, False if it is still queued or its topic is full.
+        """
+        if url in self:
+            return False
+        self._seen.add(url)
+        topic = metadata.get("topic_hint") if metadata else None
+        if topic in self._buckets:
+            if self.is_topic_full(topic):
+                self.dropped_count += 1
+                return False
+            return self._buckets[topic].requeue(url, metadata)
+        return self._unrouted.requeue(url, metadata)
+
+    def extend(self, urls):
+        """
+        Enqueue several URLs without topic hints, skipping duplicates.
+
+        :param urls: Iterable of URLs to enqueue.
+        :return: The number of URLs actually added.
+        """
+        return sum(1 for url in urls if self.add(url))
+
+    def mark_seen(self, urls):
+        """
+        Mark URLs as seen without queueing them, so later enqueues reject them.
+
+        :param urls: Iterable of URLs, e.g. pages already visited in a resumed crawl.
+        """
+        self._seen.update(urls)
+
+    def _open_buckets(self):
+        open_buckets = []
+        for topic, bucket in self._buckets.items():
+            if not bucket:
+                continue
+            if self.is_topic_full(topic):
+                # The topic filled up after these links were queued, so they are never fetched
+                self.dropped_count += len(bucket)
+                self._buckets[topic] = CrawlFrontier()
+                continue
+            open_buckets.append((topic, bucket))
+        return open_buckets
+
+    def _next_bucket(self):
+        open_buckets = self._open_buckets()
+        topic_bucket = None
+        if open_buckets:
+            topic_bucket = min(open_buckets, key=lambda item: self.topic_fill_ratio(item[0]))[1]
+
+        if topic_bucket is not None and self._unrouted:
+            # Alternate so that navigation pages keep discovering new links
+            self._prefer_unrouted = not self._prefer_unrouted
+            return self._unrouted if self._prefer_unrouted else topic_bucket
+        if topic_bucket is not None:
+            return topic_bucket
+        if self._unrouted:
+            return self._unrouted
+        raise IndexError("pop from an empty frontier")
+
+    def popleft_entry(self):
+        """
+        Dequeue the oldest entry of the next topic queue to serve.
+
+        :return: Tuple of (URL, metadata dictionary).
+        :raises IndexError: If the frontier is empty.
+        """
+        return self._next_bucket().popleft_entry()
+
+    def pop_random_entry(self, rng=random):
+        """
+        Dequeue a random entry of the next topic queue to serve.
+
+        :param rng: Random number generator to use (defaults to the `random` module).
+        :return: Tuple of (URL, metadata dictionary).
+        :raises IndexError: If the frontier is empty.
+        """
+        return self._next_bucket().pop_random_entry(rng)
+
+    def popleft(self):
+        """
+        Dequeue the oldest URL of the next topic queue to serve.
+
+        :return: The dequeued URL.
+        :raises IndexError: If the frontier is empty.
+        """
+        return self.popleft_entry()[0]
+
+    def pop_random(self, rng=random):
+        """
+        Dequeue a random URL of the next topic queue to serve.
+
+        :param rng: Random number generator to use (defaults to the `random` module).
+        :return: The dequeued URL.
+        :raises IndexError: If the frontier is empty.
+        """
+        return self.pop_random_entry(rng)[0]
+
+    def stats(self):
+        """
+        Return the frontier counters.
+
+        :return: Dictionary with the current size, total enqueued URLs, rejected duplicates,
+                 links dropped for full topics, and the size of each topic queue.
+        """
+        return {
+            "size": len(self),
+            "enqueued": self.enqueued_count,
+            "duplicates_rejected": self.duplicate_count,
+            "dropped_for_full_topics": self.dropped_count,
+            "topic_queues": {topic: len(bucket) for topic, bucket in self._buckets.items()},
+            "unrouted": len(self._unrouted),
+        }
+
+    def __len__(self):
+        # Queues of full topics are never served, so they do not count
+        open_size = sum(
+            len(bucket) for topic, bucket in self._buckets.items() if bucket and not self.is_topic_full(topic)
+        )
+        return open_size + len(self._unrouted)
+
+    def __bool__(self):
+        return len(self) > 0
+
+    def __contains__(self, url):
+        return url in self._unrouted or any(url in bucket for bucket in self._buckets.values())
+
+    def __iter__(self):
+        yield from self._unrouted
+        for bucket in self._buckets.values():
+            yield from bucket
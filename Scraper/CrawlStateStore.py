@@ -0,0 +1,119 @@
+import json
+import os
+import sqlite3
+
+
+class CrawlStateStore:
+    def __init__(self, db_path):
+        """
+        Initialize a SQLite-backed store for the crawl state.
+
+        The store records visited URLs, the pending frontier (in enqueue order, with each
+        entry's metadata such as a topic hint or sitemap `lastmod`) and the per-topic counts. Every processed page is written in a single transaction, so a
+        killed crawl can be resumed from the last committed page without re-fetching
+        anything that was already processed.
+
+        :param db_path: Path of the SQLite database file.
+        """
+        directory = os.path.dirname(db_path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+
+        self.db_path = db_path
+        self.connection = sqlite3.connect(db_path)
+        # WAL keeps each per-page commit cheap while remaining crash-safe
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.executescript("""
+            CREATE TABLE IF NOT EXISTS visited (url TEXT PRIMARY KEY);
+            CREATE TABLE IF NOT EXISTS frontier (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                url TEXT NOT NULL UNIQUE,
+                metadata TEXT
+            );
+            CREATE TABLE IF NOT EXISTS topic_counts (topic TEXT PRIMARY KEY, count INTEGER NOT NULL);
+        """)
+        columns = {row[1] for row in self.connection.execute("PRAGMA table_info(frontier)")}
+        if "metadata" not in columns:
+            # Crawl states saved before frontier metadata was kept
+            self.connection.execute("ALTER TABLE frontier ADD COLUMN metadata TEXT")
+        self.connection.commit()
+
+    def is_empty(self):
+        """
+        Check whether the store holds no crawl state yet.
+
+        :return: True if nothing has been recorded, False otherwise.
+        """
+        cursor = self.connection.execute(
+            "SELECT EXISTS(SELECT 1 FROM visited) OR EXISTS(SELECT 1 FROM frontier)"
+        )
+        return not cursor.fetchone()[0]
+
+    def load(self):
+        """
+        Load the saved crawl state.
+
+        :return: Tuple of (visited URL set, pending (URL, metadata dict or None) list in enqueue order,
+                 topic count dict).
+        """
+        visited = {row[0] for row in self.connection.execute("SELECT url FROM visited")}
+        pending = [
+            (url, json.loads(metadata) if metadata else None)
+            for url, metadata in self.connection.execute("SELECT url, metadata FROM frontier ORDER BY seq")
+        ]
+        topic_counts = dict(self.connection.execute("SELECT topic, count FROM topic_counts"))
+        return visited, pending, topic_counts
+
+    def record_enqueued(self, urls):
+        """
+        Append URLs to the saved frontier and commit.
+
+        :param urls: Iterable of URLs or of (URL, metadata dict or None) tuples added to the frontier.
+        """
+        with self.connection:
+            self._insert_frontier(urls)
+
+    def record_page(self, url, new_links, topic_counts=None):
+        """
+        Record a finished page in a single transaction.
+
+        The page is moved from the frontier to the visited set, the links it added to the
+        frontier are appended, and the topic counts (if given) are updated.
+
+        :param url: URL of the page that was handled.
+        :param new_links: URLs or (URL, metadata dict or None) tuples that the page added to the frontier.
+        :param topic_counts: Optional dictionary of the current per-topic counts.
+        """
+        with self.connection:
+            self.connection.execute("DELETE FROM frontier WHERE url = ?", (url,))
+            self.connection.execute("INSERT OR IGNORE INTO visited (url) VALUES (?)", (url,))
+            self._insert_frontier(new_links)
+            if topic_counts:
+                self.connection.executemany(
+                    "INSERT INTO topic_counts (topic, count) VALUES (?, ?) "
+                    "ON CONFLICT(topic) DO UPDATE SET count = excluded.count",
+                    topic_counts.items()
+                )
+
+    def _insert_frontier(self, links):
+        rows = []
+        for link in links:
+            url, metadata = link if isinstance(link, tuple) else (link, None)
+            rows.append((url, json.dumps(metadata) if metadata else None))
+        self.connection.executemany("INSERT OR IGNORE INTO frontier (url, metadata) VALUES (?, ?)", rows)
+
+    def reset(self):
+        """
+        Delete all saved crawl state.
+        """
+        with self.connection:
+            self.connection.execute("DELETE FROM visited")
+            self.connection.execute("DELETE FROM frontier")
+            self.connection.execute("DELETE FROM topic_counts")
+
+    def close(self):
+        """
+        Close the underlying database connection.
+        """
+        self.connection.close()
@@ -0,0 +1,101 @@
+import re
+import numpy as np
+from scipy import sparse
+
+# Same notion of a word as sumy's tokenizer: letters, with inner apostrophes and hyphens
+WORD_PATTERN = re.compile(r"[^\W\d_](?:[^\W\d_]|['-])*")
+DEFAULT_MAX_SENTENCES = 200
+MAX_POWER_ITERATIONS = 100
+
+
+class FastLexRankSummarizer:
+    def __init__(self, stop_words=(), max_sentences=DEFAULT_MAX_SENTENCES, threshold=0.1, epsilon=0.1):
+        """
+        Initialize a vectorised LexRank summariser.
+
+        It follows sumy's LexRankSummarizer (tf normalised by the sentence's most frequent word,
+        idf = log(n / (1 + df)), thresholded idf-modified cosine graph, power method), but builds the
+        sentence tf-idf vectors as a SciPy sparse matrix and gets every pairwise similarity from a
+        single sparse product instead of a Python double loop. Pages with more than `max_sentences`
+        sentences are ranked on an evenly spaced sample of them, which bounds the quadratic part.
+        The word pattern and stop words are built once and reused for every page.
+
+        :param stop_words: Words ignored when comparing sentences.
+        :param max_sentences: Maximum number of candidate sentences per page.
+        :param threshold: Similarity above which two sentences are linked.
+        :param epsilon: Convergence threshold of the power method.
+        """
+        self.stop_words = frozenset(word.lower() for word in stop_words)
+        self.max_sentences = max_sentences
+        self.threshold = threshold
+        self.epsilon = epsilon
+
+    def _tfidf_matrix(self, sentences):
+        vocabulary = {}
+        rows, columns = [], []
+        for row, sentence in enumerate(sentences):
+            for word in WORD_PATTERN.findall(sentence.lower()):
+                if word not in self.stop_words:
+                    rows.append(row)
+                    columns.append(vocabulary.setdefault(word, len(vocabulary)))
+        # Duplicate (row, column) pairs are summed, which gives the term counts
+        counts = sparse.csr_matrix(
+            (np.ones(len(rows)), (rows, columns)), shape=(len(sentences), max(1, len(vocabulary)))
+        )
+        counts.sum_duplicates()
+
+        max_counts = counts.max(axis=1).toarray().ravel()
+        max_counts[max_counts == 0] = 1
+        term_frequencies = sparse.diags(1.0 / max_counts) @ counts
+        document_frequencies = np.bincount(counts.indices, minlength=counts.shape[1])
+        idf = np.log(len(sentences) / (1.0 + document_frequencies))
+        return term_frequencies @ sparse.diags(idf)
+
+    def rank(self, sentences):
+        """
+        Return the LexRank score of every sentence.
+
+        :param sentences: List of sentence strings.
+        :return: NumPy array of scores, in the order of the sentences.
+        """
+        vectors = self._tfidf_matrix(sentences)
+        similarities = (vectors @ vectors.T).toarray()
+        norms = np.sqrt(np.asarray(vectors.multiply(vectors).sum(axis=1)).ravel())
+        norms[norms == 0] = np.inf
+        similarities /= np.outer(norms, norms)
+
+        adjacency = (similarities > self.threshold).astype(float)
+        degrees = adjacency.sum(axis=1)
+        degrees[degrees == 0] = 1
+        transition = (adjacency / degrees[:, None]).T
+
+        scores = np.full(len(sentences), 1.0 / len(sentences))
+        for _ in range(MAX_POWER_ITERATIONS):
+            next_scores = transition @ scores
+            norm = np.linalg.norm(next_scores)
+            if norm == 0:
+                break
+            next_scores /= norm
+            converged = np.linalg.norm(next_scores - scores) <= self.epsilon
+            scores = next_scores
+            if converged:
+                break
+        return scores
+
+    def summarize(self, sentences, sentence_count):
+        """
+        Pick the `sentence_count` most central sentences.
+
+        :param sentences: List of sentence strings, in document order.
+        :param sentence_count: Number of sentences in the summary.
+        :return: List of the selected sentences, in document order.
+        """
+        if not sentences:
+            return []
+        candidates = np.arange(len(sentences))
+        if len(sentences) > self.max_sentences:
+            candidates = np.unique(np.linspace(0, len(sentences) - 1, self.max_sentences).round().astype(int))
+        scores = self.rank([sentences[index] for index in candidates])
+        # A stable sort keeps the earlier sentence first among equal scores, like sumy
+        best = np.sort(candidates[np.argsort(-scores, kind="stable")[:sentence_count]])
+        return [sentences[index] for index in best]
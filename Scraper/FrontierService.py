@@ -0,0 +1,323 @@
+import json
+import os
+import sqlite3
+import time
+from contextlib import contextmanager
+
+DEFAULT_LEASE_SECONDS = 300
+
+
+class FrontierService:
+    def __init__(self, db_path, lease_seconds=None):
+        """
+        Initialize a crawl frontier shared by several worker processes.
+
+        URLs live in a single SQLite database that every worker opens on its own. Workers lease
+        batches of pending URLs, report each handled URL together with the links it produced,
+        and renew their leases while they work; leases of a worker that died expire after
+        `lease_seconds` and their URLs are handed out again. A worker can also hand a URL back
+        to be leased again only after a delay (e.g. while its robots.txt is unreachable). Topic quotas are counted here as
+        well, so they hold across all workers, and pending links hinted for a full topic are
+        never leased.
+
+        :param db_path: Path of the SQLite database file (on storage reachable by all workers).
+        :param lease_seconds: How long a leased URL stays reserved for its worker without a renewal. It is
+                              stored in the database, so services opened without it (the workers) use
+                              the value set by the coordinator, or DEFAULT_LEASE_SECONDS.
+        """
+        directory = os.path.dirname(db_path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+
+        self.db_path = db_path
+        # Transactions are explicit (BEGIN IMMEDIATE), so concurrent workers serialize on writes
+        self.connection = sqlite3.connect(db_path, timeout=60, isolation_level=None)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.executescript("""
+            CREATE TABLE IF NOT EXISTS urls (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                url TEXT NOT NULL UNIQUE,
+                status TEXT NOT NULL DEFAULT 'pending',
+                topic_hint TEXT,
+                metadata TEXT,
+                lease_owner TEXT,
+                lease_expires REAL,
+                claimed_topic TEXT
+            );
+            CREATE INDEX IF NOT EXISTS urls_status ON urls (status, seq);
+            CREATE TABLE IF NOT EXISTS settings (
+                name TEXT PRIMARY KEY,
+                value TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS topics (
+                topic TEXT PRIMARY KEY,
+                count INTEGER NOT NULL DEFAULT 0,
+                max_count INTEGER NOT NULL
+            );
+        """)
+        columns = {row[1] for row in self.connection.execute("PRAGMA table_info(urls)")}
+        if "claimed_topic" not in columns:
+            # Frontiers created before topic claims were recorded per URL
+            self.connection.execute("ALTER TABLE urls ADD COLUMN claimed_topic TEXT")
+        if lease_seconds is not None:
+            with self._transaction() as connection:
+                connection.execute(
+                    "INSERT OR REPLACE INTO settings (name, value) VALUES ('lease_seconds', ?)", (str(lease_seconds),)
+                )
+        row = self.connection.execute("SELECT value FROM settings WHERE name = 'lease_seconds'").fetchone()
+        self.lease_seconds = float(row[0]) if row else DEFAULT_LEASE_SECONDS
+
+    @contextmanager
+    def _transaction(self):
+        self.connection.execute("BEGIN IMMEDIATE")
+        try:
+            yield self.connection
+        except BaseException:
+            self.connection.execute("ROLLBACK")
+            raise
+        self.connection.execute("COMMIT")
+
+    def is_empty(self):
+        """
+        Check whether no URL was ever added to the frontier.
+
+        :return: True if the frontier holds no URLs at all, False otherwise.
+        """
+        return self.connection.execute("SELECT NOT EXISTS(SELECT 1 FROM urls)").fetchone()[0] == 1
+
+    def set_topic_limits(self, limits):
+        """
+        Register the topics and their quotas, keeping the counts already reached.
+
+        :param limits: Dictionary mapping each topic to its maximum number of pages.
+        """
+        with self._transaction() as connection:
+            connection.executemany(
+                "INSERT INTO topics (topic, max_count) VALUES (?, ?) "
+                "ON CONFLICT(topic) DO UPDATE SET max_count = excluded.max_count",
+                limits.items()
+            )
+
+    def add(self, links):
+        """
+        Add links to the frontier; links that are already known (in any state) are ignored.
+
+        :param links: Iterable of URLs or of (URL, metadata dict or None) tuples.
+        :return: The number of links that were new.
+        """
+        with self._transaction() as connection:
+            return self._insert(connection, links)
+
+    @staticmethod
+    def _insert(connection, links):
+        rows = []
+        for link in links:
+            url, metadata = link if isinstance(link, tuple) else (link, None)
+            rows.append((url, (metadata or {}).get("topic_hint"), json.dumps(metadata) if metadata else None))
+        before = connection.total_changes
+        connection.executemany("INSERT OR IGNORE INTO urls (url, topic_hint, metadata) VALUES (?, ?, ?)", rows)
+        return connection.total_changes - before
+
+    def lease(self, worker_id, batch_size=10):
+        """
+        Lease a batch of pending URLs, in the order they were added.
+
+        Expired leases are returned to the pending state first, and pending links hinted for
+        a topic that reached its quota are dropped.
+
+        :param worker_id: Identifier of the leasing worker.
+        :param batch_size: Maximum number of URLs to lease.
+        :return: List of (URL, metadata dict or None) tuples.
+        """
+        now = time.time()
+        with self._transaction() as connection:
+            connection.execute(
+                "UPDATE urls SET status = 'pending', lease_owner = NULL, lease_expires = NULL "
+                "WHERE status = 'leased' AND lease_expires < ?", (now,)
+            )
+            connection.execute(
+                "UPDATE urls SET status = 'dropped' WHERE status = 'pending' "
+                "AND topic_hint IN (SELECT topic FROM topics WHERE count >= max_count)"
+            )
+            # Deferred URLs keep the time they may be leased again in lease_expires
+            rows = connection.execute(
+                "SELECT seq, url, metadata FROM urls WHERE status = 'pending' "
+                "AND (lease_expires IS NULL OR lease_expires <= ?) ORDER BY seq LIMIT ?", (now, batch_size)
+            ).fetchall()
+            connection.executemany(
+                "UPDATE urls SET status = 'leased', lease_owner = ?, lease_expires = ? WHERE seq = ?",
+                ((worker_id, now + self.lease_seconds, seq) for seq, _, _ in rows)
+            )
+        return [(url, json.loads(metadata) if metadata else None) for _, url, metadata in rows]
+
+    def renew(self, worker_id):
+        """
+        Extend all leases held by a worker.
+
+        :param worker_id: Identifier of the worker.
+        """
+        with self._transaction() as connection:
+            connection.execute(
+                "UPDATE urls SET lease_expires = ? WHERE status = 'leased' AND lease_owner = ?",
+                (time.time() + self.lease_seconds, worker_id)
+            )
+
+    def complete(self, worker_id, url, new_links=()):
+        """
+        Mark a leased URL as handled and add the links found on it, in a single transaction.
+
+        :param worker_id: Identifier of the worker reporting the result.
+        :param url: URL that was visited, skipped or failed.
+        :param new_links: Iterable of URLs or of (URL, metadata dict or None) tuples found on the page.
+        :return: The number of links that were new.
+        """
+        with self._transaction() as connection:
+            connection.execute(
+                "UPDATE urls SET status = 'done', lease_owner = NULL, lease_expires = NULL WHERE url = ?", (url,)
+            )
+            return self._insert(connection, new_links)
+
+    def defer(self, worker_id, url, delay, metadata=None):
+        """
+        Return a leased URL to the pending state, to be leased again only after `delay` seconds.
+
+        :param worker_id: Identifier of the worker holding the lease.
+        :param url: URL to hand back.
+        :param delay: Seconds before the URL may be leased again.
+        :param metadata: Optional metadata dictionary replacing the stored one (e.g. with a retry count).
+        """
+        with self._transaction() as connection:
+            connection.execute(
+                "UPDATE urls SET status = 'pending', lease_owner = NULL, lease_expires = ?, "
+                "metadata = COALESCE(?, metadata) WHERE url = ? AND lease_owner = ?",
+                (time.time() + delay, json.dumps(metadata) if metadata else None, url, worker_id)
+            )
+
+    def fail(self, worker_id, url):
+        """
+        Set a leased URL aside without marking it done; `retry_failed` returns it to the pending state.
+
+        :param worker_id: Identifier of the worker holding the lease.
+        :param url: URL that could not be handled.
+        """
+        with self._transaction() as connection:
+            connection.execute(
+                "UPDATE urls SET status = 'failed', lease_owner = NULL, lease_expires = NULL "
+                "WHERE url = ? AND lease_owner = ?", (url, worker_id)
+            )
+
+    def retry_failed(self):
+        """
+        Return all failed URLs to the pending state, e.g. when a crawl is resumed.
+
+        :return: The number of URLs queued again.
+        """
+        with self._transaction() as connection:
+            return connection.execute("UPDATE urls SET status = 'pending' WHERE status = 'failed'").rowcount
+
+    def claim_url(self, url):
+        """
+        Mark a URL as handled unless it was already handled or is being handled by a worker.
+
+        Used for rel=canonical targets, so a page reached under an alias on one worker is not
+        processed again when another worker reaches its canonical URL.
+
+        :param url: URL to claim.
+        :return: True if the URL was claimed, False if it is already done or leased.
+        """
+        with self._transaction() as connection:
+            row = connection.execute("SELECT status FROM urls WHERE url = ?", (url,)).fetchone()
+            if row is None:
+                connection.execute("INSERT INTO urls (url, status) VALUES (?, 'done')", (url,))
+                return True
+            if row[0] in ("done", "leased"):
+                return False
+            connection.execute("UPDATE urls SET status = 'done' WHERE url = ?", (url,))
+            return True
+
+    def release(self, worker_id):
+        """
+        Return all URLs leased by a worker to the pending state (e.g. when it shuts down).
+
+        :param worker_id: Identifier of the worker.
+        """
+        with self._transaction() as connection:
+            connection.execute(
+                "UPDATE urls SET status = 'pending', lease_owner = NULL, lease_expires = NULL "
+                "WHERE status = 'leased' AND lease_owner = ?", (worker_id,)
+            )
+
+    def claim_topic(self, topic, url=None):
+        """
+        Atomically count a page towards its topic if the topic's quota allows it.
+
+        Topics without a registered quota are not counted and always allowed, like the
+        single-process crawler does. A claim made for `url` is recorded with it, so when the
+        page is leased again because its worker died before the page was stored, the new
+        claim does not count it twice.
+
+        :param topic: Topic of the page.
+        :param url: Optional URL the page was leased under.
+        :return: True if the page may be processed, False if the topic reached its quota.
+        """
+        with self._transaction() as connection:
+            if connection.execute("SELECT 1 FROM topics WHERE topic = ?", (topic,)).fetchone() is None:
+                return True
+            if url and connection.execute(
+                "SELECT 1 FROM urls WHERE url = ? AND claimed_topic = ?", (url, topic)
+            ).fetchone():
+                return True
+            cursor = connection.execute(
+                "UPDATE topics SET count = count + 1 WHERE topic = ? AND count < max_count", (topic,)
+            )
+            if cursor.rowcount == 1 and url:
+                connection.execute("UPDATE urls SET claimed_topic = ? WHERE url = ?", (topic, url))
+            return cursor.rowcount == 1
+
+    def topic_counts(self):
+        """
+        Return the global per-topic counts.
+
+        :return: Dictionary mapping each topic to its page count.
+        """
+        return dict(self.connection.execute("SELECT topic, count FROM topics"))
+
+    def is_finished(self):
+        """
+        Check whether the crawl is over: nothing is pending or leased, or every topic is full.
+
+        :return: True if no worker has anything left to do, False otherwise.
+        """
+        active, open_topics, topics = self.connection.execute(
+            "SELECT "
+            "(SELECT COUNT(*) FROM urls WHERE status IN ('pending', 'leased')), "
+            "(SELECT COUNT(*) FROM topics WHERE count < max_count), "
+            "(SELECT COUNT(*) FROM topics)"
+        ).fetchone()
+        return active == 0 or (topics > 0 and open_topics == 0)
+
+    def stats(self):
+        """
+        Return the number of URLs per state and the global topic counts.
+
+        :return: Dictionary of frontier statistics.
+        """
+        stats = {status: 0 for status in ("pending", "leased", "done", "dropped", "failed")}
+        stats.update(self.connection.execute("SELECT status, COUNT(*) FROM urls GROUP BY status"))
+        stats["topic_counts"] = self.topic_counts()
+        return stats
+
+    def reset(self):
+        """
+        Delete all frontier state and topic counts.
+        """
+        with self._transaction() as connection:
+            connection.execute("DELETE FROM urls")
+            connection.execute("DELETE FROM topics")
+
+    def close(self):
+        """
+        Close the underlying database connection.
+        """
+        self.connection.close()
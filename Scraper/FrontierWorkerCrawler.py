@@ -0,0 +1,193 @@
+import time
+from functools import partial
+from Scraper.LimitedWebCrawler import LimitedWebCrawler
+from Scraper.HttpTransport import HttpTransport
+from Scraper.WebCrawler import FRONTIER_SIZE
+from Scraper.PolitenessScheduler import (
+    DEFAULT_INITIAL_RATE, DEFAULT_MAX_RATE, DEFAULT_MIN_RATE, RETRY_LATER, PolitenessScheduler
+)
+
+
+class FrontierWorkerCrawler(LimitedWebCrawler):
+    def __init__(self, homepage, frontier_service, worker_id, worker_count=1, batch_size=10, poll_interval=2,
+                 max_seen_urls_per_topic=500, blacklist=None, logger=None, request_timeout=30, transport=None,
+                 recrawl_cache=None, scheduler=None, canonicalizer=None, archive=None):
+        """
+        Initialize a crawler worker that takes its URLs from a shared FrontierService.
+
+        The worker leases batches of URLs, processes them like LimitedWebCrawler does and
+        reports every page with its routed links back to the service. Topic quotas are claimed
+        atomically in the service, so they hold across all workers. Each worker paces itself,
+        so by default it only gets a `1 / worker_count` share of the per-domain politeness rate.
+
+        :param homepage: URL the crawl started from.
+        :param frontier_service: FrontierService shared by all workers.
+        :param worker_id: Unique identifier of this worker, used as the lease owner.
+        :param worker_count: Number of workers crawling concurrently.
+        :param batch_size: Number of URLs leased at a time.
+        :param poll_interval: Seconds to wait before leasing again when no URL is available.
+        :param max_seen_urls_per_topic: Maximum number of pages to process per topic, across all workers.
+        """
+        transport = transport or HttpTransport(timeout=request_timeout, logger=logger)
+        if scheduler is None:
+            scheduler = PolitenessScheduler(
+                transport,
+                user_agent=transport.user_agent,
+                initial_rate=DEFAULT_INITIAL_RATE / worker_count,
+                min_rate=DEFAULT_MIN_RATE / worker_count,
+                max_rate=DEFAULT_MAX_RATE / worker_count,
+                logger=logger
+            )
+        super().__init__(
+            homepage,
+            max_seen_urls_per_topic=max_seen_urls_per_topic,
+            blacklist=blacklist,
+            logger=logger,
+            request_timeout=request_timeout,
+            transport=transport,
+            recrawl_cache=recrawl_cache,
+            scheduler=scheduler,
+            canonicalizer=canonicalizer,
+            archive=archive
+        )
+        # URLs come from the shared frontier; the local one stays empty
+        self.to_visit = self.new_frontier()
+        self.frontier_service = frontier_service
+        self.worker_id = worker_id
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.frontier_service.set_topic_limits({topic: max_seen_urls_per_topic for topic in self.topic_counts})
+        self.sync_topic_counts()
+
+    def sync_topic_counts(self):
+        """
+        Refresh the local topic counts from the global counts in the frontier service.
+        """
+        for topic, count in self.frontier_service.topic_counts().items():
+            if topic in self.topic_counts:
+                self.topic_counts[topic] = count
+
+    def claim_topic(self, topic, url=None):
+        """
+        Count a page towards its topic in the frontier service, if the global limit allows it.
+
+        :param topic: The topic of the page.
+        :param url: URL of the page, so a page leased again after a worker died is not counted twice.
+        :return: True if the page may be processed, False if the topic limit has been reached.
+        """
+        claimed = self.frontier_service.claim_topic(topic, url)
+        self.sync_topic_counts()
+        return claimed
+
+    def resolve_canonical(self, url, page):
+        """
+        Resolve the page's canonical URL, treating it as a duplicate if any worker already handled it.
+
+        :param url: URL the page was fetched under.
+        :param page: ParsedPage of the fetched page.
+        :return: The canonical URL, or None if that page was already visited under another URL.
+        """
+        canonical_url = super().resolve_canonical(url, page)
+        if canonical_url and canonical_url != url and not self.frontier_service.claim_url(canonical_url):
+            self.logger.info(f"Duplicate of {canonical_url} handled by another worker, skipping extraction: {url}")
+            return None
+        return canonical_url
+
+    def complete_page(self, url, internal_links):
+        """
+        Report a handled page and its routed links to the frontier service.
+
+        A page handed to the content extractor is reported once the extractor is done with it;
+        until then it stays leased, so its lease expires and another worker fetches it again
+        if this worker dies first.
+
+        :param url: URL of the page that was visited, skipped or failed.
+        :param internal_links: Internal links found on the page.
+        """
+        self.page_metadata.pop(url, None)
+        links_with_metadata = [(link, self.link_metadata.pop(link, None)) for link in internal_links]
+        if not self.follow_links:
+            links_with_metadata = []
+        self.record_when_ingested(url, partial(self.frontier_service.complete, self.worker_id, url, links_with_metadata))
+
+    def requeue_later(self, url, metadata, delay):
+        """
+        Return a leased URL to the shared frontier, to be leased again once `delay` seconds have passed.
+
+        :param url: URL of the page.
+        :param metadata: Frontier metadata of the page.
+        :param delay: Seconds to wait before the page may be leased again.
+        """
+        self.frontier_service.defer(self.worker_id, url, delay, metadata)
+
+    def give_up_page(self, url):
+        """
+        Set a leased URL aside in the shared frontier; a resumed crawl queues it again.
+
+        :param url: URL of the page.
+        """
+        self.frontier_service.fail(self.worker_id, url)
+
+    def crawl_and_process(self, content_extractor, log_frequency=100):
+        """
+        Lease URLs from the frontier service and process them until the shared crawl is finished.
+
+        Leases still held when the worker stops (e.g. on an error) are released, so other
+        workers pick them up right away instead of waiting for them to expire.
+
+        :param content_extractor: An instance of ContentExtractor to process the content.
+        :param log_frequency: How often (in processed pages) to log the crawl progress.
+        """
+        processed_count = 0
+        try:
+            while self.should_continue():
+                batch = self.frontier_service.lease(self.worker_id, self.batch_size)
+                self.sync_topic_counts()
+                if not batch:
+                    if self.frontier_service.is_finished():
+                        break
+                    time.sleep(self.poll_interval)
+                    continue
+
+                for url, metadata in batch:
+                    if url in self.blacklist:
+                        self.complete_page(url, [])
+                        continue
+                    if metadata:
+                        self.page_metadata[url] = metadata
+
+                    self.logger.info(f"[{self.worker_id}] Visiting {url}...")
+                    self.visited_links.add(url)
+                    html_content = self.fetch_page(url)
+                    if html_content is RETRY_LATER:
+                        self.defer_page(url, self.scheduler.unreachable_retry)
+                        continue
+                    internal_links = [] if html_content is None else self.process_page(content_extractor, url, html_content)
+                    self.complete_page(url, internal_links)
+                    # Heartbeat: keep the rest of the batch leased while this worker is alive
+                    self.frontier_service.renew(self.worker_id)
+
+                    processed_count += 1
+                    if processed_count % log_frequency == 0:
+                        self.log_progress()
+        finally:
+            self.frontier_service.release(self.worker_id)
+
+        self.logger.info(f"[{self.worker_id}] Worker finished after {processed_count} pages. "
+                         f"Frontier stats: {self.frontier_service.stats()}")
+
+    def log_progress(self):
+        """
+        Log this worker's progress and the shared frontier's state.
+        """
+        super().log_progress()
+        stats = self.frontier_service.stats()
+        FRONTIER_SIZE.set(stats["pending"])
+        self.logger.info(f"[{self.worker_id}] Shared frontier stats: {stats}")
+
+    def crawl_and_process_async(self, content_extractor, concurrency=16, per_host_concurrency=4,
+                                random_jump_frequency=None, log_frequency=100):
+        """
+        Workers scale out with processes instead of in-process concurrency, so this crawls serially.
+        """
+        return self.crawl_and_process(content_extractor, log_frequency=log_frequency)
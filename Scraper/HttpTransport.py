@@ -0,0 +1,251 @@
+import codecs
+import hashlib
+import random
+import re
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
+import requests
+from requests.adapters import HTTPAdapter
+
+try:
+    import brotli  # noqa: F401  (urllib3 decodes "br" only when brotli is installed)
+    ACCEPT_ENCODING = "gzip, deflate, br"
+except ImportError:
+    ACCEPT_ENCODING = "gzip, deflate"
+
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+DEFAULT_USER_AGENT = "DIY-LLM-Agent-Crawler/1.0"
+HTML_CONTENT_TYPES = ("text/html", "application/xhtml+xml")
+DEFAULT_MAX_BODY_BYTES = 5 * 1024 * 1024
+STREAM_CHUNK_SIZE = 64 * 1024
+HEADER_CHARSET = re.compile(r'charset=["\']?([A-Za-z0-9_.:-]+)', re.IGNORECASE)
+META_CHARSET = re.compile(rb'<meta[^>]+charset=["\']?([A-Za-z0-9_.:-]+)', re.IGNORECASE)
+
+
+class ContentRejected(requests.exceptions.RequestException):
+    """
+    Raised when a response body is not read because of its content type or size.
+    """
+
+
+class HttpTransport:
+    def __init__(self, timeout=(5, 30), max_retries=3, backoff_factor=0.5, max_backoff=60,
+                 pool_connections=10, pool_maxsize=32, user_agent=DEFAULT_USER_AGENT, logger=None,
+                 max_body_bytes=DEFAULT_MAX_BODY_BYTES, content_types=HTML_CONTENT_TYPES):
+        """
+        Initialize a shared HTTP transport for the Scraper package.
+
+        A single pooled session keeps connections to the same host alive, negotiates
+        compressed responses, and retries transient failures (connection errors, 429 and 5xx)
+        with exponential backoff and jitter, honouring `Retry-After` when the server sends it.
+
+        :param timeout: Request timeout in seconds, or a (connect, read) tuple.
+        :param max_retries: Number of retries after the first attempt.
+        :param backoff_factor: Base delay in seconds for the exponential backoff.
+        :param max_backoff: Upper bound in seconds for a single backoff or Retry-After delay.
+        :param pool_connections: Number of per-host connection pools to keep.
+        :param pool_maxsize: Maximum number of kept-alive connections per host.
+        :param user_agent: User-Agent header sent with every request.
+        :param logger: Logger instance to log retries.
+        :param max_body_bytes: Largest (decoded) body `read_text` accepts; larger downloads are aborted.
+        :param content_types: Content types `read_text` accepts (None accepts any).
+        """
+        self.timeout = timeout
+        self.max_body_bytes = max_body_bytes
+        self.content_types = content_types
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.max_backoff = max_backoff
+        self.user_agent = user_agent
+        self.logger = logger
+
+        self.session = requests.Session()
+        # Retries are handled here so that Retry-After and jitter apply uniformly
+        adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize, max_retries=0)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.session.headers.update({
+            "Accept-Encoding": ACCEPT_ENCODING,
+            "User-Agent": user_agent,
+        })
+
+        self._lock = threading.Lock()
+        self.request_count = 0
+        self.retry_count = 0
+        self.wire_bytes = 0
+        self.decoded_bytes = 0
+        self.rejected_count = 0
+
+    def get(self, url, headers=None, stream=False):
+        """
+        Send a GET request, retrying transient failures.
+
+        :param url: URL to fetch.
+        :param headers: Optional extra request headers.
+        :param stream: If True, the body is not read up front and must be consumed from `response.raw`.
+        :return: The final requests.Response (which may still carry an error status).
+        :raises requests.exceptions.RequestException: If every attempt failed to connect.
+        """
+        attempt = 0
+        while True:
+            try:
+                response = self.session.get(url, headers=headers, timeout=self.timeout, stream=stream)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                if attempt >= self.max_retries:
+                    raise
+                delay = self._backoff_delay(attempt)
+                reason = str(e)
+            else:
+                self._record_response(response, stream)
+                if response.status_code not in RETRY_STATUS_CODES or attempt >= self.max_retries:
+                    return response
+                delay = self._retry_after_delay(response)
+                if delay is None:
+                    delay = self._backoff_delay(attempt)
+                reason = f"HTTP {response.status_code}"
+                response.close()
+
+            attempt += 1
+            with self._lock:
+                self.retry_count += 1
+            if self.logger:
+                self.logger.warning(f"Retrying {url} in {delay:.2f}s (attempt {attempt}/{self.max_retries}): {reason}")
+            time.sleep(delay)
+
+    def read_text(self, response):
+        """
+        Read and decode the body of a streamed response, within the content type and size limits.
+
+        The Content-Type and Content-Length headers are checked before any of the body is read,
+        and the download is aborted as soon as the decoded body exceeds `max_body_bytes`, so the
+        memory and bandwidth spent on a link do not depend on what it points at. The body is
+        decoded chunk by chunk with the charset of the Content-Type header, or of a <meta> tag
+        in the first chunk, falling back to UTF-8. The response is closed in every case.
+
+        :param response: A response returned by `get(..., stream=True)`.
+        :return: Tuple of (decoded text, body size in bytes, SHA-256 hex digest of the body).
+        :raises ContentRejected: If the content type is not accepted or the body is too large.
+        """
+        try:
+            content_type = response.headers.get("Content-Type", "")
+            media_type = content_type.split(";", 1)[0].strip().lower()
+            if self.content_types is not None and media_type and media_type not in self.content_types:
+                raise ContentRejected(f"Unsupported content type {media_type}", response=response)
+            content_length = response.headers.get("Content-Length")
+            if self.max_body_bytes and content_length and content_length.isdigit() \
+                    and int(content_length) > self.max_body_bytes:
+                raise ContentRejected(f"Content-Length {content_length} exceeds {self.max_body_bytes} bytes",
+                                      response=response)
+
+            header_charset = HEADER_CHARSET.search(content_type)
+            charset = header_charset.group(1) if header_charset else None
+            decoder = None
+            body_hash = hashlib.sha256()
+            size = 0
+            parts = []
+            for chunk in response.iter_content(chunk_size=STREAM_CHUNK_SIZE):
+                size += len(chunk)
+                if self.max_body_bytes and size > self.max_body_bytes:
+                    raise ContentRejected(f"Body exceeds {self.max_body_bytes} bytes", response=response)
+                if decoder is None:
+                    decoder = self._incremental_decoder(charset or self._sniff_charset(chunk))
+                body_hash.update(chunk)
+                parts.append(decoder.decode(chunk))
+            if decoder is not None:
+                parts.append(decoder.decode(b"", final=True))
+        except ContentRejected:
+            with self._lock:
+                self.rejected_count += 1
+            raise
+        finally:
+            response.close()
+
+        wire = response.raw.tell() if response.raw is not None else size
+        with self._lock:
+            self.decoded_bytes += size
+            self.wire_bytes += wire
+        return "".join(parts), size, body_hash.hexdigest()
+
+    @staticmethod
+    def _sniff_charset(chunk):
+        match = META_CHARSET.search(chunk[:4096])
+        return match.group(1).decode("ascii") if match else "utf-8"
+
+    @staticmethod
+    def _incremental_decoder(charset):
+        try:
+            return codecs.getincrementaldecoder(charset)(errors="replace")
+        except LookupError:
+            return codecs.getincrementaldecoder("utf-8")(errors="replace")
+
+    def _backoff_delay(self, attempt):
+        # Full jitter: a random delay up to the exponential bound
+        return random.uniform(0, min(self.max_backoff, self.backoff_factor * (2 ** attempt)))
+
+    def _retry_after_delay(self, response):
+        retry_after = response.headers.get("Retry-After")
+        if not retry_after:
+            return None
+        try:
+            delay = float(retry_after)
+        except ValueError:
+            try:
+                retry_at = parsedate_to_datetime(retry_after)
+            except (TypeError, ValueError):
+                return None
+            if retry_at.tzinfo is None:
+                retry_at = retry_at.replace(tzinfo=timezone.utc)
+            delay = (retry_at - datetime.now(timezone.utc)).total_seconds()
+        return min(max(delay, 0.0), self.max_backoff)
+
+    def _record_response(self, response, stream=False):
+        if stream:
+            # Streamed bodies are consumed by the caller, so only the request is counted
+            with self._lock:
+                self.request_count += 1
+            return
+        decoded = len(response.content)
+        # tell() reports the bytes read off the wire, before content decoding
+        wire = response.raw.tell() if response.raw is not None else decoded
+        with self._lock:
+            self.request_count += 1
+            self.decoded_bytes += decoded
+            self.wire_bytes += wire
+
+    def stats(self):
+        """
+        Return transport counters.
+
+        :return: Dictionary with request, retry, connection reuse and compression statistics.
+        """
+        pool_requests = 0
+        new_connections = 0
+        for adapter in set(self.session.adapters.values()):
+            pools = adapter.poolmanager.pools
+            for key in pools.keys():
+                pool = pools.get(key)
+                if pool is None:
+                    continue
+                pool_requests += pool.num_requests
+                new_connections += pool.num_connections
+
+        with self._lock:
+            return {
+                "requests": self.request_count,
+                "retries": self.retry_count,
+                "new_connections": new_connections,
+                "connection_reuse_rate": 1 - new_connections / pool_requests if pool_requests else 0.0,
+                "wire_bytes": self.wire_bytes,
+                "decoded_bytes": self.decoded_bytes,
+                "bytes_saved_by_compression": max(self.decoded_bytes - self.wire_bytes, 0),
+                "rejected": self.rejected_count,
+            }
+
+    def close(self):
+        """
+        Close the pooled session and its connections.
+        """
+        self.session.close()
@@ -0,0 +1,235 @@
+import logging
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from Scraper.Metrics import REGISTRY
+
+CPU_COUNT = os.cpu_count() or 1
+DEFAULT_WORKERS = {
+    "extract": CPU_COUNT,
+    "deduplicate": 1,  # Serial, so near-duplicates in flight are checked against each other
+    "summarize": CPU_COUNT,
+    "embed": 4,
+    "store": 2,
+}
+# Stages that run on the process pool when processes are enabled; the others are I/O-bound and run on threads
+CPU_STAGES = ("extract", "summarize")
+
+STAGE_SECONDS = REGISTRY.histogram("ingest_stage_seconds", "Time spent on one item per ingestion stage", ("stage",))
+STAGE_ITEMS = REGISTRY.counter("ingest_stage_items_total", "Items handled per ingestion stage", ("stage", "outcome"))
+QUEUE_DEPTH = REGISTRY.gauge("ingest_queue_depth", "Items waiting in front of each ingestion stage", ("stage",))
+
+_STOP = object()
+_process_extractor = None
+
+
+def _init_process_worker(extractor_class):
+    # Each pool process builds its own extractor for the CPU stages, without storage or embedding clients
+    global _process_extractor
+    _process_extractor = extractor_class(
+        mongo_client=None, save_content=False, logger=logging.getLogger(__name__), use_embeddings=False
+    )
+
+
+def _run_in_process(method_name, *args):
+    # Histograms observed in the pool process are sent back with the result and merged by the parent
+    result = getattr(_process_extractor, method_name)(*args)
+    return result, REGISTRY.drain_histograms()
+
+
+class IngestionPipeline:
+    def __init__(self, content_extractor, workers=None, queue_size=32, use_processes=True, embed_batch_documents=8,
+                 logger=None):
+        """
+        Run the ingestion of fetched pages as independent stages connected by bounded queues.
+
+        Pages go through extract (parse + trafilatura), deduplicate (recrawl and near-duplicate
+        checks), summarize (LexRank + chunking), embed and store, each stage with its own
+        workers. Extract and summarize are CPU-bound and run on a process pool; the other
+        stages run on threads. Every queue holds at most `queue_size` items, so a slow stage
+        blocks the stages before it, down to the crawler: memory stays flat and throughput is
+        set by the slowest stage instead of the sum of all of them.
+
+        The embed stage takes up to `embed_batch_documents` waiting documents at a time, so the
+        summaries and chunks of several pages share embedding requests.
+
+        The pipeline is a drop-in content extractor for the crawlers: `extract_content_from_html`
+        enqueues the page and returns once there is room for it, and its `on_done` callback is
+        invoked once the page was stored, dropped or failed.
+
+        :param content_extractor: ContentExtractor whose stage methods are run.
+        :param workers: Optional dictionary overriding DEFAULT_WORKERS for some stages.
+        :param queue_size: Maximum number of items waiting in front of each stage.
+        :param use_processes: Whether to run the CPU stages on a process pool instead of threads.
+        :param embed_batch_documents: Maximum number of documents embedded together.
+        :param logger: Logger instance to log stage errors.
+        """
+        self.content_extractor = content_extractor
+        self.logger = logger or content_extractor.logger
+        self.workers = dict(DEFAULT_WORKERS, **(workers or {}))
+        self.process_pool = None
+        if use_processes:
+            # Spawned (not forked) processes do not inherit the crawler's threads and connections
+            self.process_pool = ProcessPoolExecutor(
+                max_workers=max(self.workers[stage] for stage in CPU_STAGES),
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_process_worker,
+                initargs=(type(content_extractor),)
+            )
+
+        self.stages = [
+            ("extract", self._extract),
+            ("deduplicate", self._deduplicate),
+            ("summarize", self._summarize),
+            ("embed", content_extractor.embed_documents),
+            ("store", content_extractor.store_document),
+        ]
+        # Stages whose handler takes a list of items and returns the list of results
+        self.batch_sizes = {"embed": embed_batch_documents}
+        self.queues = [queue.Queue(maxsize=queue_size) for _ in self.stages]
+        self._lock = threading.Lock()
+        self._done_callbacks = {}  # URL -> on_done callbacks of the pages in flight
+        self._stats = {name: {"processed": 0, "dropped": 0, "failed": 0, "busy_seconds": 0.0}
+                       for name, _ in self.stages}
+        self._threads = []
+        for index, (name, handler) in enumerate(self.stages):
+            output_queue = self.queues[index + 1] if index + 1 < len(self.stages) else None
+            stage_threads = [
+                threading.Thread(target=self._run_stage, args=(name, handler, self.queues[index], output_queue),
+                                 name=f"ingestion-{name}-{number}", daemon=True)
+                for number in range(self.workers[name])
+            ]
+            for thread in stage_threads:
+                thread.start()
+            self._threads.append(stage_threads)
+        self.closed = False
+
+    def _run_cpu(self, method_name, *args):
+        if self.process_pool:
+            result, observations = self.process_pool.submit(_run_in_process, method_name, *args).result()
+            REGISTRY.merge_histograms(observations)
+            return result
+        return getattr(self.content_extractor, method_name)(*args)
+
+    def _extract(self, item):
+        url, html_content = item
+        # Parsed trees cannot be sent to another process, so the pool gets the raw HTML
+        return self._run_cpu("extract_document", url, getattr(html_content, "html_content", html_content))
+
+    def _deduplicate(self, document):
+        return document if self.content_extractor.deduplicate_document(document) else None
+
+    def _summarize(self, document):
+        return self._run_cpu("summarize_document", document)
+
+    @staticmethod
+    def _take_batch(input_queue, first_item, batch_size):
+        # Take whatever is already waiting, up to batch_size items, without waiting for more
+        batch = [first_item]
+        while len(batch) < batch_size:
+            try:
+                item = input_queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is _STOP:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    def _run_stage(self, name, handler, input_queue, output_queue):
+        stats = self._stats[name]
+        batch_size = self.batch_sizes.get(name)
+        stopping = False
+        while not stopping:
+            item = input_queue.get()
+            if item is _STOP:
+                return
+            if batch_size:
+                items, stopping = self._take_batch(input_queue, item, batch_size)
+            else:
+                items = [item]
+            QUEUE_DEPTH.set(input_queue.qsize(), stage=name)
+            started = time.perf_counter()
+            try:
+                results = handler(items) if batch_size else [handler(item)]
+            except Exception as e:
+                urls = [item[0] if isinstance(item, tuple) else item.get("url") for item in items]
+                self.logger.error(f"Error in ingestion stage {name} for {', '.join(map(str, urls))}: {e}")
+                for url in urls:
+                    self.content_extractor.discard_document(url)
+                results = [None] * len(items)
+                outcome = "failed"
+            else:
+                # The last stage has no output, so only earlier stages drop items by returning None
+                outcome = None
+            elapsed = time.perf_counter() - started
+            STAGE_SECONDS.observe(elapsed, stage=name)
+            for item, result in zip(items, results):
+                result_outcome = outcome or ("dropped" if result is None and output_queue is not None else "processed")
+                STAGE_ITEMS.inc(stage=name, outcome=result_outcome)
+                with self._lock:
+                    stats[result_outcome] += 1
+                if result is not None and output_queue is not None:
+                    # Blocks while the next stage is full: this is the back-pressure
+                    output_queue.put(result)
+                else:
+                    # Stored, dropped or failed: the page has left the pipeline
+                    self._done(item[0] if isinstance(item, tuple) else item.get("url"))
+            with self._lock:
+                stats["busy_seconds"] += elapsed
+
+    def _done(self, url):
+        with self._lock:
+            callbacks = self._done_callbacks.pop(url, [])
+        for callback in callbacks:
+            callback()
+
+    def extract_content_from_html(self, url, html_content, on_done=None):
+        """
+        Queue a fetched page for ingestion, waiting while the first stage is full.
+
+        :param url: URL of the webpage.
+        :param html_content: The fetched HTML content of the webpage, or a ParsedPage.
+        :param on_done: Optional callable invoked (from a pipeline thread) once the page was stored,
+                        dropped or failed.
+        """
+        if self.closed:
+            raise RuntimeError("The ingestion pipeline is closed")
+        if on_done:
+            with self._lock:
+                self._done_callbacks.setdefault(url, []).append(on_done)
+        self.queues[0].put((url, html_content))
+
+    def stats(self):
+        """
+        Return per-stage counts, busy time and queue depth.
+
+        The stage with the highest busy time per worker is the one that sets the throughput.
+
+        :return: Dictionary mapping each stage to its statistics.
+        """
+        with self._lock:
+            return {
+                name: dict(self._stats[name], workers=self.workers[name], queued=self.queues[index].qsize())
+                for index, (name, _) in enumerate(self.stages)
+            }
+
+    def close(self):
+        """
+        Wait for every queued page to go through all stages, then stop the workers.
+        """
+        if self.closed:
+            return
+        self.closed = True
+        # Stop the stages in order, so each one has drained its input before the next stops
+        for stage_queue, stage_threads in zip(self.queues, self._threads):
+            for _ in stage_threads:
+                stage_queue.put(_STOP)
+            for thread in stage_threads:
+                thread.join()
+        if self.process_pool:
+            self.process_pool.shutdown(wait=True)
+        self.logger.info(f"Ingestion pipeline stats: {self.stats()}")
@@ -1,11 +1,12 @@
 from WebCrawler import WebCrawler
-import requests
-import pickle
-from bs4 import BeautifulSoup
-from datetime import datetime
-import os
+from Scraper.RecrawlCache import NOT_MODIFIED
+from Scraper.ParsedPage import ParsedPage
+from Scraper.CrawlFrontier import TopicFrontier
+from Scraper.PolitenessScheduler import RETRY_LATER
+from Scraper.TopicRouter import TopicRouter
 class LimitedWebCrawler(WebCrawler):
-    def __init__(self, homepage, max_seen_urls_per_topic=500, blacklist=None, logger=None):
+    def __init__(self, homepage, max_seen_urls_per_topic=500, blacklist=None, logger=None, request_timeout=30, state_store=None,
+                 transport=None, recrawl_cache=None, scheduler=None, canonicalizer=None, archive=None):
         """
         Initialize the limited web crawler system with a homepage, limits per topic, and optional blacklist.
         """
@@ -13,7 +14,14 @@ class LimitedWebCrawler(WebCrawler):
             homepage,
             max_seen_urls=max_seen_urls_per_topic * 6,  # Assuming 6 main topics
             blacklist=blacklist,
-            logger=logger
+            logger=logger,
+            request_timeout=request_timeout,
+            state_store=state_store,
+            transport=transport,
+            recrawl_cache=recrawl_cache,
+            scheduler=scheduler,
+            canonicalizer=canonicalizer,
+            archive=archive
         )
 
         # Topic-based tracking
@@ -28,6 +36,40 @@ class LimitedWebCrawler(WebCrawler):
         }
         self.max_seen_urls_per_topic = max_seen_urls_per_topic
 
+        # Route links to per-topic queues before fetching, so exhausted topics are not downloaded
+        self.topic_router = TopicRouter(self.topic_counts)
+        self.to_visit = self.new_frontier([self.homepage])
+
+    def new_frontier(self, urls=None):
+        """
+        Create a per-topic frontier that skips links of topics which reached their limit.
+
+        :param urls: Optional iterable of URLs to seed the frontier with.
+        :return: A new TopicFrontier.
+        """
+        return TopicFrontier(self.topic_counts, self.is_topic_limit_reached, self.topic_fill_ratio, urls)
+
+    def topic_fill_ratio(self, topic):
+        """
+        Return how full a topic is, relative to its limit.
+
+        :param topic: The topic to check.
+        :return: The topic's page count divided by the per-topic limit.
+        """
+        return self.topic_counts.get(topic, 0) / self.max_seen_urls_per_topic
+
+    def route_links(self, url, links_with_context):
+        """
+        Attach a topic hint to links whose topic can be inferred before fetching them.
+
+        :param url: URL of the page the links were found on.
+        :param links_with_context: Iterable of (link, section heading or None) tuples.
+        """
+        for link, section_text in links_with_context:
+            topic_hint = self.topic_router.infer(link, section_text=section_text, parent_url=url)
+            if topic_hint:
+                self.link_metadata[link] = {"topic_hint": topic_hint}
+
     def is_topic_limit_reached(self, topic):
         """
         Check if the limit for a specific topic has been reached.
@@ -46,6 +88,74 @@ class LimitedWebCrawler(WebCrawler):
         if topic in self.topic_counts:
             self.topic_counts[topic] += 1
 
+    def claim_topic(self, topic, url=None):
+        """
+        Count a page towards its topic if the topic is still under the limit.
+
+        :param topic: The topic of the page.
+        :param url: URL of the page (used by the distributed crawler to count each page once).
+        :return: True if the page may be processed, False if the topic limit has been reached.
+        """
+        if self.is_topic_limit_reached(topic):
+            return False
+        self.update_topic_count(topic)
+        return True
+
+    def should_continue(self):
+        """
+        Check whether any topic still has room for more pages.
+
+        :return: True if at least one topic limit has not been reached, False otherwise.
+        """
+        return not all(self.is_topic_limit_reached(topic) for topic in self.topic_counts)
+
+    def process_page(self, content_extractor, url, html_content):
+        """
+        Process a fetched page if its topic is still under the limit, and return its internal links.
+
+        :param content_extractor: An instance of ContentExtractor to process the content.
+        :param url: URL of the fetched page.
+        :param html_content: The fetched HTML content of the page.
+        :return: A list of internal links to add to the to_visit frontier.
+        """
+        if html_content is NOT_MODIFIED:
+            # The page is already in the corpus, so it still counts towards its topic
+            internal_links, topic = self.recrawl_cache.cached_page(url)
+            self.route_links(url, ((link, None) for link in internal_links))
+            if topic:
+                self.claim_topic(topic, url)
+            self.logger.info(f"Unchanged since last crawl, skipping extraction: {url}")
+            return internal_links
+
+        # Parse the page once and determine the topic
+        page = ParsedPage(url, html_content)
+        topic = self.determine_topic(page)
+
+        # Extract internal links before the content extractor, which may prune the tree
+        links_with_context = [
+            (link, self.section_heading(page, section)) for link, section in self.iter_internal_links(url, page)
+        ]
+        internal_links = [link for link, _ in links_with_context]
+        self.route_links(url, links_with_context)
+        canonical_url = self.resolve_canonical(url, page)
+
+        if canonical_url is None:
+            # Already stored under its canonical URL, so it must not count twice
+            self.remember_page(url, internal_links)
+        elif topic and self.claim_topic(topic, url):
+            self.logger.info(f"Processing {topic} content from {canonical_url}...")
+            # Only counts as unchanged on the next crawl once the extractor stored it
+            self.remember_page(url, internal_links, topic, stored_url=canonical_url)
+            self.hand_off(content_extractor, url, canonical_url, page, topic)
+        elif topic:
+            self.logger.info(f"Skipping {url}, topic limit reached.")
+            # Not stored, so a later crawl must fetch and process it rather than count it as unchanged
+            self.forget_page(url)
+        else:
+            self.logger.info(f"Skipping {url}, no valid topic identified.")
+            self.remember_page(url, internal_links)
+        return internal_links
+
     def crawl_and_process(self, content_extractor, log_frequency=100):
         """
         Crawl websites and process content, respecting the topic limits.
@@ -55,41 +165,28 @@ class LimitedWebCrawler(WebCrawler):
         """
         iteration_count = 0  # Initialize a counter to track iterations
 
-        while self.to_visit and not all(
-            self.is_topic_limit_reached(topic) for topic in self.topic_counts
-        ):
-            url = self.to_visit.pop(0)
+        while self.has_pending() and self.should_continue():
+            self.wait_for_deferred()
+            if not self.to_visit:
+                continue
+            url = self.next_url(iteration_count)
             if url in self.visited_links or url in self.blacklist:
+                self.finish_page(url, [])
                 continue
 
             self.logger.info(f"Visiting {url}...")
             self.visited_links.add(url)
 
-            try:
-                response = requests.get(url)
-                response.raise_for_status()
-                html_content = response.text
-            except requests.exceptions.RequestException as e:
-                self.logger.error(f"Error fetching {url}: {e}")
+            html_content = self.fetch_page(url)
+            if html_content is RETRY_LATER:
+                self.defer_page(url, self.scheduler.unreachable_retry)
+                continue
+            if html_content is None:
+                self.finish_page(url, [])
                 continue
 
-            # Extract content from the HTML and determine the topic
-            soup = BeautifulSoup(html_content, 'html.parser')
-            topic = self.determine_topic(soup)
-
-            if topic and not self.is_topic_limit_reached(topic):
-                self.logger.info(f"Processing {topic} content from {url}...")
-                content_extractor.extract_content_from_html(url, html_content)
-                self.update_topic_count(topic)
-
-                # Extract and add internal links to the list to visit next
-                internal_links = self.extract_internal_links(url, html_content)
-                self.to_visit.extend(internal_links)
-            else:
-                self.logger.info(f"Skipping {url}, topic limit reached or no valid topic identified.")
-                # Extract and add internal links to the list to visit next
-                internal_links = self.extract_internal_links(url, html_content)
-                self.to_visit.extend(internal_links)
+            internal_links = self.process_page(content_extractor, url, html_content)
+            self.finish_page(url, internal_links)
 
             # Increment the iteration count
             iteration_count += 1
@@ -98,46 +195,56 @@ class LimitedWebCrawler(WebCrawler):
             if iteration_count % log_frequency == 0:
                 self.log_progress()
 
+    def crawl_and_process_async(self, content_extractor, concurrency=16, per_host_concurrency=4,
+                                random_jump_frequency=None, log_frequency=100):
+        """
+        Crawl with up to `concurrency` fetches in flight, respecting the topic limits.
+
+        :param content_extractor: An instance of ContentExtractor to process the content.
+        :param concurrency: Maximum number of fetches in flight across all hosts.
+        :param per_host_concurrency: Maximum number of fetches in flight for a single host.
+        :param random_jump_frequency: How often to perform a random jump (None disables jumps).
+        :param log_frequency: How often (in processed pages) to log the topic count progress.
+        """
+        return super().crawl_and_process_async(
+            content_extractor,
+            concurrency=concurrency,
+            per_host_concurrency=per_host_concurrency,
+            random_jump_frequency=random_jump_frequency,
+            log_frequency=log_frequency
+        )
+
     def log_progress(self):
         """
         Log the current progress of how many pages have been scraped for each topic.
         """
-        self.logger.info("Current scraping progress:")
-        self.logger.info(f"Links Visited: {len(self.visited_links)}")
-        self.logger.info(f"Links Left to Visit: {len(self.to_visit)}")
+        super().log_progress()
         for topic, count in self.topic_counts.items():
             self.logger.info(f"Topic: {topic}, Pages scraped: {count}")
-        current_time = datetime.now().strftime('%Y_%m_%d_%H')
-        visited_link_pkl_file_name = f'visited_and_extracted_links_{current_time}.pkl'
-        pkl_save_path = os.path.join("/Users/eyalbenbarouch/Documents/My Stuff/Handyman_LLM_Agent/visitied_links",visited_link_pkl_file_name)
-        self.save_to_pkl(self.visited_links, pkl_save_path)
-    def save_to_pkl(self,data, filename):
-        """
-        Save the provided data to a pickle (.pkl) file.
 
-        Args:
-        - data: The data to be saved.
-        - filename: The name of the file where the data will be saved.
+    def section_heading(self, page, section):
         """
-        directory = os.path.dirname(filename)
+        Return the heading text of a sitemap section, used to route the section's links.
 
-        # Create the directory if it doesn't exist
-        if not os.path.exists(directory):
-            os.makedirs(directory)
+        :param page: ParsedPage the section belongs to.
+        :param section: Section element, or None for links found outside sitemap sections.
+        :return: The heading text, or None.
+        """
+        if section is None:
+            return None
+        headings = section.xpath(".//*[self::h1 or self::h2 or self::h3 or self::h4]")
+        heading = headings[0] if headings else page.find("a", root=section)
+        return heading.text_content().strip() if heading is not None else None
 
-        with open(filename, 'wb') as f:
-            pickle.dump(data, f)
-        self.logger.info(f"Visited Links pkl successfully saved to {filename}")
-    def determine_topic(self, soup):
+    def determine_topic(self, page):
         """
         Determine the topic from the parsed HTML content.
 
-        :param soup: BeautifulSoup object representing the parsed HTML content.
+        :param page: ParsedPage representing the parsed HTML content.
         :return: The identified topic as a string, or None if no valid topic is found.
         """
-        topic_tag = soup.find("a", {"class": "category"})
-        if topic_tag:
-            category_text = topic_tag.text.strip()
+        category_text = page.find_text("a", "category")
+        if category_text:
             if category_text in self.topic_counts:
                 return category_text
         self.logger.warning("No valid topic found for this page.")
@@ -1,16 +1,74 @@
 from datetime import datetime
 import os
+import re
+import socket
 from Scraper.LimitedWebCrawler import LimitedWebCrawler
+from Scraper.FrontierWorkerCrawler import FrontierWorkerCrawler
+from Scraper.FrontierService import FrontierService
+from Scraper.CrawlStateStore import CrawlStateStore
+from Scraper.RecrawlCache import RecrawlCache
+from Scraper.PageArchive import PageArchive
+from Scraper.NearDuplicateIndex import NearDuplicateIndex
 from Scraper.ContentExtractorV2 import ContentExtractor
+from Scraper.IngestionPipeline import IngestionPipeline
+from Scraper.Metrics import REGISTRY
 from ScrapeLogger import ScraperLogger
 from pymongo import MongoClient  # Add MongoClient for MongoDB
 from MongoDB.MongoClient import MongoDBClient  # Import MongoDBClient class
 
+# Instructables articles live directly under the site root, e.g. https://www.instructables.com/Some-Project/
+ARTICLE_URL_PATTERN = r"^https://www\.instructables\.com/[^/?#]+/?$"
+
 class LimitedWebScraper:
-    def __init__(self, homepage,mongo_uri, max_seen_urls_per_topic=500, blacklist=None, save_content=True, main_save_path=None, log_to_console=True):
+    def __init__(self, homepage,mongo_uri, max_seen_urls_per_topic=500, blacklist=None, save_content=True, main_save_path=None, log_to_console=True,
+                 concurrency=1, per_host_concurrency=4, state_path=None, resume=True, recrawl_cache_path=None,
+                 sitemap_urls=None, article_url_pattern=ARTICLE_URL_PATTERN, archive_pages=False, archive_path=None,
+                 near_duplicate_path=None, frontier_path=None, worker_id=None, worker_count=1, pipeline=False,
+                 pipeline_workers=None, pipeline_queue_size=32, metrics_port=None, metrics_path=None,
+                 metrics_interval=60):
         """
         Initialize the main web scraper with the homepage, limits, and configurations.
+
+        :param concurrency: Number of fetches to keep in flight; 1 keeps the serial crawl.
+        :param per_host_concurrency: Maximum number of concurrent fetches per host when concurrency > 1.
+        :param state_path: Path of the crawl state database (defaults to main_save_path/crawl_state.db).
+        :param resume: Whether to resume from the saved crawl state instead of starting over.
+        :param recrawl_cache_path: Path of the recrawl validator cache (defaults to main_save_path/recrawl_cache.db).
+        :param sitemap_urls: Optional sitemap.xml / sitemap-index URLs; if given, only the article URLs they
+                             list are crawled instead of walking the HTML sitemap pages from the homepage.
+        :param article_url_pattern: Regex that sitemap URLs must match to be fetched.
+        :param archive_pages: Whether to keep the raw HTML of fetched pages in a compressed archive for replay.
+        :param archive_path: Directory of the page archive (defaults to main_save_path/page_archive).
+        :param near_duplicate_path: Path of the near-duplicate fingerprint index (defaults to
+                                    main_save_path/near_duplicates.db; kept in memory without either).
+        :param frontier_path: Path of a shared FrontierService database; if given, this scraper runs as one
+                              worker of a distributed crawl and takes its URLs from there (see Scraper/distributed.py).
+        :param worker_id: Unique identifier of this worker in a distributed crawl (defaults to host name and process id).
+        :param worker_count: Number of workers in a distributed crawl, used to share the politeness rate.
+        :param pipeline: Whether to run extraction, summarisation, embedding and storage as concurrent stages
+                         behind bounded queues (see IngestionPipeline) instead of inline in the crawl loop.
+        :param pipeline_workers: Optional dictionary of worker counts per pipeline stage.
+        :param pipeline_queue_size: Maximum number of items waiting in front of each pipeline stage.
+        :param metrics_port: Optional port to serve the crawl and ingestion metrics on, in the Prometheus text format.
+        :param metrics_path: Path of the periodic JSON metrics snapshot (defaults to main_save_path/metrics.json).
+        :param metrics_interval: Seconds between two JSON metrics snapshots.
         """
+        self.sitemap_urls = sitemap_urls
+        self.article_url_pattern = re.compile(article_url_pattern) if article_url_pattern else None
+        self.concurrency = concurrency
+        self.per_host_concurrency = per_host_concurrency
+        self.frontier_service = FrontierService(frontier_path) if frontier_path else None
+        if self.frontier_service and worker_id is None:
+            # Same default as `python -m Scraper.distributed --worker`
+            worker_id = f"{socket.gethostname()}-{os.getpid()}"
+        self.worker_id = worker_id
+        self.metrics_port = metrics_port
+        if metrics_path is None and main_save_path:
+            # Every worker of a distributed crawl has its own metrics
+            metrics_file_name = f"metrics_{worker_id}.json" if self.frontier_service else "metrics.json"
+            metrics_path = os.path.join(main_save_path, metrics_file_name)
+        self.metrics_path = metrics_path
+        self.metrics_interval = metrics_interval
         current_time = datetime.now().strftime('%Y_%m_%d_%H_%M_%S')
         log_file_name = f'scrape_log_{current_time}.txt'
 
@@ -33,36 +91,133 @@ class LimitedWebScraper:
         else:
             self.mongo_client = None  # If no MongoDB URI is provided, disable MongoDB usage
 
+        # Crawl state store, so a killed run can be resumed where it stopped
+        # Workers of a distributed crawl keep their state in the shared frontier instead
+        if state_path is None and main_save_path and not self.frontier_service:
+            state_path = os.path.join(main_save_path, "crawl_state.db")
+        self.state_store = CrawlStateStore(state_path) if state_path else None
+        if self.state_store and not resume:
+            self.state_store.reset()
+
+        # Validator cache, so a refresh run only re-processes pages that changed
+        if recrawl_cache_path is None and main_save_path:
+            recrawl_cache_path = os.path.join(main_save_path, "recrawl_cache.db")
+        self.recrawl_cache = RecrawlCache(recrawl_cache_path) if recrawl_cache_path else None
+
+        # Raw HTML archive, so a changed extraction pipeline can be re-run without re-crawling
+        if archive_path is None and archive_pages and main_save_path:
+            archive_path = os.path.join(main_save_path, "page_archive")
+        if archive_path and self.frontier_service:
+            # The archive is append-only per process, so every worker writes its own
+            archive_path = os.path.join(archive_path, worker_id)
+        self.archive = PageArchive(archive_path) if archive_pages and archive_path else None
+
+        # Fingerprints of stored pages, so near-duplicates are not summarised and embedded again
+        if near_duplicate_path is None and main_save_path:
+            near_duplicate_path = os.path.join(main_save_path, "near_duplicates.db")
+        self.near_duplicate_index = NearDuplicateIndex(near_duplicate_path)
+
         # Crawler and content extractor initialization
-        self.crawler = LimitedWebCrawler(
-            homepage,
-            max_seen_urls_per_topic=max_seen_urls_per_topic,
-            blacklist=blacklist,
-            logger=self.logger,
-        )
+        if self.frontier_service:
+            self.crawler = FrontierWorkerCrawler(
+                homepage,
+                self.frontier_service,
+                worker_id,
+                worker_count=worker_count,
+                max_seen_urls_per_topic=max_seen_urls_per_topic,
+                blacklist=blacklist,
+                logger=self.logger,
+                recrawl_cache=self.recrawl_cache,
+                archive=self.archive,
+            )
+        else:
+            self.crawler = LimitedWebCrawler(
+                homepage,
+                max_seen_urls_per_topic=max_seen_urls_per_topic,
+                blacklist=blacklist,
+                logger=self.logger,
+                state_store=self.state_store,
+                recrawl_cache=self.recrawl_cache,
+                archive=self.archive,
+            )
+        if self.sitemap_urls:
+            # Sitemap discovery: the frontier is filled from the sitemaps and pages' links are not followed
+            self.crawler.to_visit = self.crawler.new_frontier()
+            self.crawler.follow_links = False
+        self.resumed = self.crawler.restore_state() if self.state_store else False
         self.extractor = ContentExtractor(
             mongo_client=self.mongo_client,  # Pass the MongoDB client to the extractor
             save_content=save_content,
             main_save_path=main_save_path,
             logger=self.logger,
-            use_embeddings=True
+            use_embeddings=True,
+            recrawl_cache=self.recrawl_cache,
+            near_duplicate_index=self.near_duplicate_index
         )
+        self.pipeline = IngestionPipeline(
+            self.extractor,
+            workers=pipeline_workers,
+            queue_size=pipeline_queue_size,
+            logger=self.logger
+        ) if pipeline else None
 
     def run(self):
         """
         Run the web scraper: Crawl the website and process content immediately.
         """
         self.logger.info("Starting crawling and processing content...")
+        metrics_server = REGISTRY.start_http_server(self.metrics_port) if self.metrics_port is not None else None
+        stop_metrics_snapshots = (
+            REGISTRY.start_snapshot_writer(self.metrics_path, self.metrics_interval) if self.metrics_path else None
+        )
+        # With a pipeline, the crawl loop only hands pages over and keeps fetching
+        extractor = self.pipeline or self.extractor
+
+        if self.frontier_service:
+            # Distributed worker: URLs come from the shared frontier seeded by the coordinator
+            self.crawler.crawl_and_process(extractor)
+        elif self.sitemap_urls and not self.resumed:
+            url_filter = self.article_url_pattern.match if self.article_url_pattern else None
+            self.crawler.seed_from_sitemaps(self.sitemap_urls, url_filter=url_filter)
 
-        while self.crawler.to_visit and not all(
+        while self.crawler.has_pending() and not all(
             self.crawler.is_topic_limit_reached(topic) for topic in self.crawler.topic_counts
         ):
             # Crawl and process the page
-            self.crawler.crawl_and_process(self.extractor)
+            if self.concurrency > 1:
+                self.crawler.crawl_and_process_async(
+                    extractor,
+                    concurrency=self.concurrency,
+                    per_host_concurrency=self.per_host_concurrency
+                )
+            else:
+                self.crawler.crawl_and_process(extractor)
 
         self.logger.info("Crawling finished. All topic limits reached or no more pages to visit.")
+        if self.pipeline:
+            # Drain the pages still in flight before closing the stores they write to
+            self.pipeline.close()
+            # Now that they are stored, record them as visited in the crawl state
+            self.crawler.record_ingested()
 
         if self.mongo_client:
             self.mongo_client.close()
+        if self.state_store:
+            self.state_store.close()
+        if self.frontier_service:
+            self.frontier_service.close()
+        if self.recrawl_cache:
+            self.recrawl_cache.close()
+        if self.archive:
+            self.archive.close()
+        self.logger.info(f"Near-duplicate stats: {self.near_duplicate_index.stats()}")
+        if self.extractor.use_embeddings:
+            self.logger.info(f"Embedding stats: {self.extractor.embedder.stats()}")
+        self.near_duplicate_index.close()
+        self.crawler.transport.close()
+        if stop_metrics_snapshots:
+            stop_metrics_snapshots()
+        if metrics_server:
+            metrics_server.shutdown()
 
 
@@ -0,0 +1,342 @@
+import json
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 96, 128, 256, 512, 1024)
+BYTE_BUCKETS = (1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+
+def _format_labels(label_names, label_values, extra=None):
+    pairs = list(zip(label_names, label_values)) + (extra or [])
+    if not pairs:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, value in pairs)
+    return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + "}"
+
+
+def _format_value(value):
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, documentation, label_names=()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        if set(labels) != set(self.label_names):
+            raise ValueError(f"Metric {self.name} expects labels {self.label_names}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.label_names)
+
+    def _label_dict(self, key):
+        return dict(zip(self.label_names, key))
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        """
+        Increase the counter.
+
+        :param amount: Non-negative amount to add.
+        :param labels: Value of each of the metric's labels.
+        """
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            return [(self.name, key, [], value) for key, value in self._values.items()]
+
+    def snapshot(self):
+        with self._lock:
+            return [dict(self._label_dict(key), value=value) for key, value in self._values.items()]
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def set(self, value, **labels):
+        """
+        Set the gauge to a value.
+
+        :param value: The current value.
+        :param labels: Value of each of the metric's labels.
+        """
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+    samples = Counter.samples
+    snapshot = Counter.snapshot
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, label_names=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, label_names)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+
+    def observe(self, value, **labels):
+        """
+        Record one observation.
+
+        :param value: The observed value (e.g. a duration in seconds or a size).
+        :param labels: Value of each of the metric's labels.
+        """
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = {"counts": [0] * len(self.buckets), "sum": 0.0, "count": 0}
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state["counts"][index] += 1
+                    break
+            state["sum"] += value
+            state["count"] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        """
+        Observe the duration of the wrapped block, in seconds.
+
+        :param labels: Value of each of the metric's labels.
+        """
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def _merge(self, key, state):
+        with self._lock:
+            current = self._values.get(key)
+            if current is None:
+                self._values[key] = {"counts": list(state["counts"]), "sum": state["sum"], "count": state["count"]}
+                return
+            current["counts"] = [a + b for a, b in zip(current["counts"], state["counts"])]
+            current["sum"] += state["sum"]
+            current["count"] += state["count"]
+
+    def samples(self):
+        samples = []
+        with self._lock:
+            for key, state in self._values.items():
+                cumulative = 0
+                for bound, count in zip(self.buckets, state["counts"]):
+                    cumulative += count
+                    samples.append((f"{self.name}_bucket", key, [("le", _format_value(bound))], cumulative))
+                samples.append((f"{self.name}_sum", key, [], state["sum"]))
+                samples.append((f"{self.name}_count", key, [], state["count"]))
+        return samples
+
+    def snapshot(self):
+        with self._lock:
+            return [
+                dict(self._label_dict(key), count=state["count"], sum=round(state["sum"], 6),
+                     mean=round(state["sum"] / state["count"], 6) if state["count"] else None,
+                     p50=self._quantile(state, 0.5), p99=self._quantile(state, 0.99))
+                for key, state in self._values.items()
+            ]
+
+    def _quantile(self, state, fraction):
+        # Upper bound of the bucket holding the quantile, like Prometheus' histogram_quantile without interpolation
+        rank = fraction * state["count"]
+        cumulative = 0
+        for bound, count in zip(self.buckets, state["counts"]):
+            cumulative += count
+            if count and cumulative >= rank:
+                return None if bound == math.inf else bound
+        return None
+
+
+class MetricsRegistry:
+    def __init__(self):
+        """
+        Hold the counters, gauges and histograms of a process and export them.
+
+        Metrics are created once (usually at module level) and looked up by name afterwards,
+        so modules can declare the same metric without coordinating. The registry renders the
+        Prometheus text format for a scrape endpoint and a JSON snapshot for periodic dumps.
+        """
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, metric_class, name, documentation, label_names, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = metric_class(name, documentation, label_names, **kwargs)
+            elif not isinstance(metric, metric_class) or metric.label_names != tuple(label_names):
+                raise ValueError(f"Metric {name} is already registered with another type or labels")
+            return metric
+
+    def counter(self, name, documentation, label_names=()):
+        """
+        Return the counter with this name, creating it if needed.
+
+        :param name: Metric name, e.g. "crawl_fetch_bytes_total".
+        :param documentation: One-line description of the metric.
+        :param label_names: Names of the metric's labels.
+        :return: The Counter.
+        """
+        return self._get_or_create(Counter, name, documentation, label_names)
+
+    def gauge(self, name, documentation, label_names=()):
+        """
+        Return the gauge with this name, creating it if needed.
+        """
+        return self._get_or_create(Gauge, name, documentation, label_names)
+
+    def histogram(self, name, documentation, label_names=(), buckets=DEFAULT_BUCKETS):
+        """
+        Return the histogram with this name, creating it if needed.
+
+        :param buckets: Upper bounds of the histogram's buckets.
+        """
+        return self._get_or_create(Histogram, name, documentation, label_names, buckets=buckets)
+
+    def metrics(self):
+        with self._lock:
+            return list(self._metrics.values())
+
+    def prometheus_text(self):
+        """
+        Render all metrics in the Prometheus text exposition format.
+
+        :return: The metrics as text.
+        """
+        lines = []
+        for metric in sorted(self.metrics(), key=lambda metric: metric.name):
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for sample_name, key, extra_labels, value in metric.samples():
+                lines.append(f"{sample_name}{_format_labels(metric.label_names, key, extra_labels)} "
+                             f"{_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+    def snapshot(self):
+        """
+        Return the current value of every metric, with count, mean and approximate p50/p99 for histograms.
+
+        :return: Dictionary mapping each metric name to a list of per-label-set values.
+        """
+        return {metric.name: metric.snapshot() for metric in sorted(self.metrics(), key=lambda metric: metric.name)}
+
+    def write_snapshot(self, path):
+        """
+        Atomically write a JSON snapshot of all metrics to a file.
+
+        :param path: Path of the JSON file.
+        """
+        temporary_path = f"{path}.tmp"
+        with open(temporary_path, "w") as snapshot_file:
+            json.dump({"timestamp": time.time(), "metrics": self.snapshot()}, snapshot_file, indent=2)
+        os.replace(temporary_path, path)
+
+    def drain_histograms(self):
+        """
+        Return the raw histogram state and reset it, so another process's registry can merge it.
+
+        :return: List of (name, label values, state) tuples.
+        """
+        drained = []
+        for metric in self.metrics():
+            if isinstance(metric, Histogram):
+                with metric._lock:
+                    drained.extend((metric.name, key, state) for key, state in metric._values.items())
+                    metric._values = {}
+        return drained
+
+    def merge_histograms(self, drained):
+        """
+        Add histogram observations drained from another process's registry.
+
+        :param drained: Output of `drain_histograms`.
+        """
+        for name, key, state in drained:
+            metric = self._metrics.get(name)
+            if isinstance(metric, Histogram):
+                metric._merge(key, state)
+
+    def start_http_server(self, port, host="0.0.0.0"):
+        """
+        Serve the metrics in the Prometheus text format on /metrics from a background thread.
+
+        :param port: Port to listen on (0 picks a free one).
+        :param host: Interface to listen on.
+        :return: The running ThreadingHTTPServer; call `shutdown()` on it to stop it.
+        """
+        registry = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?", 1)[0] not in ("/", "/metrics"):
+                    self.send_error(404)
+                    return
+                body = registry.prometheus_text().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        server = ThreadingHTTPServer((host, port), Handler)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+        return server
+
+    def start_snapshot_writer(self, path, interval=60):
+        """
+        Write a JSON snapshot to `path` every `interval` seconds from a background thread.
+
+        :param path: Path of the JSON file.
+        :param interval: Seconds between two snapshots.
+        :return: A function that writes a last snapshot and stops the writer.
+        """
+        stopped = threading.Event()
+
+        def write_periodically():
+            while not stopped.wait(interval):
+                self.write_snapshot(path)
+            self.write_snapshot(path)
+
+        thread = threading.Thread(target=write_periodically, name="metrics-snapshot", daemon=True)
+        thread.start()
+
+        def stop():
+            stopped.set()
+            thread.join()
+
+        return stop
+
+
+# Registry shared by the whole process
+REGISTRY = MetricsRegistry()
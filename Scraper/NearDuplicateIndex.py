@@ -0,0 +1,240 @@
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+
+FINGERPRINT_BITS = 64
+WORD_PATTERN = re.compile(r"\w+", re.UNICODE)
+# Document id returned by find_duplicate for pages that passed deduplication but are not stored yet
+PENDING = object()
+# Distributed workers share the database, so writers wait for each other like they do on the FrontierService
+BUSY_TIMEOUT_SECONDS = 60
+
+
+def simhash(text, shingle_size=3):
+    """
+    Compute the 64-bit SimHash fingerprint of a text.
+
+    Features are overlapping word shingles, so reordered boilerplate or a few edited words
+    only flip a few bits, while unrelated texts differ in about half of them.
+
+    :param text: Text to fingerprint.
+    :param shingle_size: Number of consecutive words per feature.
+    :return: The fingerprint as an unsigned 64-bit integer.
+    """
+    words = WORD_PATTERN.findall(text.lower())
+    if len(words) < shingle_size:
+        features = [" ".join(words)]
+    else:
+        features = (" ".join(words[i:i + shingle_size]) for i in range(len(words) - shingle_size + 1))
+
+    weights = [0] * FINGERPRINT_BITS
+    for feature in features:
+        feature_hash = int.from_bytes(hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest(), "big")
+        for bit in range(FINGERPRINT_BITS):
+            weights[bit] += 1 if feature_hash >> bit & 1 else -1
+
+    fingerprint = 0
+    for bit, weight in enumerate(weights):
+        if weight > 0:
+            fingerprint |= 1 << bit
+    return fingerprint
+
+
+def _to_signed(value):
+    # SQLite integers are signed 64-bit
+    return value - (1 << FINGERPRINT_BITS) if value >= 1 << (FINGERPRINT_BITS - 1) else value
+
+
+def _to_unsigned(value):
+    return value + (1 << FINGERPRINT_BITS) if value < 0 else value
+
+
+class NearDuplicateIndex:
+    def __init__(self, db_path=None, max_distance=3):
+        """
+        Initialize a SimHash index that finds near-duplicate pages.
+
+        Fingerprints are split into `max_distance + 1` bands; two fingerprints within
+        `max_distance` differing bits must agree on at least one whole band, so only pages
+        sharing a band are compared (LSH banding). Buckets are kept in memory, and fingerprints
+        are persisted in SQLite (if a path is given) so later crawls keep detecting duplicates
+        of pages stored earlier. Pages still being processed are reserved in memory only, and
+        persisted once they are stored with their document id. Before every lookup, fingerprints
+        that other processes (e.g. distributed workers) added to the database are loaded, so
+        duplicates across workers are caught within a run as well.
+
+        :param db_path: Optional path of the SQLite database file; the index is memory-only without it.
+        :param max_distance: Maximum number of differing bits for two pages to count as near-duplicates.
+        """
+        self.max_distance = max_distance
+        self.band_count = max_distance + 1
+        self.band_bits = -(-FINGERPRINT_BITS // self.band_count)
+        self._lock = threading.Lock()
+        self._buckets = [{} for _ in range(self.band_count)]  # Band value -> set of URLs, one dict per band
+        self._entries = {}  # URL -> (fingerprint, document id or PENDING)
+        self._replaced = {}  # Reserved URL -> its stored entry, restored if the reservation is released
+        self.duplicate_count = 0
+        self._synced_rowid = 0  # Last database row loaded into the in-memory buckets
+
+        self.connection = None
+        if db_path:
+            directory = os.path.dirname(db_path)
+            if directory and not os.path.exists(directory):
+                os.makedirs(directory)
+            self.connection = sqlite3.connect(db_path, timeout=BUSY_TIMEOUT_SECONDS, check_same_thread=False)
+            self.connection.execute("PRAGMA journal_mode=WAL")
+            self.connection.execute("""
+                CREATE TABLE IF NOT EXISTS fingerprints (
+                    url TEXT PRIMARY KEY,
+                    fingerprint INTEGER NOT NULL,
+                    document_id TEXT
+                )
+            """)
+            self.connection.commit()
+            self._sync()
+
+    def fingerprint(self, text):
+        """
+        Compute the fingerprint of a page's main text.
+
+        :param text: The extracted main text.
+        :return: The SimHash fingerprint.
+        """
+        return simhash(text)
+
+    def _bands(self, fingerprint):
+        mask = (1 << self.band_bits) - 1
+        return [fingerprint >> (band * self.band_bits) & mask for band in range(self.band_count)]
+
+    def _index(self, url, fingerprint, document_id):
+        self._unindex(url)
+        self._entries[url] = (fingerprint, document_id)
+        for buckets, band_value in zip(self._buckets, self._bands(fingerprint)):
+            buckets.setdefault(band_value, set()).add(url)
+
+    def _unindex(self, url):
+        entry = self._entries.pop(url, None)
+        if entry is None:
+            return
+        for buckets, band_value in zip(self._buckets, self._bands(entry[0])):
+            bucket = buckets.get(band_value)
+            if bucket is not None:
+                bucket.discard(url)
+                if not bucket:
+                    del buckets[band_value]
+
+    def _sync(self):
+        # Every write gets the highest rowid, so rows above the last one seen are new or changed fingerprints
+        if not self.connection:
+            return
+        rows = self.connection.execute(
+            "SELECT rowid, url, fingerprint, document_id FROM fingerprints WHERE rowid > ? ORDER BY rowid",
+            (self._synced_rowid,)
+        ).fetchall()
+        for rowid, url, fingerprint, document_id in rows:
+            entry = (_to_unsigned(fingerprint), document_id)
+            current = self._entries.get(url)
+            if current is not None and current[1] is PENDING:
+                # Keep this process's reservation; the stored entry is restored if it is released
+                self._replaced[url] = entry
+            else:
+                self._index(url, *entry)
+            self._synced_rowid = rowid
+
+    def find_duplicate(self, fingerprint, exclude_url=None):
+        """
+        Find the closest indexed page within `max_distance` differing bits.
+
+        :param fingerprint: Fingerprint of the page to check.
+        :param exclude_url: URL to ignore (the page itself, when it is re-processed).
+        :return: Tuple of (URL, document id) of the closest near-duplicate, or None. The document id
+                 is PENDING if that page is reserved but not stored yet.
+        """
+        with self._lock:
+            self._sync()
+            candidates = set()
+            for buckets, band_value in zip(self._buckets, self._bands(fingerprint)):
+                candidates.update(buckets.get(band_value, ()))
+            candidates.discard(exclude_url)
+
+            best = None
+            for url in candidates:
+                candidate_fingerprint, document_id = self._entries[url]
+                distance = bin(candidate_fingerprint ^ fingerprint).count("1")
+                # Ties go to the smallest URL, so the result does not depend on set order
+                if distance <= self.max_distance and (best is None or (distance, url) < best[:2]):
+                    best = (distance, url, document_id)
+            if best is None:
+                return None
+            self.duplicate_count += 1
+            return best[1], best[2]
+
+    def reserve(self, url, fingerprint):
+        """
+        Index a page that is still being processed, in memory only.
+
+        Near-duplicates of it found in the meantime get PENDING as its document id.
+
+        :param url: URL of the page.
+        :param fingerprint: Fingerprint of the page's main text.
+        """
+        with self._lock:
+            entry = self._entries.get(url)
+            if entry is not None and entry[1] is not PENDING:
+                self._replaced[url] = entry
+            self._index(url, fingerprint, PENDING)
+
+    def release(self, url):
+        """
+        Drop the reservation of a page that was not stored, restoring its previously stored entry if any.
+
+        :param url: URL of the page.
+        """
+        with self._lock:
+            entry = self._entries.get(url)
+            if entry is None or entry[1] is not PENDING:
+                return
+            self._unindex(url)
+            previous = self._replaced.pop(url, None)
+            if previous is not None:
+                self._index(url, *previous)
+
+    def add(self, url, fingerprint, document_id=None):
+        """
+        Index a stored page so later near-duplicates refer to it.
+
+        :param url: URL of the page.
+        :param fingerprint: Fingerprint of the page's main text.
+        :param document_id: Identifier of the stored document (e.g. its MongoDB id), if any.
+        """
+        document_id = str(document_id) if document_id is not None else None
+        with self._lock:
+            self._replaced.pop(url, None)
+            self._index(url, fingerprint, document_id)
+            if self.connection:
+                with self.connection:
+                    # A rewritten row gets a rowid above every other one, so other processes pick it up in `_sync`
+                    self.connection.execute(
+                        "INSERT OR REPLACE INTO fingerprints (rowid, url, fingerprint, document_id) "
+                        "VALUES ((SELECT COALESCE(MAX(rowid), 0) + 1 FROM fingerprints), ?, ?, ?)",
+                        (url, _to_signed(fingerprint), document_id)
+                    )
+
+    def stats(self):
+        """
+        Return near-duplicate detection statistics.
+
+        :return: Dictionary with the number of indexed pages and of duplicates found in this run.
+        """
+        with self._lock:
+            return {"indexed": len(self._entries), "duplicates_found": self.duplicate_count}
+
+    def close(self):
+        """
+        Close the underlying database connection, if any.
+        """
+        if self.connection:
+            with self._lock:
+                self.connection.close()
@@ -0,0 +1,198 @@
+import gzip
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime, timezone
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+DEFAULT_CODEC = "zstd" if zstandard is not None else "gzip"
+
+
+class PageArchive:
+    def __init__(self, archive_dir, codec=DEFAULT_CODEC, compression_level=3):
+        """
+        Initialize a compressed, append-only archive of fetched pages.
+
+        Every page is written as a WARC-like record (a small header block followed by the HTML),
+        compressed on its own (zstd when `zstandard` is installed, gzip otherwise) and appended to
+        a single data file, so the file is a valid multi-frame zstd / multi-member gzip stream.
+        A SQLite index maps each URL to the offset of its records, which allows both random
+        access by URL and sequential replay of the whole corpus without touching the network.
+        A page whose body did not change since its last record is not archived again.
+
+        :param archive_dir: Directory holding the data file and its index.
+        :param codec: Compression codec for new records, "zstd" or "gzip".
+        :param compression_level: Compression level passed to the codec.
+        """
+        if codec == "zstd" and zstandard is None:
+            raise ValueError("The zstd codec requires the zstandard package")
+        if codec not in ("zstd", "gzip"):
+            raise ValueError(f"Unknown archive codec: {codec}")
+        if not os.path.exists(archive_dir):
+            os.makedirs(archive_dir)
+
+        self.archive_dir = archive_dir
+        self.codec = codec
+        self.compression_level = compression_level
+        self._compressor = zstandard.ZstdCompressor(level=compression_level) if codec == "zstd" else None
+        self.data_path = os.path.join(archive_dir, "pages.archive")
+        # Fetch threads append concurrently, so writes are serialized
+        self._lock = threading.Lock()
+        self._data_file = open(self.data_path, "ab")
+        self.connection = sqlite3.connect(os.path.join(archive_dir, "index.db"), check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.executescript("""
+            CREATE TABLE IF NOT EXISTS records (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                url TEXT NOT NULL,
+                offset INTEGER NOT NULL,
+                length INTEGER NOT NULL,
+                codec TEXT NOT NULL,
+                body_hash TEXT NOT NULL,
+                content_type TEXT,
+                fetched_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS records_url ON records (url, seq);
+        """)
+        self.connection.commit()
+
+        self.appended_count = 0
+        self.unchanged_count = 0
+        self.raw_bytes = 0
+        self.compressed_bytes = 0
+
+    def _compress(self, data):
+        if self._compressor is not None:
+            return self._compressor.compress(data)
+        return gzip.compress(data, compresslevel=self.compression_level)
+
+    @staticmethod
+    def _decompress(codec, data):
+        if codec == "zstd":
+            if zstandard is None:
+                raise ValueError("Reading zstd archive records requires the zstandard package")
+            return zstandard.ZstdDecompressor().decompress(data)
+        return gzip.decompress(data)
+
+    def append(self, url, html_content, content_type=None):
+        """
+        Append a fetched page to the archive.
+
+        :param url: URL of the page.
+        :param html_content: The fetched HTML content of the page.
+        :param content_type: Content-Type response header, if any.
+        :return: True if a record was written, False if the body matches the URL's latest record.
+        """
+        body = html_content.encode()
+        body_hash = hashlib.sha256(body).hexdigest()
+        fetched_at = time.time()
+        header = (
+            "WARC/1.0\r\n"
+            "WARC-Type: response\r\n"
+            f"WARC-Target-URI: {url}\r\n"
+            f"WARC-Date: {datetime.fromtimestamp(fetched_at, timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')}\r\n"
+            f"WARC-Payload-Digest: sha256:{body_hash}\r\n"
+            f"Content-Type: {content_type or 'text/html'}\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            "\r\n"
+        ).encode()
+
+        with self._lock:
+            latest = self.connection.execute(
+                "SELECT body_hash FROM records WHERE url = ? ORDER BY seq DESC LIMIT 1", (url,)
+            ).fetchone()
+            if latest is not None and latest[0] == body_hash:
+                self.unchanged_count += 1
+                return False
+
+            record = self._compress(header + body + b"\r\n\r\n")
+            offset = self._data_file.tell()
+            self._data_file.write(record)
+            self._data_file.flush()
+            # The index row is only written once the record is on disk, so it never points past the data
+            with self.connection:
+                self.connection.execute(
+                    "INSERT INTO records (url, offset, length, codec, body_hash, content_type, fetched_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (url, offset, len(record), self.codec, body_hash, content_type, fetched_at)
+                )
+            self.appended_count += 1
+            self.raw_bytes += len(header) + len(body)
+            self.compressed_bytes += len(record)
+        return True
+
+    @staticmethod
+    def _parse_record(data):
+        header, _, rest = data.partition(b"\r\n\r\n")
+        length = next(
+            int(line.split(b":", 1)[1]) for line in header.split(b"\r\n") if line.lower().startswith(b"content-length:")
+        )
+        return rest[:length].decode("utf-8")
+
+    def get(self, url):
+        """
+        Return the latest archived HTML of a URL.
+
+        :param url: URL to look up.
+        :return: The archived HTML content, or None if the URL was never archived.
+        """
+        with self._lock:
+            row = self.connection.execute(
+                "SELECT offset, length, codec FROM records WHERE url = ? ORDER BY seq DESC LIMIT 1", (url,)
+            ).fetchone()
+        if row is None:
+            return None
+        offset, length, codec = row
+        with open(self.data_path, "rb") as data_file:
+            data_file.seek(offset)
+            return self._parse_record(self._decompress(codec, data_file.read(length)))
+
+    def iter_pages(self):
+        """
+        Yield the latest archived version of every URL, in archive order.
+
+        Records are read sequentially from the data file, so replay runs at disk speed.
+
+        :return: Generator of (URL, HTML content) tuples.
+        """
+        with self._lock:
+            rows = self.connection.execute(
+                "SELECT url, offset, length, codec FROM records "
+                "WHERE seq IN (SELECT MAX(seq) FROM records GROUP BY url) ORDER BY seq"
+            ).fetchall()
+        with open(self.data_path, "rb") as data_file:
+            for url, offset, length, codec in rows:
+                data_file.seek(offset)
+                yield url, self._parse_record(self._decompress(codec, data_file.read(length)))
+
+    def __len__(self):
+        with self._lock:
+            return self.connection.execute("SELECT COUNT(DISTINCT url) FROM records").fetchone()[0]
+
+    def stats(self):
+        """
+        Return archive statistics for this run.
+
+        :return: Dictionary with appended and unchanged record counts and the compression ratio.
+        """
+        with self._lock:
+            return {
+                "codec": self.codec,
+                "appended": self.appended_count,
+                "unchanged": self.unchanged_count,
+                "compression_ratio": round(self.raw_bytes / self.compressed_bytes, 2) if self.compressed_bytes else None,
+            }
+
+    def close(self):
+        """
+        Close the data file and the index.
+        """
+        with self._lock:
+            self._data_file.close()
+            self.connection.close()
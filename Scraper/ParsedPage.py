@@ -0,0 +1,110 @@
+from urllib.parse import urljoin
+
+import lxml.etree
+import lxml.html
+
+from Scraper.Metrics import REGISTRY
+
+PARSE_SECONDS = REGISTRY.histogram("crawl_parse_seconds", "Duration of HTML parsing")
+
+
+def _class_xpath(tag, class_name):
+    # Match a single token of the class attribute, like BeautifulSoup's class_ filter
+    return f'.//{tag}[contains(concat(" ", normalize-space(@class), " "), " {class_name} ")]'
+
+
+class ParsedPage:
+    def __init__(self, url, html_content):
+        """
+        Wrap a fetched page so that it is parsed only once.
+
+        The page is parsed lazily with lxml on first access, and the same tree is shared by topic
+        detection, link extraction, metadata extraction and trafilatura's main-text extraction.
+        trafilatura may prune the tree it is given, so main-text extraction should run last.
+
+        :param url: URL of the page.
+        :param html_content: The fetched HTML content of the page.
+        """
+        self.url = url
+        self.html_content = html_content
+        self._tree = None
+
+    @property
+    def tree(self):
+        """
+        Return the parsed lxml tree of the page, parsing it on first access.
+        """
+        if self._tree is None:
+            with PARSE_SECONDS.time():
+                self._tree = self._parse(self.html_content)
+        return self._tree
+
+    @staticmethod
+    def _parse(html_content):
+        # Always parse a whole document: fromstring() returns a lone element for fragment-like input,
+        # and ".//a" queries would then miss the root itself
+        try:
+            return lxml.html.document_fromstring(html_content)
+        except ValueError:
+            # lxml refuses str input that carries an XML encoding declaration
+            return lxml.html.document_fromstring(html_content.encode("utf-8"))
+        except lxml.etree.ParserError:
+            # Empty or unparsable document
+            return lxml.html.document_fromstring("<html></html>")
+
+    def find(self, tag, class_name=None, root=None):
+        """
+        Find the first element with the given tag (and class, if provided).
+
+        :param tag: Tag name to look for.
+        :param class_name: Optional CSS class the element must have.
+        :param root: Element to search under (defaults to the whole page).
+        :return: The first matching element, or None.
+        """
+        matches = self.find_all(tag, class_name, root)
+        return matches[0] if matches else None
+
+    def find_all(self, tag, class_name=None, root=None):
+        """
+        Find all elements with the given tag (and class, if provided).
+
+        :param tag: Tag name to look for.
+        :param class_name: Optional CSS class the elements must have.
+        :param root: Element to search under (defaults to the whole page).
+        :return: A list of matching elements in document order.
+        """
+        root = self.tree if root is None else root
+        xpath = _class_xpath(tag, class_name) if class_name else f".//{tag}"
+        return root.xpath(xpath)
+
+    def find_text(self, tag, class_name=None):
+        """
+        Return the stripped text of the first element with the given tag and class.
+
+        :param tag: Tag name to look for.
+        :param class_name: Optional CSS class the element must have.
+        :return: The element's text, or None if no element matches.
+        """
+        element = self.find(tag, class_name)
+        return element.text_content().strip() if element is not None else None
+
+    def canonical_url(self):
+        """
+        Return the absolute URL declared by the page's `<link rel="canonical">` tag.
+
+        :return: The canonical URL, or None if the page does not declare one.
+        """
+        hrefs = self.tree.xpath('//link[@rel="canonical"]/@href', smart_strings=False)
+        href = hrefs[0].strip() if hrefs else ""
+        return urljoin(self.url, href) if href else None
+
+    def hrefs(self, root=None):
+        """
+        Return the href values of all links under an element.
+
+        :param root: Element to search under (defaults to the whole page).
+        :return: A list of href strings in document order.
+        """
+        root = self.tree if root is None else root
+        # Plain strings, so stored links do not keep the whole tree alive
+        return root.xpath(".//a/@href", smart_strings=False)
@@ -0,0 +1,238 @@
+import threading
+import time
+from urllib.parse import urlparse
+from urllib.robotparser import RobotFileParser
+
+import requests
+
+from Scraper.TokenBucket import TokenBucket
+
+THROTTLE_STATUS_CODES = {429, 503}
+DEFAULT_INITIAL_RATE = 2.0
+DEFAULT_MIN_RATE = 0.1
+DEFAULT_MAX_RATE = 10.0
+# Returned instead of a delay while a domain's robots.txt is unreachable and no earlier rules are known:
+# the URL is not disallowed, it must be tried again once robots.txt can be fetched
+RETRY_LATER = object()
+
+
+class _DomainState:
+    def __init__(self, rate, max_rate, robots, robots_expires_at):
+        self.lock = threading.Lock()
+        self.rate = rate
+        self.max_rate = max_rate
+        self.bucket = TokenBucket(rate, capacity=1)
+        self.robots = robots
+        self.robots_expires_at = robots_expires_at
+        self.robots_unreachable = False  # True while the rules are a disallow-all placeholder
+        self.latency = None
+        self.throttled_count = 0
+
+
+class PolitenessScheduler:
+    def __init__(self, transport, user_agent="*", initial_rate=DEFAULT_INITIAL_RATE, min_rate=DEFAULT_MIN_RATE,
+                 max_rate=DEFAULT_MAX_RATE, target_latency=1.0, robots_ttl=3600, unreachable_retry=300, logger=None):
+        """
+        Initialize a per-domain politeness scheduler.
+
+        Every domain gets a token bucket (no bursts) whose rate adapts to the server: it grows
+        additively while responses are fast, and is halved on 429/503, timeouts or slow responses.
+        The rate is capped by the robots.txt `Crawl-delay` / `Request-rate`, and URLs disallowed
+        by robots.txt are never fetched. robots.txt files are cached for `robots_ttl` seconds.
+
+        As RFC 9309 requires, a robots.txt that is unavailable (4xx) allows everything, while an
+        unreachable one (5xx or network error) disallows everything, or keeps the previously
+        fetched rules, until it is fetched again after `unreachable_retry` seconds. URLs held back
+        only because robots.txt is unreachable get RETRY_LATER from `reserve` and `wait`, so the
+        crawler can queue them again instead of dropping them. robots.txt is fetched outside the
+        scheduler-wide lock, so a slow server only delays its own domain.
+
+        :param transport: HttpTransport used to fetch robots.txt.
+        :param user_agent: User agent name matched against robots.txt rules.
+        :param initial_rate: Starting request rate per domain, in requests per second.
+        :param min_rate: Lowest request rate per domain.
+        :param max_rate: Highest request rate per domain.
+        :param target_latency: Response time (seconds) below which the rate keeps growing.
+        :param robots_ttl: How long a fetched robots.txt is cached, in seconds.
+        :param unreachable_retry: How long to wait before fetching an unreachable robots.txt again, in seconds.
+        :param logger: Logger instance to log rate changes.
+        """
+        self.transport = transport
+        self.user_agent = user_agent
+        self.initial_rate = initial_rate
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.target_latency = target_latency
+        self.robots_ttl = robots_ttl
+        self.unreachable_retry = unreachable_retry
+        self.logger = logger
+        self._domains = {}
+        self._robots_locks = {}  # Domain -> lock held while its robots.txt is fetched
+        self._domains_lock = threading.Lock()
+
+    def _domain_state(self, url):
+        parsed = urlparse(url)
+        domain = parsed.netloc.lower()
+        with self._domains_lock:
+            state = self._domains.get(domain)
+            if state is not None and time.monotonic() < state.robots_expires_at:
+                return state
+            robots_lock = self._robots_locks.setdefault(domain, threading.Lock())
+
+        # Only requests to this domain wait for its robots.txt; while it is refreshed they keep the old rules
+        if not robots_lock.acquire(blocking=state is None):
+            return state
+        try:
+            with self._domains_lock:
+                state = self._domains.get(domain)
+                if state is not None and time.monotonic() < state.robots_expires_at:
+                    return state
+
+            robots, reachable = self._fetch_robots(f"{parsed.scheme}://{parsed.netloc}/robots.txt")
+            # Without earlier rules, the disallow-all answer only holds until robots.txt is reachable
+            unreachable = not reachable and (state is None or state.robots_unreachable)
+            if not reachable and state is not None:
+                # Keep the rules fetched before the server became unreachable
+                robots = state.robots
+            expires_at = time.monotonic() + (self.robots_ttl if reachable else self.unreachable_retry)
+            max_rate = self.max_rate
+            crawl_delay = robots.crawl_delay(self.user_agent)
+            request_rate = robots.request_rate(self.user_agent)
+            if crawl_delay:
+                max_rate = min(max_rate, 1.0 / float(crawl_delay))
+            if request_rate and request_rate.seconds:
+                max_rate = min(max_rate, request_rate.requests / request_rate.seconds)
+            max_rate = max(max_rate, self.min_rate)
+
+            if state is None:
+                state = _DomainState(min(self.initial_rate, max_rate), max_rate, robots, expires_at)
+                state.robots_unreachable = unreachable
+                with self._domains_lock:
+                    self._domains[domain] = state
+            else:
+                with state.lock:
+                    state.robots = robots
+                    state.robots_expires_at = expires_at
+                    state.robots_unreachable = unreachable
+                    state.max_rate = max_rate
+                    self._set_rate(domain, state, min(state.rate, max_rate))
+            return state
+        finally:
+            robots_lock.release()
+
+    def _fetch_robots(self, robots_url):
+        # Returns the parsed rules and whether robots.txt was reachable
+        robots = RobotFileParser(robots_url)
+        try:
+            response = self.transport.get(robots_url)
+        except requests.exceptions.RequestException as e:
+            if self.logger:
+                self.logger.warning(f"Could not fetch {robots_url}, disallowing all: {e}")
+            robots.disallow_all = True
+            return robots, False
+
+        if response.status_code >= 500:
+            if self.logger:
+                self.logger.warning(f"{robots_url} answered {response.status_code}, disallowing all")
+            robots.disallow_all = True
+            return robots, False
+        if response.status_code in (401, 403):
+            robots.disallow_all = True
+        elif response.status_code >= 400:
+            robots.allow_all = True
+        else:
+            robots.parse(response.text.splitlines())
+        return robots, True
+
+    def can_fetch(self, url):
+        """
+        Check whether robots.txt allows fetching a URL.
+
+        :param url: URL to check.
+        :return: True if the URL may be fetched, False otherwise.
+        """
+        return self._domain_state(url).robots.can_fetch(self.user_agent, url)
+
+    def reserve(self, url):
+        """
+        Reserve the next request slot for the URL's domain.
+
+        :param url: URL about to be fetched.
+        :return: Delay in seconds before the request may be sent, None if robots.txt disallows the URL,
+                 or RETRY_LATER if robots.txt is unreachable.
+        """
+        state = self._domain_state(url)
+        if state.robots_unreachable:
+            if self.logger:
+                self.logger.info(f"robots.txt unreachable, retrying later: {url}")
+            return RETRY_LATER
+        if not state.robots.can_fetch(self.user_agent, url):
+            if self.logger:
+                self.logger.info(f"Disallowed by robots.txt, skipping {url}")
+            return None
+        return state.bucket.reserve()
+
+    def wait(self, url):
+        """
+        Block until the URL's domain may be requested again.
+
+        :param url: URL about to be fetched.
+        :return: True once the request may be sent, False if robots.txt disallows the URL,
+                 or RETRY_LATER if robots.txt is unreachable.
+        """
+        delay = self.reserve(url)
+        if delay is RETRY_LATER:
+            return RETRY_LATER
+        if delay is None:
+            return False
+        if delay:
+            time.sleep(delay)
+        return True
+
+    def record(self, url, status_code, latency):
+        """
+        Adapt the domain's rate to the outcome of a request.
+
+        :param url: URL that was fetched.
+        :param status_code: HTTP status code, or None if the request failed or timed out.
+        :param latency: Response time in seconds.
+        """
+        domain = urlparse(url).netloc.lower()
+        state = self._domain_state(url)
+        with state.lock:
+            state.latency = latency if state.latency is None else 0.8 * state.latency + 0.2 * latency
+            if status_code is None or status_code in THROTTLE_STATUS_CODES:
+                state.throttled_count += 1
+                new_rate = state.rate / 2
+            elif state.latency > 2 * self.target_latency:
+                new_rate = state.rate * 0.9
+            elif state.latency < self.target_latency and status_code < 400:
+                new_rate = state.rate + 0.1 * self.initial_rate
+            else:
+                return
+            self._set_rate(domain, state, new_rate)
+
+    def _set_rate(self, domain, state, rate):
+        rate = min(max(rate, self.min_rate), state.max_rate)
+        if rate < state.rate and self.logger:
+            self.logger.info(f"Slowing down {domain} to {rate:.2f} requests/s")
+        state.rate = rate
+        state.bucket.set_rate(rate)
+
+    def rates(self):
+        """
+        Return the current per-domain scheduling state.
+
+        :return: Dictionary mapping each domain to its rate, rate cap, smoothed latency and throttle count.
+        """
+        with self._domains_lock:
+            domains = list(self._domains.items())
+        return {
+            domain: {
+                "rate": round(state.rate, 3),
+                "max_rate": round(state.max_rate, 3),
+                "latency": round(state.latency, 3) if state.latency is not None else None,
+                "throttled": state.throttled_count,
+            }
+            for domain, state in domains
+        }
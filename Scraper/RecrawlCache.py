@@ -0,0 +1,245 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+
+# Returned by the crawler's fetch_page when a page has not changed since the last crawl
+NOT_MODIFIED = object()
+# Distributed workers share the database, so writers wait for each other like they do on the FrontierService
+BUSY_TIMEOUT_SECONDS = 60
+
+
+class RecrawlCache:
+    def __init__(self, db_path):
+        """
+        Initialize a per-URL validator cache for incremental recrawls.
+
+        For every crawled URL the cache keeps the HTTP validators (ETag / Last-Modified),
+        a hash of the response body, a hash of the extracted content, and the page's outgoing
+        links and topic. A refresh run can then send conditional requests and skip the whole
+        extraction pipeline for pages that did not change, while still following their links.
+
+        The validators of a page handed to the content extractor are held in memory until the
+        extractor records the page's content hash, so a page whose ingestion failed is never
+        treated as unchanged.
+
+        :param db_path: Path of the SQLite database file.
+        """
+        directory = os.path.dirname(db_path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+
+        self.db_path = db_path
+        # The cache is shared by fetch and processing threads, so access is serialized
+        self._lock = threading.Lock()
+        self.connection = sqlite3.connect(db_path, timeout=BUSY_TIMEOUT_SECONDS, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("""
+            CREATE TABLE IF NOT EXISTS pages (
+                url TEXT PRIMARY KEY,
+                etag TEXT,
+                last_modified TEXT,
+                body_hash TEXT,
+                content_hash TEXT,
+                topic TEXT,
+                links TEXT,
+                lastmod TEXT,
+                updated_at REAL
+            )
+        """)
+        # Caches created before sitemap discovery have no lastmod column
+        columns = {row[1] for row in self.connection.execute("PRAGMA table_info(pages)")}
+        if "lastmod" not in columns:
+            self.connection.execute("ALTER TABLE pages ADD COLUMN lastmod TEXT")
+        self.connection.commit()
+        self._pending = {}  # Stored URL -> fetch records waiting for the page to be stored
+
+        self.not_modified_count = 0
+        self.unchanged_body_count = 0
+        self.unchanged_content_count = 0
+        self.unchanged_lastmod_count = 0
+
+    def get(self, url):
+        """
+        Return the cached record for a URL.
+
+        :param url: URL to look up.
+        :return: Dictionary with the cached fields, or None if the URL was never recorded.
+        """
+        with self._lock:
+            row = self.connection.execute(
+                "SELECT etag, last_modified, body_hash, content_hash, topic, links, lastmod FROM pages WHERE url = ?",
+                (url,)
+            ).fetchone()
+        if row is None:
+            return None
+        etag, last_modified, body_hash, content_hash, topic, links, lastmod = row
+        return {
+            "etag": etag,
+            "last_modified": last_modified,
+            "body_hash": body_hash,
+            "content_hash": content_hash,
+            "topic": topic,
+            "links": json.loads(links) if links is not None else None,
+            "lastmod": lastmod,
+        }
+
+    def conditional_headers(self, url):
+        """
+        Build the conditional request headers for a URL.
+
+        Headers are only sent for pages whose links were recorded, so a 304 response can
+        always be answered from the cache.
+
+        :param url: URL about to be fetched.
+        :return: Dictionary of If-None-Match / If-Modified-Since headers (possibly empty).
+        """
+        record = self.get(url)
+        if record is None or record["links"] is None:
+            return {}
+        headers = {}
+        if record["etag"]:
+            headers["If-None-Match"] = record["etag"]
+        if record["last_modified"]:
+            headers["If-Modified-Since"] = record["last_modified"]
+        return headers
+
+    def cached_page(self, url):
+        """
+        Return the cached links and topic of a page that was answered with 304 or an unchanged body.
+
+        :param url: URL of the unchanged page.
+        :return: Tuple of (list of links, topic or None).
+        """
+        record = self.get(url) or {"links": None, "topic": None}
+        return record["links"] or [], record["topic"]
+
+    def record_not_modified(self):
+        """
+        Count a 304 Not Modified response.
+        """
+        with self._lock:
+            self.not_modified_count += 1
+
+    def is_body_unchanged(self, url, body_hash):
+        """
+        Check whether a freshly fetched body is identical to the cached one.
+
+        :param url: URL of the fetched page.
+        :param body_hash: Hash of the fetched response body.
+        :return: True if the body did not change since the last crawl, False otherwise.
+        """
+        record = self.get(url)
+        unchanged = record is not None and record["body_hash"] == body_hash
+        if unchanged:
+            with self._lock:
+                self.unchanged_body_count += 1
+        return unchanged
+
+    def is_lastmod_unchanged(self, url, lastmod):
+        """
+        Check whether a sitemap `lastmod` matches the one recorded when the page was last processed.
+
+        :param url: URL listed in the sitemap.
+        :param lastmod: The sitemap `lastmod` value of the URL.
+        :return: True if the page was processed and its lastmod did not change, False otherwise.
+        """
+        record = self.get(url)
+        unchanged = record is not None and record["links"] is not None and record["lastmod"] == lastmod
+        if unchanged:
+            with self._lock:
+                self.unchanged_lastmod_count += 1
+        return unchanged
+
+    def record_fetch(self, url, etag, last_modified, body_hash, links, topic=None, lastmod=None, stored_url=None):
+        """
+        Store the validators, body hash, links and topic of a processed page.
+
+        :param url: URL of the processed page.
+        :param etag: ETag response header, if any.
+        :param last_modified: Last-Modified response header, if any.
+        :param body_hash: Hash of the response body.
+        :param links: Internal links found on the page.
+        :param topic: Topic of the page, if known.
+        :param lastmod: Sitemap `lastmod` of the page, if it was discovered through a sitemap.
+        :param stored_url: URL the content extractor stores the page under; if given, the record is
+                           held back until `record_content_hash` is called for that URL.
+        """
+        record = (url, etag, last_modified, body_hash, topic, json.dumps(list(links)), lastmod, time.time())
+        with self._lock:
+            if stored_url is not None:
+                self._pending.setdefault(stored_url, []).append(record)
+                return
+            with self.connection:
+                self._write_fetches([record])
+
+    def _write_fetches(self, records):
+        self.connection.executemany(
+            "INSERT INTO pages (url, etag, last_modified, body_hash, topic, links, lastmod, updated_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT(url) DO UPDATE SET etag = excluded.etag, last_modified = excluded.last_modified, "
+            "body_hash = excluded.body_hash, topic = excluded.topic, links = excluded.links, "
+            "lastmod = excluded.lastmod, updated_at = excluded.updated_at",
+            records
+        )
+
+    def discard_pending(self, stored_url):
+        """
+        Drop the held-back fetch records of a page whose ingestion failed, so it is processed again next time.
+
+        :param stored_url: URL the content extractor would have stored the page under.
+        """
+        with self._lock:
+            self._pending.pop(stored_url, None)
+
+    def is_content_unchanged(self, url, content_hash):
+        """
+        Check whether the extracted content of a page matches the cached content hash.
+
+        :param url: URL of the page.
+        :param content_hash: Hash of the extracted main text.
+        :return: True if the content did not change since it was last processed, False otherwise.
+        """
+        record = self.get(url)
+        unchanged = record is not None and record["content_hash"] == content_hash
+        if unchanged:
+            with self._lock:
+                self.unchanged_content_count += 1
+        return unchanged
+
+    def record_content_hash(self, url, content_hash):
+        """
+        Store the hash of a page's extracted content after it was stored, with its held-back fetch records.
+
+        :param url: URL the page was stored under.
+        :param content_hash: Hash of the extracted main text.
+        """
+        with self._lock, self.connection:
+            self._write_fetches(self._pending.pop(url, []))
+            self.connection.execute(
+                "INSERT INTO pages (url, content_hash, updated_at) VALUES (?, ?, ?) "
+                "ON CONFLICT(url) DO UPDATE SET content_hash = excluded.content_hash, updated_at = excluded.updated_at",
+                (url, content_hash, time.time())
+            )
+
+    def stats(self):
+        """
+        Return the cache counters.
+
+        :return: Dictionary with the number of 304 responses, unchanged bodies, contents and sitemap lastmods.
+        """
+        with self._lock:
+            return {
+                "not_modified": self.not_modified_count,
+                "unchanged_bodies": self.unchanged_body_count,
+                "unchanged_contents": self.unchanged_content_count,
+                "unchanged_lastmods": self.unchanged_lastmod_count,
+            }
+
+    def close(self):
+        """
+        Close the underlying database connection.
+        """
+        with self._lock:
+            self.connection.close()
@@ -0,0 +1,93 @@
+import argparse
+import logging
+import os
+from functools import cache
+
+# NLTK data used by the sentence splitter; punkt_tab is what current NLTK releases load
+NLTK_RESOURCES = ("punkt_tab", "punkt")
+TOKENIZER_NAME = "gpt2"
+
+# Heavy clients and models are created on first use and cached for the process, so importing
+# the scraper or the agent stays fast and worker processes only load what they actually use.
+
+
+@cache
+def cohere_client(version=2):
+    """
+    Return the process-wide Cohere client, created on first use.
+
+    :param version: 2 for cohere.ClientV2 (ingestion), 1 for cohere.Client (agent retrieval).
+    :return: The Cohere client for CO_API_KEY.
+    """
+    import cohere
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    client_class = cohere.ClientV2 if version == 2 else cohere.Client
+    return client_class(os.getenv('CO_API_KEY'))
+
+
+@cache
+def gpt2_tokenizer():
+    """
+    Return the GPT-2 fast tokenizer used to size chunks, loaded on first use.
+
+    :return: The GPT2TokenizerFast instance.
+    """
+    from transformers import GPT2TokenizerFast
+
+    return GPT2TokenizerFast.from_pretrained(TOKENIZER_NAME)
+
+
+@cache
+def sentence_splitter():
+    """
+    Return the English Punkt sentence tokenizer, loaded on first use.
+
+    :return: The PunktTokenizer instance.
+    :raises LookupError: If the punkt data was not downloaded by the setup step.
+    """
+    from nltk.tokenize.punkt import PunktTokenizer
+
+    try:
+        return PunktTokenizer("english")
+    except LookupError as e:
+        raise LookupError(f"NLTK punkt data is missing, run `python -m Scraper.Resources` first: {e}") from e
+
+
+@cache
+def english_stop_words():
+    """
+    Return the English stop words used by the summariser.
+
+    :return: Frozen set of stop words.
+    """
+    from sumy.utils import get_stop_words
+
+    return get_stop_words("english")
+
+
+def download_resources(logger=None):
+    """
+    Download the data files the scraper needs at run time (the explicit setup step).
+
+    Fetches the NLTK punkt data and the GPT-2 tokenizer into their usual caches, so crawls,
+    worker processes and agent runs never download anything while starting.
+
+    :param logger: Optional logger to report progress.
+    """
+    import nltk
+
+    for resource in NLTK_RESOURCES:
+        nltk.download(resource, quiet=True)
+        if logger:
+            logger.info(f"Downloaded NLTK resource {resource}")
+    gpt2_tokenizer()
+    if logger:
+        logger.info(f"Cached the {TOKENIZER_NAME} tokenizer")
+
+
+if __name__ == "__main__":
+    argparse.ArgumentParser(description="Download the NLTK data and tokenizer used by the scraper.").parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    download_resources(logging.getLogger("Scraper.Resources"))
@@ -0,0 +1,88 @@
+import gzip
+import io
+import xml.etree.ElementTree as ET
+
+import requests
+
+GZIP_MAGIC = b"\x1f\x8b"
+
+
+def _local_name(tag):
+    # Drop the XML namespace, e.g. "{http://www.sitemaps.org/...}loc" -> "loc"
+    return tag.rsplit("}", 1)[-1]
+
+
+class SitemapDiscovery:
+    def __init__(self, transport, logger=None, url_filter=None, max_depth=3):
+        """
+        Discover crawl URLs from sitemap.xml and sitemap-index files.
+
+        Sitemaps are streamed and parsed incrementally, so even large (or gzip-compressed)
+        sitemaps are processed with flat memory. Nested sitemap-index entries are followed up
+        to `max_depth` levels.
+
+        :param transport: HttpTransport used to fetch the sitemaps.
+        :param logger: Logger instance to log the discovery process.
+        :param url_filter: Optional callable returning True for page URLs that should be kept.
+        :param max_depth: Maximum nesting depth of sitemap-index files to follow.
+        """
+        self.transport = transport
+        self.logger = logger
+        self.url_filter = url_filter
+        self.max_depth = max_depth
+
+    def iter_urls(self, sitemap_url, depth=0):
+        """
+        Yield the page URLs listed in a sitemap, following sitemap-index files.
+
+        :param sitemap_url: URL of a sitemap or sitemap-index file.
+        :param depth: Current sitemap-index nesting depth.
+        :return: Generator of (page URL, lastmod string or None) tuples.
+        """
+        if depth > self.max_depth:
+            if self.logger:
+                self.logger.warning(f"Sitemap nesting too deep, skipping {sitemap_url}")
+            return
+
+        # Page URLs are yielded while streaming; nested sitemaps are read after this one is closed
+        nested_sitemaps = []
+        try:
+            for kind, loc, lastmod in self._iter_entries(sitemap_url):
+                if kind == "sitemap":
+                    nested_sitemaps.append(loc)
+                elif self.url_filter is None or self.url_filter(loc):
+                    yield loc, lastmod
+        except (requests.exceptions.RequestException, ET.ParseError, OSError) as e:
+            if self.logger:
+                self.logger.error(f"Error reading sitemap {sitemap_url}: {e}")
+
+        for nested_sitemap in nested_sitemaps:
+            yield from self.iter_urls(nested_sitemap, depth + 1)
+
+    def _iter_entries(self, sitemap_url):
+        response = self.transport.get(sitemap_url, stream=True)
+        try:
+            response.raise_for_status()
+            # Transparently undo Content-Encoding; gzip *files* (sitemap.xml.gz) are unpacked explicitly
+            response.raw.decode_content = True
+            stream = io.BufferedReader(response.raw)
+            if stream.peek(2)[:2] == GZIP_MAGIC:
+                stream = gzip.GzipFile(fileobj=stream)
+
+            if self.logger:
+                self.logger.info(f"Reading sitemap {sitemap_url}")
+            loc = lastmod = None
+            for event, element in ET.iterparse(stream, events=("end",)):
+                name = _local_name(element.tag)
+                if name == "loc":
+                    loc = (element.text or "").strip()
+                elif name == "lastmod":
+                    lastmod = (element.text or "").strip() or None
+                elif name in ("url", "sitemap"):
+                    if loc:
+                        yield name, loc, lastmod
+                    loc = lastmod = None
+                    # Free finished entries so memory stays flat on huge sitemaps
+                    element.clear()
+        finally:
+            response.close()
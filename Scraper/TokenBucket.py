@@ -0,0 +1,86 @@
+import asyncio
+import threading
+import time
+
+
+class TokenBucket:
+    def __init__(self, rate, capacity=None):
+        """
+        Initialize a thread-safe token bucket.
+
+        Tokens refill continuously at `rate` per second up to `capacity`. Callers reserve tokens
+        and are told how long to wait; reservations may push the balance below zero, so
+        concurrent callers queue up fairly instead of retrying.
+
+        :param rate: Refill rate in tokens per second.
+        :param capacity: Maximum burst size in tokens (defaults to one second worth of tokens, at least 1).
+        """
+        self._lock = threading.Lock()
+        self.rate = float(rate)
+        self.capacity = float(capacity) if capacity is not None else max(1.0, self.rate)
+        self.tokens = self.capacity
+        self._updated_at = time.monotonic()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated_at) * self.rate)
+        self._updated_at = now
+
+    def reserve(self, tokens=1):
+        """
+        Reserve tokens and return how long the caller must wait before using them.
+
+        :param tokens: Number of tokens to reserve.
+        :return: Delay in seconds (0 if the tokens are available right away).
+        """
+        with self._lock:
+            self._refill(time.monotonic())
+            self.tokens -= tokens
+            return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+    def refund(self, tokens):
+        """
+        Give back reserved tokens that were not used, without going above the capacity.
+
+        :param tokens: Number of tokens to give back.
+        """
+        with self._lock:
+            self._refill(time.monotonic())
+            self.tokens = min(self.capacity, self.tokens + tokens)
+
+    def acquire(self, tokens=1):
+        """
+        Block until the requested tokens are available.
+
+        :param tokens: Number of tokens to acquire.
+        :return: The time waited, in seconds.
+        """
+        delay = self.reserve(tokens)
+        if delay:
+            time.sleep(delay)
+        return delay
+
+    async def acquire_async(self, tokens=1):
+        """
+        Wait without blocking the event loop until the requested tokens are available.
+
+        :param tokens: Number of tokens to acquire.
+        :return: The time waited, in seconds.
+        """
+        delay = self.reserve(tokens)
+        if delay:
+            await asyncio.sleep(delay)
+        return delay
+
+    def set_rate(self, rate, capacity=None):
+        """
+        Change the refill rate (and optionally the capacity), keeping the current balance.
+
+        :param rate: New refill rate in tokens per second.
+        :param capacity: Optional new maximum burst size in tokens.
+        """
+        with self._lock:
+            self._refill(time.monotonic())
+            self.rate = float(rate)
+            if capacity is not None:
+                self.capacity = float(capacity)
+                self.tokens = min(self.tokens, self.capacity)
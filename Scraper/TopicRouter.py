@@ -0,0 +1,55 @@
+from urllib.parse import urlparse
+
+
+class TopicRouter:
+    def __init__(self, topics):
+        """
+        Infer the topic of a link before it is fetched.
+
+        Instructables category and channel pages live under a topic path
+        (e.g. /cooking/ or /cooking/bread/), and the HTML sitemap groups its links in
+        sections headed by the topic name. Both are reliable enough to route a link to its
+        topic's frontier, or to drop it when that topic has already reached its quota.
+
+        :param topics: Iterable of topic names, as they appear on article pages (e.g. "Cooking").
+        """
+        self.topics_by_key = {topic.lower(): topic for topic in topics}
+
+    def topic_from_text(self, text):
+        """
+        Map a piece of text (e.g. a sitemap section heading) to a topic.
+
+        :param text: Text to map.
+        :return: The matching topic, or None.
+        """
+        if not text:
+            return None
+        return self.topics_by_key.get(text.strip().lower())
+
+    def topic_from_url(self, url):
+        """
+        Infer a topic from the first path segment of a URL.
+
+        :param url: URL to inspect.
+        :return: The matching topic, or None.
+        """
+        segments = [segment for segment in urlparse(url).path.split("/") if segment]
+        return self.topics_by_key.get(segments[0].lower()) if segments else None
+
+    def infer(self, url, section_text=None, parent_url=None):
+        """
+        Infer the topic of a link from its URL, the section it was found in, or its parent page.
+
+        The parent page only counts when its own URL names a topic, i.e. links found on a
+        category or channel listing inherit that listing's topic.
+
+        :param url: URL of the link.
+        :param section_text: Heading of the page section the link was found in, if any.
+        :param parent_url: URL of the page the link was found on, if any.
+        :return: The inferred topic, or None if it cannot be told before fetching.
+        """
+        return (
+            self.topic_from_url(url)
+            or self.topic_from_text(section_text)
+            or (self.topic_from_url(parent_url) if parent_url else None)
+        )
@@ -0,0 +1,92 @@
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+DEFAULT_PORTS = {"http": 80, "https": 443}
+TRACKING_PARAMS = {"fbclid", "gclid", "dclid", "msclkid", "mc_cid", "mc_eid", "igshid", "_ga", "ref_src"}
+TRACKING_PARAM_PREFIXES = ("utm_",)
+
+
+class UrlCanonicalizer:
+    def __init__(self, trailing_slash=True):
+        """
+        Normalise URLs so that the same page is crawled, visited and stored under a single URL.
+
+        Scheme and host are lowercased, default ports, fragments and tracking query parameters
+        (utm_*, fbclid, gclid, ...) are dropped, the remaining query parameters are sorted and
+        the trailing slash of directory-like paths is made consistent. Aliases learned from
+        `<link rel="canonical">` tags are recorded and applied to later URLs as well.
+
+        :param trailing_slash: True to end directory-like paths (no file extension) with a slash,
+                               False to strip the trailing slash instead.
+        """
+        self.trailing_slash = trailing_slash
+        self.aliases = {}  # Normalised alias URL -> canonical URL
+
+    @staticmethod
+    def _is_tracking_param(name):
+        name = name.lower()
+        return name in TRACKING_PARAMS or name.startswith(TRACKING_PARAM_PREFIXES)
+
+    def normalize(self, url):
+        """
+        Normalise a URL without applying the recorded aliases.
+
+        :param url: Absolute URL to normalise.
+        :return: The normalised URL (unchanged if it is not an http(s) URL).
+        """
+        parts = urlsplit(url.strip())
+        scheme = parts.scheme.lower()
+        if scheme not in DEFAULT_PORTS:
+            return url
+
+        host = (parts.hostname or "").lower()
+        try:
+            port = parts.port
+        except ValueError:
+            port = None
+        netloc = host if port in (None, DEFAULT_PORTS[scheme]) else f"{host}:{port}"
+
+        path = parts.path or "/"
+        last_segment = path.rsplit("/", 1)[-1]
+        if self.trailing_slash and last_segment and "." not in last_segment:
+            path += "/"
+        elif not self.trailing_slash and path != "/":
+            path = path.rstrip("/") or "/"
+
+        query_params = [
+            (name, value) for name, value in parse_qsl(parts.query, keep_blank_values=True)
+            if not self._is_tracking_param(name)
+        ]
+        query = urlencode(sorted(query_params))
+        return urlunsplit((scheme, netloc, path, query, ""))
+
+    def canonicalize(self, url):
+        """
+        Return the canonical form of a URL, following recorded aliases.
+
+        :param url: Absolute URL to canonicalise.
+        :return: The canonical URL.
+        """
+        normalized = self.normalize(url)
+        return self.aliases.get(normalized, normalized)
+
+    def record_alias(self, alias_url, canonical_url):
+        """
+        Record that `alias_url` is served under `canonical_url` (e.g. from a rel=canonical tag).
+
+        :param alias_url: URL the page was fetched under.
+        :param canonical_url: URL the page declares as canonical.
+        :return: The normalised canonical URL.
+        """
+        alias = self.normalize(alias_url)
+        canonical = self.canonicalize(canonical_url)
+        if alias != canonical:
+            self.aliases[alias] = canonical
+        return canonical
+
+    def stats(self):
+        """
+        Return canonicalisation statistics.
+
+        :return: Dictionary with the number of recorded aliases.
+        """
+        return {"aliases": len(self.aliases)}
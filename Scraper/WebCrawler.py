@@ -1,10 +1,35 @@
 import pickle
+import asyncio
+import heapq
+import itertools
+import queue
+import threading
+import time
 import requests
-from bs4 import BeautifulSoup
-from urllib.parse import urljoin
-import random
+from collections import Counter
+from functools import partial
+from urllib.parse import urljoin, urlsplit
+from concurrent.futures import ThreadPoolExecutor
+from Scraper.AsyncFetcher import AsyncFetcher
+from Scraper.CrawlFrontier import CrawlFrontier
+from Scraper.HttpTransport import ContentRejected, HttpTransport
+from Scraper.Metrics import BYTE_BUCKETS, REGISTRY
+from Scraper.PolitenessScheduler import RETRY_LATER, PolitenessScheduler
+from Scraper.RecrawlCache import NOT_MODIFIED
+from Scraper.ParsedPage import ParsedPage
+from Scraper.SitemapDiscovery import SitemapDiscovery
+from Scraper.UrlCanonicalizer import UrlCanonicalizer
+
+FETCH_SECONDS = REGISTRY.histogram("crawl_fetch_seconds", "Duration of page fetches", ("status",))
+FETCH_BYTES = REGISTRY.counter("crawl_fetch_bytes_total", "Bytes of fetched page bodies")
+PAGE_BYTES = REGISTRY.histogram("crawl_page_bytes", "Size of fetched page bodies", buckets=BYTE_BUCKETS)
+FRONTIER_SIZE = REGISTRY.gauge("crawl_frontier_size", "Links waiting in the crawl frontier")
+# A page whose robots.txt stays unreachable is given up for the run after this many retries
+MAX_ROBOTS_RETRIES = 3
+
 class WebCrawler:
-    def __init__(self, homepage, max_seen_urls=10, blacklist=None, logger=None):
+    def __init__(self, homepage, max_seen_urls=10, blacklist=None, logger=None, request_timeout=30, state_store=None,
+                 transport=None, recrawl_cache=None, scheduler=None, canonicalizer=None, archive=None):
         """
         Initialize the web crawler system with a homepage, crawling limits, and optional blacklist.
 
@@ -12,50 +37,540 @@ class WebCrawler:
         :param max_seen_urls: Maximum number of pages to visit in a single iteration.
         :param blacklist: Set of blacklisted URLs to exclude from the crawl.
         :param logger: Logger instance to log the crawl process.
+        :param request_timeout: Timeout in seconds for a single page fetch.
+        :param state_store: Optional CrawlStateStore that persists the crawl state after every page.
+        :param transport: Optional shared HttpTransport; a pooled one is created if not provided.
+        :param recrawl_cache: Optional RecrawlCache used to skip pages that did not change since the last crawl.
+        :param scheduler: Optional PolitenessScheduler; a robots.txt-aware adaptive one is created if not provided.
+        :param canonicalizer: Optional UrlCanonicalizer applied to every URL before frontier and visited checks.
+        :param archive: Optional PageArchive that keeps the raw HTML of every fetched page for offline replay.
         """
+        self.canonicalizer = canonicalizer or UrlCanonicalizer()
+        homepage = self.canonicalizer.canonicalize(homepage)
         self.homepage = homepage
         self.max_seen_urls = max_seen_urls
-        self.blacklist = set(blacklist) if blacklist else set()
-        self.to_visit = [homepage]
+        self.blacklist = {self.canonicalizer.canonicalize(url) for url in blacklist} if blacklist else set()
+        # Canonicalisation can fold the seed into a blacklisted variant (".../sitemap" -> ".../sitemap/");
+        # the seed is always crawled, and is marked visited once it has been fetched
+        self.blacklist.discard(homepage)
+        self.to_visit = CrawlFrontier([homepage])
         self.visited_links = set(self.blacklist)
         self.logger = logger   # Use provided logger or default
+        self.request_timeout = request_timeout
+        self.transport = transport or HttpTransport(timeout=request_timeout, logger=logger)
+        self.scheduler = scheduler or PolitenessScheduler(
+            self.transport, user_agent=self.transport.user_agent, logger=logger
+        )
+        self.state_store = state_store
+        self.recrawl_cache = recrawl_cache
+        self.archive = archive
+        self._pending_validators = {}  # URL -> (etag, last_modified, body_hash) until the page is processed
+        self.page_metadata = {}  # URL -> frontier metadata (e.g. sitemap lastmod) while the page is in flight
+        self.link_metadata = {}  # Link -> frontier metadata (e.g. topic hint) set while its parent page is processed
+        self.follow_links = True  # Sitemap discovery mode only fetches the URLs listed in the sitemaps
+        self.topic_counts = {}  # Per-topic counts, persisted with the crawl state by subclasses
+        self._deferred = []  # Heap of (due time, order, URL, metadata) for pages to fetch again later
+        self._deferred_order = itertools.count()
+        self._ingesting = {}  # Fetched URL -> topic, for pages the content extractor has not finished yet
+        self._held_records = {}  # Fetched URL -> state store write, for finished pages still being ingested
+        self._ingested = queue.SimpleQueue()  # Fetched URLs whose ingestion finished, reported from any thread
+        # Guards the crawl state while the async crawl processes pages on another thread than its event loop
+        self._state_lock = threading.RLock()
+        self._held_hand_offs = None  # Extractor calls delayed until the state lock is released
 
 
-    def extract_internal_links(self, base_url, html_content):
+    def iter_internal_links(self, base_url, page):
       """
-      Extract all internal links from a webpage using BeautifulSoup.
+      Yield the internal links of a parsed webpage together with the sitemap section they were found in.
 
       :param base_url: URL of the webpage to crawl for links.
-      :param html_content: The fetched HTML content of the webpage.
-      :return: A list of internal links.
+      :param page: ParsedPage of the webpage.
+      :return: Generator of (link, section element or None) tuples.
       """
-      soup = BeautifulSoup(html_content, 'html.parser')
-      internal_links = []
-
       # Get all group sections to handle multiple sitemap sections like Circuits, Workshop, etc.
-      group_sections = soup.find_all('div', class_='group-section')
+      group_sections = page.find_all('div', 'group-section')
 
       # Loop through each group section and extract the links
       for section in group_sections:
-          sitemap_list = section.find('ul', class_='sitemap-listing')
-          if sitemap_list:
-              for link in sitemap_list.find_all('a', href=True):
-                  href = link['href']
-                  full_url = urljoin(base_url, href)
+          sitemap_list = page.find('ul', 'sitemap-listing', root=section)
+          if sitemap_list is not None:
+              for href in page.hrefs(sitemap_list):
+                  full_url = self.canonicalizer.canonicalize(urljoin(base_url, href))
                   if full_url not in self.visited_links:
-                      internal_links.append(full_url)
+                      yield full_url, section
 
       # Fallback to extract general links if no sitemap sections are found
       if not group_sections:
-        for link in soup.find_all('a', href=True):
-            href = link['href']
-            full_url = urljoin(base_url, href)
+        for href in page.hrefs():
+            full_url = self.canonicalizer.canonicalize(urljoin(base_url, href))
 
             # Check if 'www.instructables.com' is in the full URL and it has not been visited yet
             if 'www.instructables.com' in full_url and full_url not in self.visited_links:
-                internal_links.append(full_url)
+                yield full_url, None
+
+    def extract_internal_links(self, base_url, page):
+      """
+      Extract all internal links from a parsed webpage.
+
+      :param base_url: URL of the webpage to crawl for links.
+      :param page: ParsedPage of the webpage (raw HTML content is parsed on the fly).
+      :return: A list of internal links.
+      """
+      if not isinstance(page, ParsedPage):
+          page = ParsedPage(base_url, page)
+      return [link for link, _ in self.iter_internal_links(base_url, page)]
+
+    def new_frontier(self, urls=None):
+        """
+        Create an empty (or seeded) frontier of the type this crawler uses.
+
+        :param urls: Optional iterable of URLs to seed the frontier with.
+        :return: A new frontier.
+        """
+        return CrawlFrontier(urls)
+
+    def restore_state(self):
+        """
+        Restore visited links, the frontier and topic counts from the state store.
+
+        If the store is empty, the current frontier is saved to it instead, so a fresh crawl
+        can be resumed later.
+
+        :return: True if a previous crawl state was restored, False otherwise.
+        """
+        if self.state_store.is_empty():
+            self.state_store.record_enqueued(self.to_visit)
+            return False
+
+        visited, pending, topic_counts = self.state_store.load()
+        self.visited_links.update(visited)
+        self.to_visit = self.new_frontier()
+        for url, metadata in pending:
+            # Topic hints and sitemap lastmods are restored with their links
+            self.to_visit.add(url, metadata)
+        self.to_visit.mark_seen(visited)
+        for topic, count in topic_counts.items():
+            if topic in self.topic_counts:
+                self.topic_counts[topic] = count
+        self.logger.info(f"Resumed crawl state: {len(visited)} visited, {len(pending)} pending links")
+        return True
+
+    def finish_page(self, url, internal_links):
+        """
+        Add a handled page's links to the frontier and persist the change in the state store.
+
+        :param url: URL of the page that was visited, skipped or failed.
+        :param internal_links: Internal links found on the page.
+        :return: The links that were actually added to the frontier.
+        """
+        self.page_metadata.pop(url, None)
+        links_with_metadata = [(link, self.link_metadata.pop(link, None)) for link in internal_links]
+        if not self.follow_links:
+            links_with_metadata = []
+        new_links = [(link, metadata) for link, metadata in links_with_metadata
+                     if self.to_visit.add(link, metadata)]
+        self.record_when_ingested(url, partial(self._record_page, url, new_links))
+        FRONTIER_SIZE.set(len(self.to_visit))
+        return [link for link, _ in new_links]
+
+    def _record_page(self, url, new_links):
+        if self.state_store:
+            self.state_store.record_page(url, new_links, self.ingested_topic_counts())
+
+    def hand_off(self, content_extractor, url, stored_url, page, topic=None):
+        """
+        Hand a fetched page to the content extractor.
+
+        Until the extractor reports the page as done, its topic claim is left out of the
+        persisted topic counts and the page stays pending in the crawl state, so a crawl killed
+        while pages are still queued in an IngestionPipeline fetches them again on resume.
+
+        :param content_extractor: ContentExtractor or IngestionPipeline to hand the page to.
+        :param url: URL the page was fetched under.
+        :param stored_url: URL the page is stored under.
+        :param page: ParsedPage of the fetched page.
+        :param topic: Topic the page was counted towards, if any.
+        """
+        self._ingesting[url] = topic
+        extract = partial(content_extractor.extract_content_from_html, stored_url, page,
+                          on_done=partial(self._ingested.put, url))
+        if self._held_hand_offs is not None:
+            self._held_hand_offs.append(extract)
+        else:
+            extract()
+
+    def record_when_ingested(self, url, record):
+        """
+        Persist a finished page now, or once the content extractor is done with it.
+
+        :param url: URL the page was fetched under.
+        :param record: Callable writing the page to the crawl state.
+        """
+        self.record_ingested()
+        if url in self._ingesting:
+            self._held_records[url] = record
+        else:
+            record()
+
+    def record_ingested(self):
+        """
+        Persist the finished pages whose ingestion was reported done since the last call.
+        """
+        while True:
+            try:
+                url = self._ingested.get_nowait()
+            except queue.Empty:
+                return
+            self._ingesting.pop(url, None)
+            record = self._held_records.pop(url, None)
+            if record:
+                record()
 
-      return internal_links
+    def ingested_topic_counts(self):
+        """
+        Return the topic counts without the pages that are still being ingested.
+
+        :return: Dictionary mapping each topic to its number of ingested pages.
+        """
+        in_flight = Counter(topic for topic in self._ingesting.values() if topic)
+        return {topic: count - in_flight[topic] for topic, count in self.topic_counts.items()}
+
+    def defer_page(self, url, delay):
+        """
+        Put a page that may not be fetched yet (its robots.txt is unreachable) back on the frontier later.
+
+        The page is not finished, so the state store keeps it pending for a resumed crawl as well.
+        After MAX_ROBOTS_RETRIES retries it is given up for this run.
+
+        :param url: URL of the page.
+        :param delay: Seconds to wait before the page is queued again.
+        :return: True if the page was deferred, False if it was given up for this run.
+        """
+        self.visited_links.discard(url)
+        metadata = dict(self.page_metadata.pop(url, None) or {})
+        metadata["robots_retries"] = metadata.get("robots_retries", 0) + 1
+        if metadata["robots_retries"] > MAX_ROBOTS_RETRIES:
+            self.logger.warning(f"robots.txt stayed unreachable, giving up on {url} for this run")
+            self.give_up_page(url)
+            return False
+        self.requeue_later(url, metadata, delay)
+        return True
+
+    def requeue_later(self, url, metadata, delay):
+        """
+        Queue a dequeued page again once `delay` seconds have passed.
+
+        :param url: URL of the page.
+        :param metadata: Frontier metadata of the page.
+        :param delay: Seconds to wait before the page is queued again.
+        """
+        heapq.heappush(self._deferred, (time.monotonic() + delay, next(self._deferred_order), url, metadata))
+
+    def give_up_page(self, url):
+        """
+        Drop a page for this run without finishing it; the state store keeps it pending for the next run.
+
+        :param url: URL of the page.
+        """
+
+    def requeue_deferred(self):
+        """
+        Put deferred pages whose delay is over back on the frontier.
+
+        :return: Seconds until the next deferred page is due, or None if no page is deferred.
+        """
+        now = time.monotonic()
+        while self._deferred and self._deferred[0][0] <= now:
+            _, _, url, metadata = heapq.heappop(self._deferred)
+            self.to_visit.requeue(url, metadata)
+        return max(self._deferred[0][0] - now, 0) if self._deferred else None
+
+    def has_pending(self):
+        """
+        Check whether pages are left to visit, now or once their deferral is over.
+
+        :return: True if the frontier or the deferred pages are not empty, False otherwise.
+        """
+        return bool(self.to_visit or self._deferred)
+
+    def wait_for_deferred(self):
+        """
+        Requeue due deferred pages, sleeping until the next one is due if the frontier is empty.
+        """
+        delay = self.requeue_deferred()
+        if delay is not None and not self.to_visit:
+            time.sleep(delay)
+            self.requeue_deferred()
+
+    def should_continue(self):
+        """
+        Check whether the crawl limits still allow visiting more pages.
+
+        :return: True if more pages may be visited, False otherwise.
+        """
+        return len(self.visited_links) < self.max_seen_urls
+
+    def next_url(self, iteration_count, random_jump_frequency=None):
+        """
+        Pop the next URL to visit from the to_visit frontier.
+
+        :param iteration_count: Current crawl iteration, used to schedule random jumps.
+        :param random_jump_frequency: How often to perform a random jump (None disables jumps).
+        :return: The next URL to visit.
+        """
+        # Randomly jump to a different URL in the to_visit frontier based on frequency
+        if random_jump_frequency and iteration_count % random_jump_frequency == 0 and len(self.to_visit) > 1:
+            url, metadata = self.to_visit.pop_random_entry()
+            self.logger.info(f"Random jump to {url}")
+        else:
+            # Default behavior: pop the oldest URL
+            url, metadata = self.to_visit.popleft_entry()
+        if metadata:
+            self.page_metadata[url] = metadata
+        return url
+
+    def seed_from_sitemaps(self, sitemap_urls, url_filter=None, batch_size=1000):
+        """
+        Stream sitemap.xml / sitemap-index files straight into the frontier.
+
+        Each URL is queued with its sitemap `lastmod`, which lets the recrawl cache skip pages
+        that did not change since they were last processed.
+
+        :param sitemap_urls: Iterable of sitemap or sitemap-index URLs.
+        :param url_filter: Optional callable returning True for URLs worth fetching (e.g. articles).
+        :param batch_size: Number of queued URLs per state store write.
+        :return: The number of URLs added to the frontier.
+        """
+        sitemap_urls = list(sitemap_urls)
+        discovery = SitemapDiscovery(self.transport, logger=self.logger, url_filter=url_filter)
+        added = 0
+        batch = []
+        for sitemap_url in sitemap_urls:
+            for url, lastmod in discovery.iter_urls(sitemap_url):
+                url = self.canonicalizer.canonicalize(url)
+                if url in self.visited_links or url in self.blacklist:
+                    continue
+                metadata = {"lastmod": lastmod} if lastmod else None
+                if self.to_visit.add(url, metadata):
+                    added += 1
+                    batch.append((url, metadata))
+                if self.state_store and len(batch) >= batch_size:
+                    self.state_store.record_enqueued(batch)
+                    batch = []
+        if self.state_store and batch:
+            self.state_store.record_enqueued(batch)
+
+        self.logger.info(f"Queued {added} URLs from {len(sitemap_urls)} sitemap(s)")
+        return added
+
+    def is_lastmod_unchanged(self, url):
+        """
+        Check whether the page's sitemap lastmod shows it did not change since it was last processed.
+
+        :param url: URL of the page.
+        :return: True if the page can be skipped without a request, False otherwise.
+        """
+        lastmod = self.page_metadata.get(url, {}).get("lastmod")
+        return bool(self.recrawl_cache and lastmod and self.recrawl_cache.is_lastmod_unchanged(url, lastmod))
+
+    def fetch_page(self, url, wait=True):
+        """
+        Fetch the HTML content of a page.
+
+        URLs disallowed by robots.txt are not fetched, and every response is reported to the
+        politeness scheduler so that the domain's request rate follows the server's health.
+
+        With a recrawl cache, NOT_MODIFIED is returned without a request when the sitemap lastmod
+        is unchanged; otherwise the request is conditional and NOT_MODIFIED is returned when the
+        server answers 304 or the body is identical to the one seen on the last crawl.
+
+        The body is streamed and only read if it is HTML within the transport's size cap, so
+        links to PDFs, images or huge pages cost a response header rather than a download.
+
+        :param url: URL of the page to fetch.
+        :param wait: Whether to wait for the domain's rate here (the async crawl waits in the fetcher instead).
+        :return: The HTML content, NOT_MODIFIED, None if the fetch failed or is disallowed,
+                 or RETRY_LATER if robots.txt is unreachable and the page must be fetched later.
+        """
+        if self.is_lastmod_unchanged(url):
+            return NOT_MODIFIED
+
+        if wait:
+            allowed = self.scheduler.wait(url)
+            if allowed is RETRY_LATER:
+                return RETRY_LATER
+            if not allowed:
+                return None
+
+        started = time.monotonic()
+        try:
+            headers = self.recrawl_cache.conditional_headers(url) if self.recrawl_cache else None
+            response = self.transport.get(url, headers=headers, stream=True)
+        except requests.exceptions.RequestException as e:
+            self.scheduler.record(url, None, time.monotonic() - started)
+            FETCH_SECONDS.observe(time.monotonic() - started, status="error")
+            self.logger.error(f"Error fetching {url}: {e}")
+            return None
+
+        latency = time.monotonic() - started
+        self.scheduler.record(url, response.status_code, latency)
+        FETCH_SECONDS.observe(latency, status=response.status_code)
+        try:
+            if self.recrawl_cache and response.status_code == 304:
+                response.close()
+                self.recrawl_cache.record_not_modified()
+                return NOT_MODIFIED
+            response.raise_for_status()
+            html_content, body_size, body_hash = self.transport.read_text(response)
+        except ContentRejected as e:
+            self.logger.info(f"Skipping {url}: {e}")
+            return None
+        except requests.exceptions.RequestException as e:
+            response.close()
+            self.logger.error(f"Error fetching {url}: {e}")
+            return None
+
+        FETCH_BYTES.inc(body_size)
+        PAGE_BYTES.observe(body_size)
+        if self.archive:
+            self.archive.append(url, html_content, response.headers.get("Content-Type"))
+
+        if self.recrawl_cache:
+            if self.recrawl_cache.is_body_unchanged(url, body_hash):
+                return NOT_MODIFIED
+            self._pending_validators[url] = (
+                response.headers.get("ETag"), response.headers.get("Last-Modified"), body_hash
+            )
+        return html_content
+
+    def remember_page(self, url, internal_links, topic=None, stored_url=None):
+        """
+        Store a processed page's validators, links and topic in the recrawl cache.
+
+        Must be called before a page is handed to the content extractor: with `stored_url`, the
+        record only takes effect once the extractor stored the page, so a page whose ingestion
+        failed is fetched and extracted again on the next crawl.
+
+        :param url: URL of the processed page.
+        :param internal_links: Internal links found on the page.
+        :param topic: Topic of the page, if known.
+        :param stored_url: URL the content extractor stores the page under, if it is handed to it.
+        """
+        validators = self._pending_validators.pop(url, None)
+        if self.recrawl_cache and validators:
+            etag, last_modified, body_hash = validators
+            lastmod = self.page_metadata.get(url, {}).get("lastmod")
+            self.recrawl_cache.record_fetch(url, etag, last_modified, body_hash, internal_links, topic, lastmod,
+                                            stored_url=stored_url)
+
+    def forget_page(self, url):
+        """
+        Drop a fetched page's validators without recording it, so the next crawl processes it again.
+
+        :param url: URL of the fetched page.
+        """
+        self._pending_validators.pop(url, None)
+
+    def resolve_canonical(self, url, page):
+        """
+        Resolve the page's `<link rel="canonical">` target and record it as visited.
+
+        Canonical targets on another host are ignored. When the canonical URL differs from the
+        fetched one, the alias is recorded so later links to it are canonicalised as well.
+
+        :param url: URL the page was fetched under.
+        :param page: ParsedPage of the fetched page.
+        :return: The canonical URL, or None if that page was already visited under another URL.
+        """
+        declared_url = page.canonical_url()
+        if not declared_url or urlsplit(declared_url).netloc.lower() != urlsplit(url).netloc.lower():
+            return url
+
+        canonical_url = self.canonicalizer.record_alias(url, declared_url)
+        if canonical_url == url:
+            return url
+        if canonical_url in self.visited_links:
+            self.logger.info(f"Duplicate of already visited {canonical_url}, skipping extraction: {url}")
+            return None
+        self.visited_links.add(canonical_url)
+        self.to_visit.mark_seen([canonical_url])
+        return canonical_url
+
+    def process_page(self, content_extractor, url, html_content):
+        """
+        Process a fetched page and return the internal links found on it.
+
+        :param content_extractor: An instance of ContentExtractor to process the content.
+        :param url: URL of the fetched page.
+        :param html_content: The fetched HTML content of the page.
+        :return: A list of internal links to add to the to_visit frontier.
+        """
+        if html_content is NOT_MODIFIED:
+            internal_links, _ = self.recrawl_cache.cached_page(url)
+            self.logger.info(f"Unchanged since last crawl, skipping extraction: {url}")
+            return internal_links
+
+        # Parse once; links are extracted before the content extractor, which may prune the tree
+        page = ParsedPage(url, html_content)
+        internal_links = self.extract_internal_links(url, page)
+        canonical_url = self.resolve_canonical(url, page)
+
+        # Check if "sitemap" is in the URL and skip content extraction
+        if "sitemap" in url.lower():
+            self.logger.info(f"Skipping content extraction for sitemap URL: {url}")
+            self.remember_page(url, internal_links)
+        elif canonical_url:
+            # Process the content immediately with the content extractor, stored under the canonical URL
+            self.remember_page(url, internal_links, stored_url=canonical_url)
+            self.hand_off(content_extractor, url, canonical_url, page)
+        else:
+            self.remember_page(url, internal_links)
+        return internal_links
+
+    def log_progress(self):
+        """
+        Log the current crawl progress.
+        """
+        self.logger.info("Current scraping progress:")
+        self.logger.info(f"Links Visited: {len(self.visited_links)}")
+        self.logger.info(f"Links Left to Visit: {len(self.to_visit)}")
+        self.logger.info(f"Frontier stats: {self.to_visit.stats()}")
+        self.logger.info(f"Transport stats: {self.transport.stats()}")
+        self.logger.info(f"Politeness rates: {self.scheduler.rates()}")
+        self.logger.info(f"Canonicalizer stats: {self.canonicalizer.stats()}")
+        if self.recrawl_cache:
+            self.logger.info(f"Recrawl cache stats: {self.recrawl_cache.stats()}")
+        if self.archive:
+            self.logger.info(f"Page archive stats: {self.archive.stats()}")
+
+    def replay_archive(self, archive, content_extractor, log_frequency=None):
+        """
+        Feed archived pages through `process_page` instead of fetching them.
+
+        No request is made, so a changed extraction pipeline can be re-run over the whole
+        corpus at disk speed. Links found on the pages are not followed.
+
+        :param archive: PageArchive to read the pages from.
+        :param content_extractor: An instance of ContentExtractor to process the content.
+        :param log_frequency: How often (in processed pages) to log progress (None disables it).
+        :return: The number of replayed pages.
+        """
+        replayed_count = 0
+        for url, html_content in archive.iter_pages():
+            if not self.should_continue():
+                break
+            url = self.canonicalizer.canonicalize(url)
+            if url in self.visited_links or url in self.blacklist:
+                continue
+
+            self.visited_links.add(url)
+            self.process_page(content_extractor, url, html_content)
+            replayed_count += 1
+            if log_frequency and replayed_count % log_frequency == 0:
+                self.log_progress()
+
+        self.logger.info(f"Replayed {replayed_count} archived pages")
+        return replayed_count
 
     def crawl_and_process(self, content_extractor, random_jump_frequency=50):
         """
@@ -66,45 +581,140 @@ class WebCrawler:
         """
         iteration_count = 0
 
-        while self.to_visit and len(self.visited_links) < self.max_seen_urls:
+        while self.has_pending() and self.should_continue():
+            self.wait_for_deferred()
+            if not self.to_visit:
+                continue
             iteration_count += 1
-
-            # Randomly jump to a different URL in the to_visit list based on frequency
-            if iteration_count % random_jump_frequency == 0 and len(self.to_visit) > 1:
-                # Pick a random index from the list
-                random_index = random.randint(0, len(self.to_visit) - 1)
-                url = self.to_visit.pop(random_index)
-                self.logger.info(f"Random jump to {url}")
-            else:
-                # Default behavior: pop the first URL
-                url = self.to_visit.pop(0)
+            url = self.next_url(iteration_count, random_jump_frequency)
 
             if url in self.visited_links or url in self.blacklist:
+                self.finish_page(url, [])
                 continue
 
             self.logger.info(f"Visiting {url}...")
             self.visited_links.add(url)
 
             # Fetch the page content
-            try:
-                response = requests.get(url)
-                response.raise_for_status()
-                html_content = response.text
-            except requests.exceptions.RequestException as e:
-                self.logger.error(f"Error fetching {url}: {e}")
+            html_content = self.fetch_page(url)
+            if html_content is RETRY_LATER:
+                self.defer_page(url, self.scheduler.unreachable_retry)
+                continue
+            if html_content is None:
+                self.finish_page(url, [])
                 continue
 
-            # Check if "sitemap" is in the URL and skip content extraction
-            if "sitemap" in url.lower():
-                self.logger.info(f"Skipping content extraction for sitemap URL: {url}")
-            else:
-                # Process the content immediately with the content extractor
-                content_extractor.extract_content_from_html(url, html_content)
-
-            # Extract internal links and update the to_visit list
-            internal_links = self.extract_internal_links(url, html_content)
-            self.to_visit.extend(internal_links)
+            # Extract internal links and update the to_visit frontier
+            internal_links = self.process_page(content_extractor, url, html_content)
+            self.finish_page(url, internal_links)
             self.logger.info(f"Total Links to extract: {len(self.to_visit)}")
 
         return self.visited_links
 
+    def crawl_and_process_async(self, content_extractor, concurrency=16, per_host_concurrency=4,
+                                random_jump_frequency=50, log_frequency=None):
+        """
+        Crawl like `crawl_and_process`, but keep up to `concurrency` fetches in flight.
+
+        Fetches run concurrently on a thread pool driven by asyncio, while fetched pages are
+        handed to the content extractor one at a time, so the extractor does not need to be thread-safe.
+        Pages are processed on a separate thread, so the crawl state (visited links, frontier, link
+        metadata and topic counts) is only changed under a lock shared with the event loop.
+
+        :param content_extractor: An instance of ContentExtractor to process the content.
+        :param concurrency: Maximum number of fetches in flight across all hosts.
+        :param per_host_concurrency: Maximum number of fetches in flight for a single host.
+        :param random_jump_frequency: How often to perform a random jump (None disables jumps).
+        :param log_frequency: How often (in processed pages) to log progress (None disables it).
+        :return: The set of visited links.
+        """
+        asyncio.run(self._crawl_async(content_extractor, concurrency, per_host_concurrency,
+                                      random_jump_frequency, log_frequency))
+        return self.visited_links
+
+    def _process_page_with_url(self, content_extractor, url, html_content):
+        # Runs off the event loop: the crawl state is only touched under the state lock, and the
+        # extractor, which touches none of it but is the slow part, runs once the lock is released
+        with self._state_lock:
+            self._held_hand_offs = []
+            try:
+                internal_links = self.process_page(content_extractor, url, html_content)
+            finally:
+                hand_offs, self._held_hand_offs = self._held_hand_offs, None
+        for extract in hand_offs:
+            extract()
+        return url, internal_links
+
+    async def _crawl_async(self, content_extractor, concurrency, per_host_concurrency,
+                           random_jump_frequency, log_frequency):
+        loop = asyncio.get_running_loop()
+        fetcher = AsyncFetcher(partial(self.fetch_page, wait=False), concurrency=concurrency,
+                               per_host_concurrency=per_host_concurrency, scheduler=self.scheduler)
+        # A single worker keeps page processing serial, in crawl order of completion
+        process_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="crawler-process")
+        fetches = {}
+        processing = set()
+        iteration_count = 0
+        processed_count = 0
+
+        try:
+            while True:
+                with self._state_lock:
+                    next_due = self.requeue_deferred()
+                    # Top up the in-flight fetches; stop dispatching once processing falls behind
+                    while (self.to_visit and self.should_continue()
+                           and len(fetches) < concurrency and len(processing) < concurrency):
+                        iteration_count += 1
+                        url = self.next_url(iteration_count, random_jump_frequency)
+                        if url in self.visited_links or url in self.blacklist:
+                            self.finish_page(url, [])
+                            continue
+
+                        self.logger.info(f"Visiting {url}...")
+                        self.visited_links.add(url)
+                        if self.is_lastmod_unchanged(url):
+                            # No request needed, so do not spend a politeness slot on it
+                            processing.add(loop.run_in_executor(
+                                process_executor, self._process_page_with_url, content_extractor, url, NOT_MODIFIED
+                            ))
+                            continue
+                        fetches[asyncio.ensure_future(fetcher.fetch(url))] = url
+                    keep_going = self.should_continue()
+
+                pending = set(fetches) | processing
+                if not pending:
+                    if next_due is None or not keep_going:
+                        break
+                    # Only deferred pages are left
+                    await asyncio.sleep(next_due)
+                    continue
+
+                done, _ = await asyncio.wait(pending, timeout=next_due, return_when=asyncio.FIRST_COMPLETED)
+                with self._state_lock:
+                    for task in done:
+                        if task in processing:
+                            processing.discard(task)
+                            url, internal_links = task.result()
+                            self.finish_page(url, internal_links)
+                            processed_count += 1
+                            if log_frequency and processed_count % log_frequency == 0:
+                                self.log_progress()
+                            continue
+
+                        url = fetches.pop(task)
+                        html_content = task.result()
+                        if html_content is RETRY_LATER:
+                            self.defer_page(url, self.scheduler.unreachable_retry)
+                            continue
+                        if html_content is None:
+                            self.finish_page(url, [])
+                            continue
+                        processing.add(loop.run_in_executor(
+                            process_executor, self._process_page_with_url, content_extractor, url, html_content
+                        ))
+        finally:
+            fetcher.close()
+            process_executor.shutdown(wait=True)
+
+        self.logger.info(f"Async crawl finished, processed {processed_count} pages. "
+                         f"Total Links to extract: {len(self.to_visit)}")
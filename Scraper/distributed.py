@@ -0,0 +1,158 @@
+import argparse
+import logging
+import multiprocessing
+import os
+import re
+import socket
+from Scraper.FrontierService import FrontierService
+from Scraper.HttpTransport import HttpTransport
+from Scraper.LimitedWebScraper import ARTICLE_URL_PATTERN, LimitedWebScraper
+from Scraper.SitemapDiscovery import SitemapDiscovery
+from Scraper.UrlCanonicalizer import UrlCanonicalizer
+
+
+def run_worker(homepage, frontier_path, worker_id, worker_count=1, **scraper_kwargs):
+    """
+    Run one crawl worker: a LimitedWebScraper that leases its URLs from the shared frontier.
+
+    Workers can run on other machines as well, as long as they reach the same frontier database.
+
+    :param homepage: URL the crawl started from.
+    :param frontier_path: Path of the shared FrontierService database.
+    :param worker_id: Unique identifier of the worker.
+    :param worker_count: Total number of workers, used to share the politeness rate.
+    :param scraper_kwargs: Further LimitedWebScraper arguments (limits, save paths, sitemap mode...).
+    """
+    scraper = LimitedWebScraper(
+        homepage,
+        mongo_uri=os.getenv('MONGO_URI'),
+        frontier_path=frontier_path,
+        worker_id=worker_id,
+        worker_count=worker_count,
+        **scraper_kwargs
+    )
+    scraper.run()
+
+
+def seed_frontier(frontier_service, homepage, sitemap_urls=None, article_url_pattern=ARTICLE_URL_PATTERN,
+                  logger=None, batch_size=1000):
+    """
+    Seed an empty shared frontier with the homepage, or with the article URLs listed in sitemaps.
+
+    :param frontier_service: FrontierService to seed.
+    :param homepage: URL to start crawling from when no sitemaps are given.
+    :param sitemap_urls: Optional sitemap.xml / sitemap-index URLs to seed the frontier from.
+    :param article_url_pattern: Regex that sitemap URLs must match to be queued.
+    :param logger: Logger instance to log the seeding.
+    :param batch_size: Number of URLs added per transaction.
+    :return: The number of URLs added.
+    """
+    canonicalizer = UrlCanonicalizer()
+    if not sitemap_urls:
+        return frontier_service.add([canonicalizer.canonicalize(homepage)])
+
+    pattern = re.compile(article_url_pattern) if article_url_pattern else None
+    transport = HttpTransport(logger=logger)
+    discovery = SitemapDiscovery(transport, logger=logger, url_filter=pattern.match if pattern else None)
+    added = 0
+    batch = []
+    try:
+        for sitemap_url in sitemap_urls:
+            for url, lastmod in discovery.iter_urls(sitemap_url):
+                batch.append((canonicalizer.canonicalize(url), {"lastmod": lastmod} if lastmod else None))
+                if len(batch) >= batch_size:
+                    added += frontier_service.add(batch)
+                    batch = []
+        added += frontier_service.add(batch)
+    finally:
+        transport.close()
+    return added
+
+
+def run_coordinator(homepage, frontier_path, worker_count=4, resume=True, lease_seconds=300,
+                    sitemap_urls=None, article_url_pattern=ARTICLE_URL_PATTERN, log_interval=60, **scraper_kwargs):
+    """
+    Run a distributed crawl: seed the shared frontier and supervise local worker processes.
+
+    Workers are separate processes, so parsing and extraction use several cores. They share
+    the frontier and the global topic quotas through a FrontierService database; if a worker
+    dies, its leased URLs are handed to the other workers once their leases expire.
+
+    :param homepage: URL to start crawling from.
+    :param frontier_path: Path of the shared FrontierService database.
+    :param worker_count: Number of worker processes to start on this machine.
+    :param resume: Whether to continue a previous crawl stored in the frontier instead of starting over.
+    :param lease_seconds: How long a worker may hold a URL without renewing its lease; stored in the
+                          shared frontier, so every worker uses it.
+    :param sitemap_urls: Optional sitemap.xml / sitemap-index URLs to seed the frontier from.
+    :param article_url_pattern: Regex that sitemap URLs must match to be queued.
+    :param log_interval: Seconds between two frontier progress logs.
+    :param scraper_kwargs: Further LimitedWebScraper arguments passed to every worker.
+    :return: The final frontier statistics.
+    """
+    logger = logging.getLogger(__name__)
+    frontier_service = FrontierService(frontier_path, lease_seconds=lease_seconds)
+    if not resume:
+        frontier_service.reset()
+    elif frontier_service.retry_failed():
+        logger.info("Queued the URLs that failed in the previous run again")
+    if frontier_service.is_empty():
+        added = seed_frontier(frontier_service, homepage, sitemap_urls, article_url_pattern, logger=logger)
+        logger.info(f"Seeded the shared frontier with {added} URLs")
+
+    # Spawned (not forked) workers do not inherit open SQLite or HTTP connections
+    context = multiprocessing.get_context("spawn")
+    host = socket.gethostname()
+    workers = []
+    for index in range(worker_count):
+        worker = context.Process(
+            target=run_worker,
+            args=(homepage, frontier_path, f"{host}-{os.getpid()}-{index}", worker_count),
+            kwargs=dict(scraper_kwargs, sitemap_urls=sitemap_urls, article_url_pattern=article_url_pattern),
+            name=f"crawl-worker-{index}",
+        )
+        worker.start()
+        workers.append(worker)
+
+    try:
+        while any(worker.is_alive() for worker in workers):
+            for worker in workers:
+                worker.join(timeout=log_interval / len(workers))
+            logger.info(f"Shared frontier stats: {frontier_service.stats()}")
+    finally:
+        for worker in workers:
+            if worker.is_alive():
+                worker.terminate()
+        stats = frontier_service.stats()
+        frontier_service.close()
+
+    failed = [worker.name for worker in workers if worker.exitcode]
+    if failed:
+        logger.warning(f"Workers exited with errors: {failed}")
+    logger.info(f"Distributed crawl finished: {stats}")
+    return stats
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Distributed crawl: a coordinator and worker processes "
+                                                 "sharing one SQLite frontier.")
+    parser.add_argument("role", choices=["coordinator", "worker"])
+    parser.add_argument("frontier_path", help="Path of the shared frontier database")
+    parser.add_argument("--homepage", default="https://www.instructables.com/sitemap")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="Worker processes to start (coordinator) or total workers (worker)")
+    parser.add_argument("--worker-id", default=None, help="Unique worker id (worker role)")
+    parser.add_argument("--main-save-path", default=None)
+    parser.add_argument("--max-seen-urls-per-topic", type=int, default=1000)
+    parser.add_argument("--sitemap", action="append", dest="sitemap_urls", default=None)
+    parser.add_argument("--no-resume", action="store_true")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    kwargs = dict(main_save_path=args.main_save_path, max_seen_urls_per_topic=args.max_seen_urls_per_topic)
+    if args.role == "coordinator":
+        run_coordinator(args.homepage, args.frontier_path, worker_count=args.workers, resume=not args.no_resume,
+                        sitemap_urls=args.sitemap_urls, **kwargs)
+    else:
+        run_worker(args.homepage, args.frontier_path, args.worker_id or f"{socket.gethostname()}-{os.getpid()}",
+                   worker_count=args.workers, sitemap_urls=args.sitemap_urls, **kwargs)
@@ -0,0 +1,73 @@
+import argparse
+import os
+from datetime import datetime
+from Scraper.LimitedWebCrawler import LimitedWebCrawler
+from Scraper.ContentExtractorV2 import ContentExtractor
+from Scraper.PageArchive import PageArchive
+from Scraper.NearDuplicateIndex import NearDuplicateIndex
+from ScrapeLogger import ScraperLogger
+from MongoDB.MongoClient import MongoDBClient
+
+
+def replay_archive(archive_path, mongo_uri=None, main_save_path=None, max_seen_urls_per_topic=1000,
+                   save_content=True, log_to_console=True):
+    """
+    Re-run the extraction pipeline over an archived crawl, without any network access.
+
+    The crawler's topic detection and limits apply exactly as during a live crawl, but the
+    recrawl cache is not used, so every archived page is extracted again.
+
+    :param archive_path: Directory of the PageArchive written by a previous crawl.
+    :param mongo_uri: Optional MongoDB URI to store the extracted content in.
+    :param main_save_path: Optional directory to save the extracted content and the logs in.
+    :param max_seen_urls_per_topic: Maximum number of pages to process per topic.
+    :param save_content: Whether to save the extracted content.
+    :param log_to_console: Whether to also log to the console.
+    :return: The number of replayed pages.
+    """
+    log_file_name = f'replay_log_{datetime.now().strftime("%Y_%m_%d_%H_%M_%S")}.txt'
+    log_dir = os.path.join(main_save_path, "scrape_logs") if main_save_path else 'logs'
+    os.makedirs(log_dir, exist_ok=True)
+    logger = ScraperLogger(log_file=os.path.join(log_dir, log_file_name), log_dir=log_dir,
+                           log_to_console=log_to_console).get_logger()
+
+    mongo_client = MongoDBClient(mongo_uri, logger=logger) if mongo_uri else None
+    archive = PageArchive(archive_path)
+    crawler = LimitedWebCrawler(
+        "https://www.instructables.com/sitemap",
+        max_seen_urls_per_topic=max_seen_urls_per_topic,
+        logger=logger,
+    )
+    extractor = ContentExtractor(
+        mongo_client=mongo_client,
+        save_content=save_content,
+        main_save_path=main_save_path,
+        logger=logger,
+        use_embeddings=True,
+        near_duplicate_index=NearDuplicateIndex(),
+    )
+
+    try:
+        logger.info(f"Replaying {len(archive)} archived pages from {archive_path}...")
+        replayed_count = crawler.replay_archive(archive, extractor, log_frequency=100)
+        crawler.log_progress()
+    finally:
+        archive.close()
+        if mongo_client:
+            mongo_client.close()
+    return replayed_count
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Re-run content extraction over an archived crawl.")
+    parser.add_argument("archive_path", help="Directory of the page archive (e.g. <main_save_path>/page_archive)")
+    parser.add_argument("--main-save-path", default=None)
+    parser.add_argument("--max-seen-urls-per-topic", type=int, default=1000)
+    args = parser.parse_args()
+
+    replay_archive(
+        args.archive_path,
+        mongo_uri=os.getenv('MONGO_URI'),
+        main_save_path=args.main_save_path,
+        max_seen_urls_per_topic=args.max_seen_urls_per_topic,
+    )
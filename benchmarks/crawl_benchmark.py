@@ -0,0 +1,282 @@
+import argparse
+import json
+import logging
+import multiprocessing
+import resource
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from types import SimpleNamespace
+
+from benchmarks.fixture_site import SITE_ROOT, FixtureSite, FixtureTransport
+
+SCENARIOS = ("webcrawler", "webcrawler-async", "limited", "limited-async", "scraper", "scraper-pipeline")
+HOMEPAGE = SITE_ROOT + "/sitemap"
+EMBEDDING_SIZE = 384
+
+
+class NullExtractor:
+    """
+    Content extractor that does nothing, so crawler scenarios measure fetching and parsing only.
+    """
+
+    def extract_content_from_html(self, url, html_content):
+        pass
+
+
+class StubMongo:
+    """
+    Stand-in for MongoDBClient that counts the writes and returns fake document ids.
+    """
+
+    def __init__(self):
+        self.documents = 0
+        self.chunks = 0
+        self.duplicates = 0
+
+    def save_full_data(self, data):
+        self.documents += 1
+        return f"{self.documents:024x}"
+
+    def save_chunk(self, chunk, content_id):
+        self.chunks += 1
+
+    def save_duplicate_reference(self, data, duplicate_of):
+        self.duplicates += 1
+
+    def close(self):
+        pass
+
+
+class StubEmbedder:
+    """
+    Stand-in for the Cohere client, returning a fixed vector per text after a configurable delay.
+    """
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.calls = 0
+
+    def embed(self, texts, **kwargs):
+        self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        vector = [0.0] * EMBEDDING_SIZE
+        return SimpleNamespace(embeddings=SimpleNamespace(float=[vector for _ in texts]))
+
+
+class PageTimer:
+    def __init__(self, crawler):
+        """
+        Measure the latency of every page a crawler handles, from the start of its fetch to its links being queued.
+
+        The crawler's `fetch_page` and `finish_page` are wrapped on the instance, so the serial and
+        the async crawl loops (which bind `fetch_page` when they start) are both measured.
+
+        :param crawler: The WebCrawler to instrument.
+        """
+        self.latencies = []
+        self._started = {}
+        fetch_page = crawler.fetch_page
+        finish_page = crawler.finish_page
+
+        def timed_fetch_page(url, *args, **kwargs):
+            self._started[url] = time.perf_counter()
+            return fetch_page(url, *args, **kwargs)
+
+        def timed_finish_page(url, internal_links):
+            started = self._started.pop(url, None)
+            if started is not None:
+                self.latencies.append(time.perf_counter() - started)
+            return finish_page(url, internal_links)
+
+        crawler.fetch_page = timed_fetch_page
+        crawler.finish_page = timed_finish_page
+
+
+def percentile(values, fraction):
+    """
+    Return the nearest-rank percentile of a list of values.
+
+    :param values: The measured values.
+    :param fraction: The percentile as a fraction, e.g. 0.99.
+    :return: The percentile, or None if there are no values.
+    """
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, int(round(fraction * len(ordered))) - 1))]
+
+
+def build_crawler(scenario, base_url, pages, logger, polite):
+    from Scraper.LimitedWebCrawler import LimitedWebCrawler
+    from Scraper.PolitenessScheduler import PolitenessScheduler
+    from Scraper.WebCrawler import WebCrawler
+
+    transport = FixtureTransport(base_url, logger=logger)
+    # Without --polite, the scheduler still runs (robots.txt, rate adaptation) but never throttles
+    scheduler = None if polite else PolitenessScheduler(
+        transport, user_agent=transport.user_agent, initial_rate=1000, max_rate=1000, logger=logger
+    )
+    if scenario.startswith("limited"):
+        # LimitedWebCrawler follows four topics, so spread the page budget over them
+        return LimitedWebCrawler(HOMEPAGE, max_seen_urls_per_topic=max(1, pages // 4), logger=logger,
+                                 transport=transport, scheduler=scheduler)
+    return WebCrawler(HOMEPAGE, max_seen_urls=pages, logger=logger, transport=transport, scheduler=scheduler)
+
+
+def build_scraper(base_url, pages, logger, polite, save_dir, embedding_latency, sitemap, pipeline=False):
+    from Embeddings.EmbeddingBackend import CohereEmbeddingBackend
+    from Embeddings.RateLimiter import EmbeddingRateLimiter
+    from Scraper.LimitedWebScraper import LimitedWebScraper
+    from Scraper.PolitenessScheduler import PolitenessScheduler
+
+    scraper = LimitedWebScraper(
+        HOMEPAGE,
+        mongo_uri=None,
+        max_seen_urls_per_topic=max(1, pages // 4),
+        main_save_path=save_dir,
+        log_to_console=False,
+        sitemap_urls=[SITE_ROOT + "/sitemap.xml"] if sitemap else None,
+        pipeline=pipeline,
+    )
+    scraper.logger.setLevel(logger.level)
+    crawler = scraper.crawler
+    crawler.transport.close()
+    crawler.transport = FixtureTransport(base_url, logger=scraper.logger)
+    crawler.scheduler = PolitenessScheduler(
+        crawler.transport,
+        user_agent=crawler.transport.user_agent,
+        **({} if polite else dict(initial_rate=1000, max_rate=1000)),
+        logger=scraper.logger
+    )
+    scraper.mongo_client = StubMongo()
+    scraper.extractor.mongo_client = scraper.mongo_client
+    scraper.extractor.cohere_api_embed = StubEmbedder(embedding_latency)
+    # No cache or quota, so every run measures the same embedding work
+    scraper.extractor.embedder = CohereEmbeddingBackend(
+        scraper.extractor.cohere_api_embed, rate_limiter=EmbeddingRateLimiter(requests_per_minute=10 ** 9),
+        logger=scraper.logger
+    )
+    return scraper
+
+
+def run_scenario(scenario, base_url, pages, concurrency=8, polite=False, embedding_latency=0.0, sitemap=False,
+                 log_level=logging.WARNING):
+    """
+    Run one benchmark scenario against a running FixtureSite and measure it.
+
+    Meant to run in a fresh process, so the reported peak RSS belongs to this scenario only.
+
+    :param scenario: One of SCENARIOS.
+    :param base_url: Base URL of the FixtureSite server.
+    :param pages: Page budget of the crawl.
+    :param concurrency: Fetches in flight for the async scenarios.
+    :param polite: Whether to keep the default politeness rates instead of an unthrottled scheduler.
+    :param embedding_latency: Simulated latency of one embedding call in the scraper scenarios.
+    :param sitemap: Whether the scraper scenarios seed their frontier from sitemap.xml.
+    :param log_level: Level of the crawler's logger.
+    :return: Dictionary of measurements.
+    """
+    logger = logging.getLogger("benchmarks.crawl")
+    logger.setLevel(log_level)
+
+    with tempfile.TemporaryDirectory() as save_dir:
+        if scenario.startswith("scraper"):
+            scraper = build_scraper(base_url, pages, logger, polite, save_dir, embedding_latency, sitemap,
+                                    pipeline=scenario == "scraper-pipeline")
+            crawler = scraper.crawler
+            timer = PageTimer(crawler)
+            started = time.perf_counter()
+            scraper.run()
+        else:
+            crawler = build_crawler(scenario, base_url, pages, logger, polite)
+            timer = PageTimer(crawler)
+            started = time.perf_counter()
+            if scenario.endswith("-async"):
+                crawler.crawl_and_process_async(NullExtractor(), concurrency=concurrency,
+                                                per_host_concurrency=concurrency)
+            else:
+                crawler.crawl_and_process(NullExtractor())
+            crawler.transport.close()
+        elapsed = time.perf_counter() - started
+
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    peak_rss_mb = max_rss / (1024 * 1024) if sys.platform == "darwin" else max_rss / 1024
+    page_count = len(timer.latencies)
+    return {
+        "scenario": scenario,
+        "pages": page_count,
+        "seconds": round(elapsed, 3),
+        "pages_per_sec": round(page_count / elapsed, 2) if elapsed else None,
+        "p50_ms": round(percentile(timer.latencies, 0.5) * 1000, 2) if page_count else None,
+        "p99_ms": round(percentile(timer.latencies, 0.99) * 1000, 2) if page_count else None,
+        "peak_rss_mb": round(peak_rss_mb, 1),
+    }
+
+
+def run_benchmarks(scenarios, site_kwargs, **scenario_kwargs):
+    """
+    Serve a FixtureSite and run each scenario against it in its own process.
+
+    :param scenarios: Names of the scenarios to run, in order.
+    :param site_kwargs: FixtureSite arguments (article count, latency, page size, error rate...).
+    :param scenario_kwargs: Further run_scenario arguments.
+    :return: List of measurement dictionaries, one per scenario.
+    """
+    results = []
+    with FixtureSite(**site_kwargs) as site:
+        # Spawned processes start from a clean interpreter, so the RSS of one scenario does not leak into the next
+        context = multiprocessing.get_context("spawn")
+        for scenario in scenarios:
+            with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+                result = executor.submit(run_scenario, scenario, site.base_url, **scenario_kwargs).result()
+            result["server_errors"] = site.error_count
+            results.append(result)
+            site.error_count = 0
+    return results
+
+
+def format_table(results):
+    columns = ("scenario", "pages", "seconds", "pages_per_sec", "p50_ms", "p99_ms", "peak_rss_mb", "server_errors")
+    rows = [columns] + [tuple("-" if result[column] is None else str(result[column]) for column in columns)
+                        for result in results]
+    widths = [max(len(row[index]) for row in rows) for index in range(len(columns))]
+    return "\n".join("  ".join(cell.ljust(width) for cell, width in zip(row, widths)).rstrip() for row in rows)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the crawlers and the scraping pipeline offline, "
+                                                 "against a local Instructables-like fixture site.")
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument("--pages", type=int, default=200, help="Page budget of every crawl")
+    parser.add_argument("--articles", type=int, default=1000, help="Number of articles on the fixture site")
+    parser.add_argument("--latency", type=float, default=0.0, help="Server response delay in seconds")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Maximum extra random delay in seconds")
+    parser.add_argument("--page-size", type=int, default=20000, help="Approximate article text size in bytes")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with a 503")
+    parser.add_argument("--archive-dir", default=None, help="Serve pages recorded in a PageArchive instead")
+    parser.add_argument("--concurrency", type=int, default=8, help="Fetches in flight for the async scenarios")
+    parser.add_argument("--embedding-latency", type=float, default=0.0,
+                        help="Simulated latency of one embedding call in seconds")
+    parser.add_argument("--sitemap", action="store_true", help="Seed the scraper scenarios from sitemap.xml")
+    parser.add_argument("--polite", action="store_true", help="Keep the default per-domain politeness rates")
+    parser.add_argument("--json", dest="json_path", default=None, help="Also write the results to this JSON file")
+    args = parser.parse_args()
+
+    results = run_benchmarks(
+        args.scenarios,
+        dict(article_count=args.articles, latency=args.latency, jitter=args.jitter, page_size=args.page_size,
+             error_rate=args.error_rate, archive_dir=args.archive_dir),
+        pages=args.pages,
+        concurrency=args.concurrency,
+        polite=args.polite,
+        embedding_latency=args.embedding_latency,
+        sitemap=args.sitemap,
+    )
+    print(format_table(results))
+    if args.json_path:
+        with open(args.json_path, "w") as json_file:
+            json.dump(results, json_file, indent=2)
@@ -0,0 +1,266 @@
+import gzip
+import random
+import threading
+import time
+from functools import lru_cache
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from Scraper.HttpTransport import HttpTransport
+from Scraper.PageArchive import PageArchive
+
+SITE_ROOT = "https://www.instructables.com"
+TOPICS = {
+    "Circuits": ["Arduino", "Electronics", "LEDs"],
+    "Workshop": ["Woodworking", "Metalworking", "Tools"],
+    "Craft": ["Sewing", "Paper", "Knitting"],
+    "Cooking": ["Bread", "Dessert", "Main-Course"],
+    "Living": ["Decorating", "Cleaning", "Organizing"],
+    "Outside": ["Gardening", "Camping", "Backyard"],
+}
+WORDS = (
+    "cut drill glue sand screw board frame wood paint measure mark clamp attach fold stitch mix bake heat "
+    "wire solder connect test mount hang level fill trim shape smooth dry coat layer bolt hinge panel "
+    "corner edge piece step then carefully slowly until firmly evenly both each the a of with and to"
+).split()
+
+
+class FixtureSite:
+    def __init__(self, article_count=1000, latency=0.0, jitter=0.0, page_size=20000, error_rate=0.0,
+                 links_per_page=20, seed=0, archive_dir=None):
+        """
+        Serve an Instructables-like site from a local HTTP server for offline benchmarks.
+
+        The synthetic site has the HTML sitemap, topic and channel listings, and article pages
+        with the same markup the crawler and the content extractor read (category, channel and
+        title elements, rel=canonical, steps of text and related-article links), plus robots.txt
+        and sitemap.xml. With `archive_dir`, pages recorded in a PageArchive are served instead.
+
+        :param article_count: Number of synthetic articles.
+        :param latency: Base response delay in seconds.
+        :param jitter: Maximum extra random delay in seconds.
+        :param page_size: Approximate size of an article's text, in bytes.
+        :param error_rate: Fraction of page requests answered with a 503.
+        :param links_per_page: Number of related-article links per article.
+        :param seed: Seed of the random generator, so runs are repeatable.
+        :param archive_dir: Optional PageArchive directory to replay recorded pages from.
+        """
+        self.article_count = article_count
+        self.latency = latency
+        self.jitter = jitter
+        self.page_size = page_size
+        self.error_rate = error_rate
+        self.links_per_page = links_per_page
+        self.seed = seed
+        self.archive = PageArchive(archive_dir) if archive_dir else None
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.request_count = 0
+        self.error_count = 0
+        self.server = None
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        """
+        Start serving on a free local port in a background thread.
+
+        :return: The base URL of the server.
+        """
+        site = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # Headers and body are written separately; without this, delayed ACKs add ~40ms per response
+            disable_nagle_algorithm = True
+
+            def do_GET(self):
+                site.handle(self)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.server.daemon_threads = True
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._thread.start()
+        return self.base_url
+
+    def stop(self):
+        """
+        Stop the server.
+        """
+        if self.server:
+            self.server.shutdown()
+            self.server.server_close()
+        if self.archive:
+            self.archive.close()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def handle(self, request):
+        with self._lock:
+            self.request_count += 1
+            fail = self._random.random() < self.error_rate
+            delay = self.latency + self._random.uniform(0, self.jitter)
+        if delay:
+            time.sleep(delay)
+
+        path = request.path.split("?", 1)[0].split("#", 1)[0]
+        if path == "/robots.txt":
+            status, body, content_type = 200, b"User-agent: *\nAllow: /\n", "text/plain"
+        elif fail:
+            with self._lock:
+                self.error_count += 1
+            status, body, content_type = 503, b"Service Unavailable", "text/plain"
+        else:
+            status, body, content_type = self.render(path)
+
+        if "gzip" in request.headers.get("Accept-Encoding", "") and len(body) > 1024:
+            body = gzip.compress(body, compresslevel=5)
+            encoding = "gzip"
+        else:
+            encoding = None
+
+        request.send_response(status)
+        request.send_header("Content-Type", content_type)
+        request.send_header("Content-Length", str(len(body)))
+        if encoding:
+            request.send_header("Content-Encoding", encoding)
+        if status == 503:
+            request.send_header("Retry-After", "0")
+        request.end_headers()
+        request.wfile.write(body)
+
+    def render(self, path):
+        if self.archive:
+            html = self.archive.get(SITE_ROOT + path)
+            if html is None:
+                return 404, b"Not Found", "text/plain"
+            return 200, html.encode(), "text/html; charset=utf-8"
+        page = _render(path, self.article_count, self.page_size, self.links_per_page, self.seed)
+        if page is None:
+            return 404, b"Not Found", "text/plain"
+        return (200, page, "application/xml") if path.endswith(".xml") else (200, page, "text/html; charset=utf-8")
+
+
+@lru_cache(maxsize=8192)
+def _render(path, article_count, page_size, links_per_page, seed):
+    # Pages are deterministic, so generating each one once keeps the server off the benchmark's critical path
+    return _SiteLayout(article_count, page_size, links_per_page, seed).render(path)
+
+
+class _SiteLayout:
+    def __init__(self, article_count, page_size, links_per_page, seed):
+        self.article_count = article_count
+        self.page_size = page_size
+        self.links_per_page = links_per_page
+        self.seed = seed
+
+    def topic(self, index):
+        topic = list(TOPICS)[index % len(TOPICS)]
+        channels = TOPICS[topic]
+        return topic, channels[index // len(TOPICS) % len(channels)]
+
+    def render(self, path):
+        segments = [segment for segment in path.split("/") if segment]
+        if path == "/sitemap.xml":
+            return self.sitemap_xml()
+        if segments == ["sitemap"]:
+            return self.html_sitemap()
+        if len(segments) == 2 and segments[0].capitalize() in TOPICS:
+            return self.channel_listing(segments[0].capitalize(), segments[1])
+        if len(segments) == 1 and segments[0].startswith("Project-"):
+            try:
+                index = int(segments[0].split("-", 1)[1])
+            except ValueError:
+                return None
+            return self.article(index) if 0 <= index < self.article_count else None
+        return None
+
+    def sitemap_xml(self):
+        entries = "".join(
+            f"<url><loc>{SITE_ROOT}/Project-{index:05d}/</loc><lastmod>2024-01-01</lastmod></url>"
+            for index in range(self.article_count)
+        )
+        return (
+            '<?xml version="1.0" encoding="UTF-8"?>'
+            f'<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">{entries}</urlset>'
+        ).encode()
+
+    def html_sitemap(self):
+        sections = []
+        for topic, channels in TOPICS.items():
+            links = "".join(f'<li><a href="/{topic.lower()}/{channel.lower()}/">{channel}</a></li>' for channel in channels)
+            sections.append(
+                f'<div class="group-section"><h2><a href="/{topic.lower()}/">{topic}</a></h2>'
+                f'<ul class="sitemap-listing">{links}</ul></div>'
+            )
+        return f"<html><head><title>Sitemap</title></head><body>{''.join(sections)}</body></html>".encode()
+
+    def channel_listing(self, topic, channel):
+        links = "".join(
+            f'<li><a href="/Project-{index:05d}/">Project {index}</a></li>'
+            for index in range(self.article_count)
+            if self.topic(index)[0] == topic and self.topic(index)[1].lower() == channel
+        )
+        return (
+            f'<html><head><title>{channel}</title></head><body>'
+            f'<a class="category" href="/{topic.lower()}/">{topic}</a><ul>{links}</ul></body></html>'
+        ).encode()
+
+    def article(self, index):
+        rng = random.Random(self.seed * 1_000_003 + index)
+        topic, channel = self.topic(index)
+        steps = []
+        size = 0
+        step_number = 1
+        while size < self.page_size:
+            sentences = []
+            for _ in range(rng.randint(3, 8)):
+                words = rng.choices(WORDS, k=rng.randint(8, 20))
+                sentences.append(" ".join(words).capitalize() + ".")
+            text = " ".join(sentences)
+            steps.append(f"<section class=\"step\"><h2>Step {step_number}</h2><p>{text}</p></section>")
+            size += len(text)
+            step_number += 1
+        related = "".join(
+            f'<li><a href="/Project-{rng.randrange(self.article_count):05d}/">Related</a></li>'
+            for _ in range(self.links_per_page)
+        )
+        return (
+            f'<html><head><title>Project {index}</title>'
+            f'<link rel="canonical" href="{SITE_ROOT}/Project-{index:05d}/"></head><body>'
+            f'<a class="category" href="/{topic.lower()}/">{topic}</a>'
+            f'<a class="channel" href="/{topic.lower()}/{channel.lower()}/">{channel}</a>'
+            f'<h1 class="header-title">Project {index}</h1>'
+            f'<article>{"".join(steps)}</article><ul class="related">{related}</ul></body></html>'
+        ).encode()
+
+
+class FixtureTransport(HttpTransport):
+    def __init__(self, base_url, **kwargs):
+        """
+        HttpTransport that sends requests for the real site to the local fixture server.
+
+        The crawler keeps working with its usual URLs (so link filtering, topic routing and
+        canonicalisation behave as in production) while every request goes to `base_url`.
+
+        :param base_url: Base URL of the FixtureSite server.
+        :param kwargs: Further HttpTransport arguments.
+        """
+        super().__init__(**kwargs)
+        self.base_url = base_url
+
+    def get(self, url, headers=None, stream=False):
+        if url.startswith(SITE_ROOT):
+            url = self.base_url + url[len(SITE_ROOT):]
+        return super().get(url, headers=headers, stream=stream)
@@ -0,0 +1,99 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+from collections import Counter
+
+# Cold-start budget of every CLI entry point (and of the module worker processes import), in seconds
+ENTRY_POINTS = {
+    "Scraper.main": 1.0,
+    "Scraper.distributed": 1.0,
+    "Scraper.replay": 1.0,
+    "Scraper.Resources": 0.3,
+    # Imported by every ingestion worker process before it handles a page
+    "Scraper.ContentExtractorV2": 0.5,
+    # langchain and langgraph alone take most of this budget
+    "DIYAgentRetry.main": 2.0,
+    "DIYAgentRetry.AtlasClient": 1.0,
+}
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def parse_importtime(stderr):
+    """
+    Sum the self import time of every top-level package from `python -X importtime` output.
+
+    :param stderr: Standard error of the profiled interpreter.
+    :return: Counter of microseconds by top-level package name.
+    """
+    packages = Counter()
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        fields = line[len("import time:"):].split("|")
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            continue
+        packages[fields[2].strip().split(".")[0]] += int(fields[0])
+    return packages
+
+
+def profile_import(module, budget, runs=3, top=5):
+    """
+    Measure the cold-start import time of a module in fresh interpreters.
+
+    :param module: Module to import.
+    :param budget: Allowed import time in seconds.
+    :param runs: Number of interpreters to start; the fastest run is reported.
+    :param top: Number of slowest packages to report.
+    :return: Dictionary of measurements.
+    """
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(
+        [REPO_ROOT, os.path.join(REPO_ROOT, "Scraper")] + [path for path in [os.getenv("PYTHONPATH")] if path]
+    ))
+    durations = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        process = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                                 capture_output=True, text=True, cwd=REPO_ROOT, env=env)
+        durations.append(time.perf_counter() - started)
+        if process.returncode != 0:
+            return {"module": module, "seconds": None, "budget": budget, "within_budget": False,
+                    "slowest": None, "error": process.stderr.strip().splitlines()[-1]}
+    packages = parse_importtime(process.stderr)
+    seconds = round(min(durations), 3)
+    return {
+        "module": module,
+        "seconds": seconds,
+        "budget": budget,
+        "within_budget": seconds <= budget,
+        "slowest": ", ".join(f"{name} {microseconds / 1000:.0f}ms" for name, microseconds in packages.most_common(top)),
+        "error": None,
+    }
+
+
+def format_table(results):
+    columns = ("module", "seconds", "budget", "within_budget", "slowest", "error")
+    rows = [columns] + [tuple("-" if result[column] is None else str(result[column]) for column in columns)
+                        for result in results]
+    widths = [max(len(row[index]) for row in rows) for index in range(len(columns))]
+    return "\n".join("  ".join(cell.ljust(width) for cell, width in zip(row, widths)).rstrip() for row in rows)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Profile the cold-start import time of the CLI entry points "
+                                                 "against their budgets.")
+    parser.add_argument("--modules", nargs="+", choices=list(ENTRY_POINTS), default=list(ENTRY_POINTS))
+    parser.add_argument("--runs", type=int, default=3, help="Fresh interpreters per module; the fastest counts")
+    parser.add_argument("--check", action="store_true", help="Exit with status 1 if a module is over budget")
+    parser.add_argument("--json", dest="json_path", default=None, help="Also write the results to this JSON file")
+    args = parser.parse_args()
+
+    results = [profile_import(module, ENTRY_POINTS[module], runs=args.runs) for module in args.modules]
+    print(format_table(results))
+    if args.json_path:
+        with open(args.json_path, "w") as json_file:
+            json.dump(results, json_file, indent=2)
+    if args.check and not all(result["within_budget"] for result in results):
+        sys.exit(1)
@@ -0,0 +1,111 @@
+import argparse
+import json
+import random
+import time
+
+from benchmarks.crawl_benchmark import percentile
+from benchmarks.fixture_site import WORDS
+
+SUMMARY_SENTENCES = 5
+
+
+def article_text(index, page_size, seed=0):
+    """
+    Generate the plain text of an Instructables-like article, with the fixture site's vocabulary.
+
+    :param index: Article index.
+    :param page_size: Approximate text size in characters.
+    :param seed: Seed of the generated corpus.
+    :return: The article text.
+    """
+    rng = random.Random(seed * 1_000_003 + index)
+    sentences = []
+    size = 0
+    while size < page_size:
+        sentence = " ".join(rng.choices(WORDS, k=rng.randint(8, 20))).capitalize() + "."
+        sentences.append(sentence)
+        size += len(sentence) + 1
+    return " ".join(sentences)
+
+
+def sumy_summarizer():
+    from sumy.nlp.tokenizers import Tokenizer
+    from sumy.parsers.plaintext import PlaintextParser
+    from sumy.summarizers.lex_rank import LexRankSummarizer
+
+    # The per-page path the extractor used before FastLexRank
+    def summarize(text):
+        parser = PlaintextParser.from_string(text, Tokenizer("english"))
+        return [str(sentence) for sentence in LexRankSummarizer()(parser.document, SUMMARY_SENTENCES)]
+    return summarize
+
+
+def fast_summarizer(max_sentences):
+    from nltk.tokenize.punkt import PunktTokenizer
+    from sumy.utils import get_stop_words
+
+    from Scraper.FastLexRank import FastLexRankSummarizer
+
+    # Configured like ContentExtractor: state built once, reused for every page
+    sentence_splitter = PunktTokenizer("english")
+    summarizer = FastLexRankSummarizer(stop_words=get_stop_words("english"), max_sentences=max_sentences)
+
+    def summarize(text):
+        return summarizer.summarize(sentence_splitter.tokenize(text), SUMMARY_SENTENCES)
+    return summarize
+
+
+def run_summarizer(name, summarize, texts):
+    """
+    Summarise every text and measure the per-page CPU time.
+
+    :param name: Name of the summariser.
+    :param summarize: Function from a text to its list of summary sentences.
+    :param texts: Article texts.
+    :return: Tuple of (dictionary of measurements, list of summaries).
+    """
+    durations = []
+    summaries = []
+    for text in texts:
+        started = time.process_time()
+        summaries.append(summarize(text))
+        durations.append(time.process_time() - started)
+    return {
+        "summarizer": name,
+        "pages": len(texts),
+        "cpu_seconds": round(sum(durations), 3),
+        "p50_ms": round(percentile(durations, 0.5) * 1000, 2),
+        "p99_ms": round(percentile(durations, 0.99) * 1000, 2),
+    }, summaries
+
+
+def format_table(results):
+    columns = ("summarizer", "pages", "cpu_seconds", "p50_ms", "p99_ms", "speedup", "shared_sentences")
+    rows = [columns] + [tuple("-" if result.get(column) is None else str(result[column]) for column in columns)
+                        for result in results]
+    widths = [max(len(row[index]) for row in rows) for index in range(len(columns))]
+    return "\n".join("  ".join(cell.ljust(width) for cell, width in zip(row, widths)).rstrip() for row in rows)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare the vectorised LexRank summariser with sumy's "
+                                                 "LexRank on generated articles.")
+    parser.add_argument("--pages", type=int, default=50, help="Number of articles to summarise")
+    parser.add_argument("--page-size", type=int, default=20000, help="Approximate article text size in characters")
+    parser.add_argument("--max-sentences", type=int, default=200, help="Candidate sentence cap of the fast path")
+    parser.add_argument("--json", dest="json_path", default=None, help="Also write the results to this JSON file")
+    args = parser.parse_args()
+
+    texts = [article_text(index, args.page_size) for index in range(args.pages)]
+    baseline, baseline_summaries = run_summarizer("sumy", sumy_summarizer(), texts)
+    fast, fast_summaries = run_summarizer("fast", fast_summarizer(args.max_sentences), texts)
+
+    fast["speedup"] = round(baseline["cpu_seconds"] / fast["cpu_seconds"], 1) if fast["cpu_seconds"] else None
+    # Share of the sumy summary sentences that the fast summary also picked
+    shared = sum(len(set(a) & set(b)) for a, b in zip(baseline_summaries, fast_summaries))
+    fast["shared_sentences"] = round(shared / max(1, sum(len(summary) for summary in baseline_summaries)), 3)
+    results = [baseline, fast]
+    print(format_table(results))
+    if args.json_path:
+        with open(args.json_path, "w") as json_file:
+            json.dump(results, json_file, indent=2)
@@ -0,0 +1,64 @@
+from types import SimpleNamespace
+
+from Embeddings.BatchEmbedder import BatchEmbedder
+from Embeddings.RateLimiter import EmbeddingRateLimiter
+
+
+class FakeCohere:
+    def __init__(self, rate_limited=0):
+        self.batches = []
+        self.rate_limited = rate_limited
+
+    def embed(self, texts, model, input_type, embedding_types):
+        self.batches.append(list(texts))
+        if self.rate_limited:
+            self.rate_limited -= 1
+            raise RateLimitError()
+        if "fail" in texts:
+            raise RuntimeError("bad request")
+        return SimpleNamespace(embeddings=SimpleNamespace(float=[[float(len(text))] for text in texts]))
+
+
+class RateLimitError(Exception):
+    status_code = 429
+    headers = {"retry-after": "0.05"}
+
+
+def test_batch_embedder_splits_requests_and_keeps_order() -> None:
+    client = FakeCohere()
+    embedder = BatchEmbedder(client, max_batch_size=2, max_concurrency=1)
+
+    assert embedder.embed(["a", "bb", "ccc", "fail", "eeeee"]) == [[1.0], [2.0], None, None, [5.0]]
+    assert client.batches == [["a", "bb"], ["ccc", "fail"], ["eeeee"]]
+    stats = embedder.stats()
+    assert (stats["requests"], stats["texts"], stats["texts_per_request"]) == (2, 3, 1.5)
+
+
+def test_batch_embedder_retries_rate_limited_requests_within_quota() -> None:
+    client = FakeCohere(rate_limited=2)
+    limiter = EmbeddingRateLimiter(requests_per_minute=600, tokens_per_minute=60000)
+    embedder = BatchEmbedder(client, max_batch_size=1, rate_limiter=limiter, max_concurrency=4)
+
+    assert embedder.embed(["a", "bb", "ccc"]) == [[1.0], [2.0], [3.0]]
+    assert len(client.batches) == 5
+    quota = embedder.stats()["quota"]
+    assert quota["requests"] == 3
+    assert quota["rate_limited"] == 2
+    # 600 requests/min allows a burst of 10, then one request every 0.1s
+    assert quota["waited_seconds"] >= 0.05
+
+
+def test_embed_batch_splits_more_texts_than_one_request_takes() -> None:
+    client = FakeCohere()
+    embedder = BatchEmbedder(client)
+    texts = [f"text {index}" for index in range(200)]
+
+    assert embedder.embed_batch(texts) == [[float(len(text))] for text in texts]
+    assert sorted(len(batch) for batch in client.batches) == [8, 96, 96]
+
+
+def test_token_refunds_do_not_overfill_the_bucket() -> None:
+    limiter = EmbeddingRateLimiter(requests_per_minute=600, tokens_per_minute=600)
+    # The estimate was far too high: only the unused part of the reservation is given back
+    limiter.record_success(1, estimated_tokens=1000)
+    assert limiter.token_bucket.tokens == limiter.token_bucket.capacity
@@ -0,0 +1,82 @@
+import logging
+
+from Scraper.ContentExtractorV2 import ContentExtractor
+from Scraper.NearDuplicateIndex import NearDuplicateIndex
+from Scraper.RecrawlCache import RecrawlCache
+
+ARTICLE = " ".join(
+    f"Step {number}: cut board {number} to size, sand the edges smooth and glue it to the frame." for number in range(1, 30)
+)
+
+
+class FakeMongo:
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.documents = []
+        self.chunks = []
+        self.duplicates = []
+
+    def save_full_data(self, data):
+        if self.fail:
+            return None
+        self.documents.append(data)
+        return f"{len(self.documents):024x}"
+
+    def save_chunk(self, chunk, content_id):
+        self.chunks.append((chunk, content_id))
+
+    def save_duplicate_reference(self, data, duplicate_of):
+        self.duplicates.append((data["url"], duplicate_of))
+
+
+def make_document(url, content):
+    return {
+        "url": url, "category": "Craft", "sub_category": "General", "title": "Title", "youtube_url": None,
+        "content": content, "content_hash": f"hash-{content}", "fingerprint": None, "summary": content,
+        "summary_embedding": None, "chunks": [{"category": "Craft", "text": content, "chunk_index": 0}],
+    }
+
+
+def test_failed_store_does_not_record_the_content_hash(tmp_path) -> None:
+    recrawl_cache = RecrawlCache(str(tmp_path / "recrawl.db"))
+    mongo = FakeMongo(fail=True)
+    extractor = ContentExtractor(mongo, logger=logging.getLogger("test_content_extractor"),
+                                 recrawl_cache=recrawl_cache)
+    document = make_document("https://example.com/a/", "text")
+
+    assert extractor.store_document(document) is None
+    assert mongo.chunks == []
+    # The page is extracted and stored again on the next crawl
+    assert not recrawl_cache.is_content_unchanged("https://example.com/a/", "hash-text")
+
+    mongo.fail = False
+    assert extractor.store_document(document) is not None
+    assert recrawl_cache.is_content_unchanged("https://example.com/a/", "hash-text")
+    recrawl_cache.close()
+
+
+def test_near_duplicates_refer_only_to_stored_documents(tmp_path) -> None:
+    near_duplicate_index = NearDuplicateIndex(str(tmp_path / "near_duplicates.db"))
+    mongo = FakeMongo(fail=True)
+    extractor = ContentExtractor(mongo, logger=logging.getLogger("test_content_extractor"),
+                                 near_duplicate_index=near_duplicate_index)
+    original = make_document("https://example.com/a/", ARTICLE)
+    copy = make_document("https://example.com/b/", ARTICLE + " Enjoy!")
+    assert extractor.deduplicate_document(original)
+
+    # The original is still in flight, so its near-duplicate is skipped rather than stored as a reference
+    assert not extractor.deduplicate_document(copy)
+    assert mongo.duplicates == []
+
+    # The store fails: nothing is persisted, and the copy is no longer a duplicate of it
+    assert extractor.store_document(original) is None
+    reopened = NearDuplicateIndex(str(tmp_path / "near_duplicates.db"))
+    assert reopened.stats()["indexed"] == 0
+    reopened.close()
+    assert extractor.deduplicate_document(copy)
+
+    mongo.fail = False
+    content_id = extractor.store_document(copy)
+    assert not extractor.deduplicate_document(make_document("https://example.com/c/", ARTICLE))
+    assert mongo.duplicates == [("https://example.com/c/", content_id)]
+    near_duplicate_index.close()
@@ -0,0 +1,54 @@
+import random
+
+import pytest
+
+from Scraper.CrawlFrontier import CrawlFrontier, TopicFrontier
+
+
+def test_frontier_is_fifo_and_rejects_duplicates() -> None:
+    frontier = CrawlFrontier(["a", "b"])
+    assert frontier.extend(["b", "c", "a", "c"]) == 1
+
+    assert [frontier.popleft() for _ in range(len(frontier))] == ["a", "b", "c"]
+    assert frontier.stats() == {"size": 0, "enqueued": 3, "duplicates_rejected": 3}
+    # URLs that already left the frontier are still treated as duplicates
+    assert not frontier.add("a")
+
+
+def test_pop_random_keeps_fifo_order_of_the_rest() -> None:
+    frontier = CrawlFrontier([str(i) for i in range(10)])
+    rng = random.Random(0)
+    taken = {frontier.pop_random(rng) for _ in range(4)}
+
+    remaining = list(frontier)
+    assert len(frontier) == 6
+    assert remaining == [str(i) for i in range(10) if str(i) not in taken]
+    assert [frontier.popleft() for _ in range(6)] == remaining
+    assert not frontier
+    with pytest.raises(IndexError):
+        frontier.popleft()
+    with pytest.raises(IndexError):
+        frontier.pop_random()
+
+
+def test_topic_frontier_fills_topics_in_parallel_and_drops_full_topics() -> None:
+    counts = {"Craft": 0, "Cooking": 3}
+    frontier = TopicFrontier(
+        counts,
+        is_topic_full=lambda topic: counts[topic] >= 3,
+        topic_fill_ratio=lambda topic: counts[topic] / 3,
+        urls=["nav"],
+    )
+    assert frontier.add("craft-1", {"topic_hint": "Craft"})
+    assert not frontier.add("cooking-1", {"topic_hint": "Cooking"})
+    assert frontier.add("craft-2", {"topic_hint": "Craft"})
+
+    # Topic queues alternate with the unrouted queue
+    assert [frontier.popleft() for _ in range(3)] == ["nav", "craft-1", "craft-2"]
+
+    frontier.add("craft-3", {"topic_hint": "Craft"})
+    counts["Craft"] = 3
+    assert not frontier
+    with pytest.raises(IndexError):
+        frontier.popleft()
+    assert frontier.stats()["dropped_for_full_topics"] == 2
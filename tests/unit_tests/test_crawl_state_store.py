@@ -0,0 +1,41 @@
+import logging
+
+from Scraper.CrawlStateStore import CrawlStateStore
+from Scraper.WebCrawler import WebCrawler
+
+
+def test_state_store_resumes_from_last_recorded_page(tmp_path) -> None:
+    db_path = str(tmp_path / "crawl_state.db")
+    store = CrawlStateStore(db_path)
+    assert store.is_empty()
+
+    store.record_enqueued(["home"])
+    store.record_page("home", ["a", "b", "c"], {"Craft": 0})
+    store.record_page("b", [("d", {"topic_hint": "Craft", "lastmod": "2024-05-01"}), "a"], {"Craft": 1})
+    store.close()
+
+    resumed = CrawlStateStore(db_path)
+    visited, pending, topic_counts = resumed.load()
+    assert visited == {"home", "b"}
+    assert pending == [("a", None), ("c", None), ("d", {"topic_hint": "Craft", "lastmod": "2024-05-01"})]
+    assert topic_counts == {"Craft": 1}
+
+    resumed.reset()
+    assert resumed.is_empty()
+    resumed.close()
+
+
+def test_crawler_restores_frontier_metadata_on_resume(tmp_path) -> None:
+    db_path = str(tmp_path / "crawl_state.db")
+    crawler = WebCrawler("https://www.instructables.com/sitemap/", logger=logging.getLogger("test_crawl_state_store"),
+                         state_store=CrawlStateStore(db_path))
+    crawler.restore_state()
+    crawler.link_metadata["https://www.instructables.com/shelf/"] = {"topic_hint": "Craft"}
+    crawler.finish_page("https://www.instructables.com/sitemap/", ["https://www.instructables.com/shelf/"])
+    crawler.state_store.close()
+
+    resumed = WebCrawler("https://www.instructables.com/sitemap/", logger=logging.getLogger("test_crawl_state_store"),
+                         state_store=CrawlStateStore(db_path))
+    assert resumed.restore_state()
+    assert resumed.to_visit.popleft_entry() == ("https://www.instructables.com/shelf/", {"topic_hint": "Craft"})
+    resumed.state_store.close()
@@ -0,0 +1,47 @@
+from types import SimpleNamespace
+
+import pytest
+
+from Embeddings.EmbeddingBackend import CohereEmbeddingBackend, create_embedding_backend
+
+
+class FakeCohere:
+    def __init__(self):
+        self.calls = []
+
+    def embed(self, texts, model, input_type):
+        self.calls.append((model, input_type, list(texts)))
+        return SimpleNamespace(embeddings=[[float(len(text))] for text in texts])
+
+
+def test_create_embedding_backend_selects_backend_by_configuration(monkeypatch) -> None:
+    monkeypatch.setenv("EMBEDDING_CACHE_PATH", "")
+    monkeypatch.setenv("EMBEDDING_BACKEND", "cohere")
+    client = FakeCohere()
+    backend = create_embedding_backend(client, cohere_model="embed-english-v3.0", embedding_type=None)
+
+    assert isinstance(backend, CohereEmbeddingBackend)
+    assert backend.embed_batch(["query"], input_type="search_query") == [[5.0]]
+    assert backend.embed(["a", "bb"]) == [[1.0], [2.0]]
+    assert client.calls == [
+        ("embed-english-v3.0", "search_query", ["query"]),
+        ("embed-english-v3.0", "search_document", ["a", "bb"]),
+    ]
+    assert set(backend.stats()) == {"search_query", "search_document"}
+
+    monkeypatch.setenv("EMBEDDING_BACKEND", "openai")
+    with pytest.raises(ValueError, match="Unknown embedding backend"):
+        create_embedding_backend(client)
+
+
+def test_cohere_client_is_only_created_on_the_first_request(monkeypatch) -> None:
+    monkeypatch.setenv("EMBEDDING_CACHE_PATH", "")
+    monkeypatch.setenv("EMBEDDING_BACKEND", "cohere")
+    versions = []
+    client = FakeCohere()
+    monkeypatch.setattr("Embeddings.EmbeddingBackend.cohere_client", lambda version: versions.append(version) or client)
+    backend = create_embedding_backend(embedding_type=None, cohere_client_version=1)
+
+    assert versions == []
+    assert backend.embed_batch(["query"], input_type="search_query") == [[5.0]]
+    assert versions == [1]
@@ -0,0 +1,63 @@
+from types import SimpleNamespace
+
+from Embeddings.BatchEmbedder import BatchEmbedder
+from Embeddings.EmbeddingCache import EmbeddingCache
+
+
+class FakeCohere:
+    def __init__(self):
+        self.texts = []
+
+    def embed(self, texts, model, input_type, embedding_types):
+        self.texts.extend(texts)
+        return SimpleNamespace(embeddings=SimpleNamespace(float=[[len(text) / 10, 0.1] for text in texts]))
+
+
+def test_embedding_cache_persists_and_evicts_least_recently_used(tmp_path) -> None:
+    db_path = str(tmp_path / "embeddings.db")
+    cache = EmbeddingCache(db_path, max_bytes=40, memory_entries=1)
+    cache.put_many("model", "search_document", "float", ["a", "b"], [[0.1, 0.2], [0.3, 0.4]])
+    assert cache.get_many("model", "search_document", "float", ["a", "b", "c"]) == [[0.1, 0.2], [0.3, 0.4], None]
+    # Other models and input types are separate namespaces
+    assert cache.get_many("model", "search_query", "float", ["a"]) == [None]
+
+    # Two 16-byte vectors fit in 40 bytes, so a third one evicts the least recently used ("a")
+    cache.get_many("model", "search_document", "float", ["b"])
+    cache.put_many("model", "search_document", "float", ["c"], [[1, 2]])
+    cache.close()
+
+    reopened = EmbeddingCache(db_path, max_bytes=40)
+    assert reopened.get_many("model", "search_document", "float", ["a", "b", "c"]) == [None, [0.3, 0.4], [1, 2]]
+    assert reopened.stats()["hit_rate"] == round(2 / 3, 3)
+
+
+def test_processes_sharing_the_cache_respect_its_size_limit_together(tmp_path) -> None:
+    db_path = str(tmp_path / "embeddings.db")
+    first = EmbeddingCache(db_path, max_bytes=40)
+    second = EmbeddingCache(db_path, max_bytes=40)
+    first.put_many("model", "search_document", "float", ["a"], [[0.1, 0.2]])
+    second.put_many("model", "search_document", "float", ["b"], [[0.3, 0.4]])
+    # The first cache never saw "b" being written, but counts it before deciding to evict
+    first.put_many("model", "search_document", "float", ["c"], [[0.5, 0.6]])
+    assert first.stats()["bytes"] == 32
+    assert first.stats()["evicted"] == 1
+    first.close()
+    second.close()
+
+    reopened = EmbeddingCache(db_path, max_bytes=40, memory_entries=0)
+    assert reopened.get_many("model", "search_document", "float", ["a", "b", "c"]) == [None, [0.3, 0.4], [0.5, 0.6]]
+    reopened.close()
+
+
+def test_batch_embedder_only_requests_uncached_texts(tmp_path) -> None:
+    client = FakeCohere()
+    cache = EmbeddingCache(str(tmp_path / "embeddings.db"))
+    embedder = BatchEmbedder(client, max_batch_size=2, cache=cache)
+
+    first = embedder.embed(["summary", "chunk one", "summary"])
+    assert client.texts == ["summary", "chunk one"]
+
+    assert embedder.embed(["chunk one", "chunk two", "summary"]) == [first[1], [0.9, 0.1], first[0]]
+    assert embedder.embed_batch(["summary"]) == [first[0]]
+    assert client.texts == ["summary", "chunk one", "chunk two"]
+    assert embedder.stats()["cache"]["misses"] == 4
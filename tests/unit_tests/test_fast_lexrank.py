@@ -0,0 +1,30 @@
+from Scraper.FastLexRank import FastLexRankSummarizer
+
+
+def test_fast_lexrank_picks_central_sentences_in_document_order() -> None:
+    sentences = [
+        "Mix the wood glue well.",
+        "Spread wood glue on both boards.",
+        "My dog likes long walks.",
+        "Press the boards while the glue dries.",
+        "Paint the frame red.",
+        "Wipe extra glue from the boards.",
+        "The weather was sunny.",
+    ]
+    summarizer = FastLexRankSummarizer(stop_words=["the", "on", "from", "while", "my", "was"])
+
+    # Linked to every other glue sentence, so it is the most central one
+    assert summarizer.summarize(sentences, 1) == ["Spread wood glue on both boards."]
+    summary = summarizer.summarize(sentences, 3)
+    assert summary == sorted(summary, key=sentences.index)
+    assert summarizer.summarize([], 3) == []
+
+
+def test_fast_lexrank_caps_candidate_sentences() -> None:
+    sentences = [f"Step {index} drill hole number {index % 7}." for index in range(1000)]
+    summarizer = FastLexRankSummarizer(max_sentences=50)
+
+    summary = summarizer.summarize(sentences, 5)
+
+    assert len(summary) == 5
+    assert len(summarizer.rank(sentences[:50])) == 50
@@ -0,0 +1,92 @@
+import time
+
+from Scraper.FrontierService import FrontierService
+
+
+def test_frontier_service_leases_expire_and_quotas_are_global(tmp_path) -> None:
+    db_path = str(tmp_path / "frontier.db")
+    coordinator = FrontierService(db_path, lease_seconds=0.2)
+    assert coordinator.is_empty()
+    coordinator.set_topic_limits({"Craft": 1})
+    coordinator.add(["home"])
+
+    worker_a = FrontierService(db_path, lease_seconds=0.2)
+    worker_b = FrontierService(db_path, lease_seconds=0.2)
+    assert worker_a.lease("a") == [("home", None)]
+    assert worker_b.lease("b") == []
+    assert not worker_b.is_finished()
+
+    worker_a.complete("a", "home", [("craft-1", {"topic_hint": "Craft"}), ("craft-2", {"topic_hint": "Craft"}), "misc"])
+    assert [url for url, _ in worker_a.lease("a", batch_size=1)] == ["craft-1"]
+
+    # Worker a dies holding craft-1: its lease expires and worker b picks it up
+    time.sleep(0.3)
+    assert worker_b.lease("b", batch_size=1) == [("craft-1", {"topic_hint": "Craft"})]
+    assert worker_b.claim_topic("Craft")
+    assert not worker_a.claim_topic("Craft")
+    assert worker_a.claim_topic("Uncounted")
+    worker_b.complete("b", "craft-1")
+
+    # craft-2 is hinted for the full topic, so it is dropped instead of leased
+    assert worker_a.lease("a") == [("misc", None)]
+    worker_a.complete("a", "misc")
+    assert worker_b.is_finished()
+    assert coordinator.stats() == {
+        "pending": 0, "leased": 0, "done": 3, "dropped": 1, "failed": 0, "topic_counts": {"Craft": 1}
+    }
+    for service in (coordinator, worker_a, worker_b):
+        service.close()
+
+
+def test_deferred_urls_are_leased_again_after_their_delay(tmp_path) -> None:
+    frontier = FrontierService(str(tmp_path / "frontier.db"))
+    frontier.add(["home", "other"])
+    assert [url for url, _ in frontier.lease("a", batch_size=1)] == ["home"]
+    frontier.defer("a", "home", 0.2, {"robots_retries": 1})
+    assert frontier.lease("a") == [("other", None)]
+    assert not frontier.is_finished()
+
+    time.sleep(0.3)
+    assert frontier.lease("a") == [("home", {"robots_retries": 1})]
+    frontier.fail("a", "home")
+    frontier.complete("a", "other")
+    assert frontier.is_finished()
+    assert frontier.stats()["failed"] == 1
+    # A resumed crawl queues failed URLs again
+    assert frontier.retry_failed() == 1
+    assert [url for url, _ in frontier.lease("a")] == ["home"]
+    frontier.close()
+
+
+def test_a_page_leased_again_after_its_worker_died_is_counted_once(tmp_path) -> None:
+    db_path = str(tmp_path / "frontier.db")
+    worker_a = FrontierService(db_path, lease_seconds=0.2)
+    worker_b = FrontierService(db_path, lease_seconds=0.2)
+    worker_a.set_topic_limits({"Craft": 5})
+    worker_a.add(["craft-1"])
+    assert worker_a.lease("a") == [("craft-1", None)]
+    assert worker_a.claim_topic("Craft", "craft-1")
+
+    # Worker a dies with craft-1 still in its ingestion pipeline: worker b fetches and claims it again
+    time.sleep(0.3)
+    assert worker_b.lease("b") == [("craft-1", None)]
+    assert worker_b.claim_topic("Craft", "craft-1")
+    worker_b.complete("b", "craft-1")
+    assert worker_b.topic_counts() == {"Craft": 1}
+    worker_a.close()
+    worker_b.close()
+
+
+def test_workers_use_the_lease_seconds_set_by_the_coordinator(tmp_path) -> None:
+    db_path = str(tmp_path / "frontier.db")
+    coordinator = FrontierService(db_path, lease_seconds=0.2)
+    worker = FrontierService(db_path)
+    assert worker.lease_seconds == 0.2
+    coordinator.add(["home"])
+    assert worker.lease("a") == [("home", None)]
+
+    # The worker's lease expires after the coordinator's lease_seconds, not after the default
+    time.sleep(0.3)
+    assert coordinator.lease("b") == [("home", None)]
+    coordinator.close()
+    worker.close()
@@ -0,0 +1,129 @@
+import threading
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+from requests.adapters import HTTPAdapter
+
+from Scraper.HttpTransport import ContentRejected, HttpTransport
+
+PAGES = {
+    "/page": ("text/html; charset=iso-8859-1", "<html><body>Café</body></html>".encode("iso-8859-1"), True),
+    "/meta": ("text/html", '<html><head><meta charset="utf-8"></head>über</html>'.encode("utf-8"), True),
+    "/manual.pdf": ("application/pdf", b"%PDF-1.4" + b"0" * 1000, True),
+    "/huge": ("text/html", b"<html>" + b"a" * 5000, False),
+}
+
+
+class Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        content_type, body, send_length = PAGES[self.path]
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        if send_length:
+            self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def test_read_text_gates_content_type_and_size() -> None:
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    transport = HttpTransport(max_retries=0, max_body_bytes=2000)
+    try:
+        text, size, _ = transport.read_text(transport.get(base_url + "/page", stream=True))
+        assert text == "<html><body>Café</body></html>"
+        assert size == len(PAGES["/page"][1])
+        assert transport.read_text(transport.get(base_url + "/meta", stream=True))[0].endswith("über</html>")
+
+        with pytest.raises(ContentRejected, match="content type"):
+            transport.read_text(transport.get(base_url + "/manual.pdf", stream=True))
+        # No Content-Length: the download is aborted once the cap is exceeded
+        with pytest.raises(ContentRejected, match="exceeds"):
+            transport.read_text(transport.get(base_url + "/huge", stream=True))
+        assert transport.stats()["rejected"] == 2
+    finally:
+        transport.close()
+        server.shutdown()
+
+
+class ScriptedAdapter(HTTPAdapter):
+    def __init__(self, outcomes):
+        super().__init__()
+        self.outcomes = list(outcomes)  # Status codes, (status code, headers) tuples or exceptions, in order
+        self.sent = 0
+
+    def send(self, request, **kwargs):
+        outcome = self.outcomes[self.sent]
+        self.sent += 1
+        if isinstance(outcome, Exception):
+            raise outcome
+        status_code, headers = outcome if isinstance(outcome, tuple) else (outcome, {})
+        response = requests.Response()
+        response.status_code = status_code
+        response.headers.update(headers)
+        response._content = b""
+        response.url = request.url
+        response.request = request
+        return response
+
+
+def scripted_transport(monkeypatch, outcomes, **kwargs):
+    delays = []
+    monkeypatch.setattr("Scraper.HttpTransport.time.sleep", delays.append)
+    transport = HttpTransport(**kwargs)
+    adapter = ScriptedAdapter(outcomes)
+    transport.session.mount("https://", adapter)
+    return transport, adapter, delays
+
+
+def test_get_retries_transient_failures_with_bounded_backoff(monkeypatch) -> None:
+    transport, adapter, delays = scripted_transport(
+        monkeypatch, [requests.exceptions.ConnectionError("reset"), 502, 500, 200],
+        max_retries=3, backoff_factor=1.0, max_backoff=3.0
+    )
+    assert transport.get("https://example.com/").status_code == 200
+    assert adapter.sent == 4
+    assert transport.retry_count == 3
+    # Full jitter below backoff_factor * 2 ** attempt, capped at max_backoff
+    assert [0 <= delay <= bound for delay, bound in zip(delays, [1.0, 2.0, 3.0])] == [True] * 3
+
+    # Client errors are not retried
+    transport, adapter, delays = scripted_transport(monkeypatch, [404])
+    assert transport.get("https://example.com/").status_code == 404
+    assert adapter.sent == 1 and delays == []
+
+
+def test_get_honours_retry_after(monkeypatch) -> None:
+    retry_at = format_datetime(datetime.now(timezone.utc) + timedelta(seconds=30), usegmt=True)
+    transport, adapter, delays = scripted_transport(
+        monkeypatch, [(429, {"Retry-After": "7"}), (503, {"Retry-After": retry_at}),
+                      (503, {"Retry-After": "3600"}), (429, {"Retry-After": "soon"}), 200],
+        max_retries=4, backoff_factor=0.5, max_backoff=60
+    )
+    assert transport.get("https://example.com/").status_code == 200
+    assert delays[0] == 7.0
+    assert 25 < delays[1] <= 30
+    # Retry-After is capped at max_backoff, and an unparsable one falls back to the backoff
+    assert delays[2] == 60
+    assert 0 <= delays[3] <= 0.5 * 2 ** 3
+
+
+def test_get_gives_up_after_max_retries(monkeypatch) -> None:
+    transport, adapter, delays = scripted_transport(monkeypatch, [503, 503, 503], max_retries=2)
+    # The last response is returned with its error status
+    assert transport.get("https://example.com/").status_code == 503
+    assert adapter.sent == 3 and len(delays) == 2
+
+    transport, adapter, delays = scripted_transport(
+        monkeypatch, [requests.exceptions.Timeout("slow")] * 3, max_retries=2
+    )
+    with pytest.raises(requests.exceptions.Timeout):
+        transport.get("https://example.com/")
+    assert adapter.sent == 3 and transport.retry_count == 2
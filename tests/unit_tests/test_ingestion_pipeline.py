@@ -0,0 +1,116 @@
+import logging
+import threading
+
+from Scraper.CrawlStateStore import CrawlStateStore
+from Scraper.IngestionPipeline import IngestionPipeline
+from Scraper.WebCrawler import WebCrawler
+
+SEED = "https://www.instructables.com/sitemap/"
+ARTICLES = ["https://www.instructables.com/shelf/", "https://www.instructables.com/table/"]
+
+
+class FakeExtractor:
+    def __init__(self):
+        self.logger = logging.getLogger("test_ingestion_pipeline")
+        self.stored = []
+        self.discarded = []
+        self.store_gate = threading.Event()
+
+    def extract_document(self, url, html_content):
+        if html_content == "broken":
+            raise ValueError("unparsable")
+        return {"url": url, "content": html_content}
+
+    def deduplicate_document(self, document):
+        return document["content"] != "duplicate"
+
+    def summarize_document(self, document):
+        document["summary"] = document["content"].upper()
+        return document
+
+    def embed_documents(self, documents):
+        for document in documents:
+            document["summary_embedding"] = [float(len(document["summary"]))]
+        return documents
+
+    def store_document(self, document):
+        self.store_gate.wait()
+        self.stored.append(document["url"])
+
+    def discard_document(self, url):
+        self.discarded.append(url)
+
+
+class FixtureCrawler(WebCrawler):
+    def __init__(self, pages, **kwargs):
+        super().__init__(SEED, logger=logging.getLogger("test_ingestion_pipeline"), **kwargs)
+        self.pages = pages
+        self.topic_counts = {"Craft": 0}
+
+    def fetch_page(self, url, wait=True):
+        return self.pages.get(url)
+
+    def hand_off(self, content_extractor, url, stored_url, page, topic=None):
+        # Count every article like LimitedWebCrawler's claim_topic does
+        self.topic_counts["Craft"] += 1
+        super().hand_off(content_extractor, url, stored_url, page, topic="Craft")
+
+
+def test_ingestion_pipeline_runs_every_stage_with_back_pressure() -> None:
+    extractor = FakeExtractor()
+    pipeline = IngestionPipeline(
+        extractor, workers={"extract": 1, "summarize": 1, "embed": 1, "store": 1}, queue_size=1, use_processes=False
+    )
+
+    # The store stage is blocked, so once every queue and worker is full the producer has to wait
+    producer = threading.Thread(
+        target=lambda: [pipeline.extract_content_from_html(f"page-{index}", "text") for index in range(20)]
+    )
+    producer.start()
+    producer.join(timeout=0.5)
+    assert producer.is_alive()
+    assert sum(stage["queued"] for stage in pipeline.stats().values()) <= len(pipeline.stages)
+
+    extractor.store_gate.set()
+    producer.join()
+    pipeline.extract_content_from_html("copy", "duplicate")
+    pipeline.extract_content_from_html("bad", "broken")
+    pipeline.close()
+
+    assert sorted(extractor.stored) == sorted(f"page-{index}" for index in range(20))
+    stats = pipeline.stats()
+    assert stats["extract"]["failed"] == 1
+    assert extractor.discarded == ["bad"]
+    assert stats["deduplicate"]["dropped"] == 1
+    assert stats["store"]["processed"] == 20
+
+
+def test_pages_still_in_the_pipeline_are_not_recorded_as_visited(tmp_path) -> None:
+    state_path = str(tmp_path / "crawl_state.db")
+    links = "".join(f'<a href="{url}">Article</a>' for url in ARTICLES)
+    pages = {SEED: f"<html><body>{links}</body></html>"}
+    pages.update({url: "<html><body>Article</body></html>" for url in ARTICLES})
+    extractor = FakeExtractor()
+    pipeline = IngestionPipeline(
+        extractor, workers={"extract": 1, "summarize": 1, "embed": 1, "store": 1}, use_processes=False
+    )
+    crawler = FixtureCrawler(pages, max_seen_urls=10, state_store=CrawlStateStore(state_path))
+    crawler.restore_state()
+    crawler.crawl_and_process(pipeline)
+
+    # The store stage is stuck: a run killed now must fetch the articles again, and not count them
+    resumed = CrawlStateStore(state_path)
+    visited, pending, topic_counts = resumed.load()
+    assert visited == {SEED}
+    assert sorted(url for url, _ in pending) == ARTICLES
+    assert topic_counts == {"Craft": 0}
+
+    extractor.store_gate.set()
+    pipeline.close()
+    crawler.record_ingested()
+    visited, pending, topic_counts = resumed.load()
+    assert visited == {SEED, *ARTICLES}
+    assert pending == []
+    assert topic_counts == {"Craft": 2}
+    resumed.close()
+    crawler.state_store.close()
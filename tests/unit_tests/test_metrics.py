@@ -0,0 +1,49 @@
+import json
+import urllib.request
+
+from Scraper.Metrics import MetricsRegistry
+
+
+def test_metrics_registry_exports_prometheus_text_and_snapshots(tmp_path) -> None:
+    registry = MetricsRegistry()
+    fetches = registry.histogram("fetch_seconds", "Fetch duration", ("status",), buckets=(0.1, 1.0))
+    fetches.observe(0.05, status=200)
+    fetches.observe(0.5, status=200)
+    fetches.observe(5.0, status="error")
+    registry.counter("fetch_bytes_total", "Fetched bytes").inc(2048)
+    registry.gauge("frontier_size", "Frontier size").set(7)
+    assert registry.histogram("fetch_seconds", "Fetch duration", ("status",)) is fetches
+
+    text = registry.prometheus_text()
+    assert "# TYPE fetch_seconds histogram" in text
+    assert 'fetch_seconds_bucket{status="200",le="0.1"} 1' in text
+    assert 'fetch_seconds_bucket{status="200",le="+Inf"} 2' in text
+    assert 'fetch_seconds_count{status="error"} 1' in text
+    assert "fetch_bytes_total 2048" in text
+    assert "frontier_size 7" in text
+
+    snapshot_path = str(tmp_path / "metrics.json")
+    stop = registry.start_snapshot_writer(snapshot_path, interval=60)
+    stop()
+    with open(snapshot_path) as snapshot_file:
+        metrics = json.load(snapshot_file)["metrics"]
+    assert {"status": "200", "count": 2, "sum": 0.55, "mean": 0.275, "p50": 0.1, "p99": 1.0} in metrics["fetch_seconds"]
+
+    server = registry.start_http_server(0, host="127.0.0.1")
+    try:
+        with urllib.request.urlopen(f"http://127.0.0.1:{server.server_address[1]}/metrics") as response:
+            assert response.read().decode("utf-8") == registry.prometheus_text()
+    finally:
+        server.shutdown()
+
+
+def test_histograms_drained_from_another_registry_are_merged() -> None:
+    parent = MetricsRegistry()
+    child = MetricsRegistry()
+    parent.histogram("parse_seconds", "Parse duration").observe(0.2)
+    child.histogram("parse_seconds", "Parse duration").observe(0.3)
+
+    parent.merge_histograms(child.drain_histograms())
+
+    assert parent.snapshot()["parse_seconds"][0]["count"] == 2
+    assert child.snapshot()["parse_seconds"] == []
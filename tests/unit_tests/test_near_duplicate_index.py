@@ -0,0 +1,48 @@
+from Scraper.NearDuplicateIndex import NearDuplicateIndex
+
+STEPS = [
+    "Cut two pieces of plywood to size and sand the edges smooth.",
+    "Drill pilot holes along the sides of the frame.",
+    "Glue and screw the pieces together to form the shelf.",
+    "Apply two coats of varnish and let it cure overnight.",
+    "Mount the shelf on the wall with heavy duty anchors.",
+]
+ARTICLE = " ".join(f"Step {number}: {step} Check that board {number} is square." for number in range(1, 9) for step in STEPS)
+
+
+def test_near_duplicates_are_found_and_persisted(tmp_path) -> None:
+    db_path = str(tmp_path / "near_duplicates.db")
+    index = NearDuplicateIndex(db_path)
+    fingerprint = index.fingerprint(ARTICLE)
+    assert index.find_duplicate(fingerprint) is None
+    index.add("https://example.com/shelf/", fingerprint, "doc-1")
+
+    # The page itself is not its own duplicate, an unrelated page is not a duplicate either
+    assert index.find_duplicate(fingerprint, exclude_url="https://example.com/shelf/") is None
+    unrelated = index.fingerprint("Whisk the eggs with sugar, fold in the flour and bake the cake for forty minutes.")
+    assert index.find_duplicate(unrelated) is None
+    index.close()
+
+    reopened = NearDuplicateIndex(db_path)
+    mirror = reopened.fingerprint(ARTICLE.replace("overnight", "over night", 1) + " Enjoy!")
+    assert reopened.find_duplicate(mirror) == ("https://example.com/shelf/", "doc-1")
+    assert reopened.stats() == {"indexed": 1, "duplicates_found": 1}
+    reopened.close()
+
+
+def test_workers_sharing_a_database_see_each_others_fingerprints(tmp_path) -> None:
+    db_path = str(tmp_path / "near_duplicates.db")
+    worker_a = NearDuplicateIndex(db_path)
+    worker_b = NearDuplicateIndex(db_path)
+    fingerprint = worker_a.fingerprint(ARTICLE)
+
+    # Reservations stay in memory, so the other worker does not refer to a page that is not stored yet
+    worker_a.reserve("https://example.com/shelf/", fingerprint)
+    assert worker_b.find_duplicate(fingerprint) is None
+
+    worker_a.add("https://example.com/shelf/", fingerprint, "doc-1")
+    assert worker_b.find_duplicate(fingerprint) == ("https://example.com/shelf/", "doc-1")
+    worker_a.add("https://example.com/shelf/", fingerprint, "doc-2")
+    assert worker_b.find_duplicate(fingerprint) == ("https://example.com/shelf/", "doc-2")
+    worker_a.close()
+    worker_b.close()
@@ -0,0 +1,26 @@
+import gzip
+
+from Scraper.PageArchive import PageArchive
+
+
+def test_page_archive_replays_latest_version_of_each_page(tmp_path) -> None:
+    archive = PageArchive(str(tmp_path / "archive"), codec="gzip")
+    assert archive.append("https://example.com/a/", "<html>a v1</html>")
+    assert archive.append("https://example.com/b/", "<html>b é\r\n\r\nbody</html>", "text/html; charset=utf-8")
+    assert not archive.append("https://example.com/a/", "<html>a v1</html>")
+    assert archive.append("https://example.com/a/", "<html>a v2</html>")
+    archive.close()
+
+    reopened = PageArchive(str(tmp_path / "archive"), codec="gzip")
+    assert len(reopened) == 2
+    assert reopened.get("https://example.com/a/") == "<html>a v2</html>"
+    assert reopened.get("https://example.com/missing/") is None
+    assert list(reopened.iter_pages()) == [
+        ("https://example.com/b/", "<html>b é\r\n\r\nbody</html>"),
+        ("https://example.com/a/", "<html>a v2</html>"),
+    ]
+    reopened.close()
+
+    # The data file is a plain multi-member gzip stream of WARC-like records
+    with gzip.open(tmp_path / "archive" / "pages.archive", "rb") as data_file:
+        assert data_file.read().count(b"WARC-Type: response") == 3
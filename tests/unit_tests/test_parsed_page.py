@@ -0,0 +1,48 @@
+import logging
+
+from Scraper.ParsedPage import PARSE_SECONDS, ParsedPage
+from Scraper.WebCrawler import WebCrawler
+
+PAGE_HTML = """<html><head>
+<link rel="canonical" href=" /shelf/ ">
+</head><body>
+<h1 class="header-title main">Floating Shelf</h1>
+<div class="step-body">Cut the board.</div>
+<div class="step-body extra">Sand the edges. <a href="/tools/sander/">Sander</a></div>
+<div class="step-bodyless">Not a step.</div>
+<a href="https://www.instructables.com/table/">Table</a>
+<a href="https://example.com/elsewhere/">Elsewhere</a>
+</body></html>"""
+
+
+def parse_count():
+    return sum(sample["count"] for sample in PARSE_SECONDS.snapshot())
+
+
+def test_page_is_parsed_once_and_queried_by_class() -> None:
+    page = ParsedPage("https://www.instructables.com/shelf/?utm_source=feed", PAGE_HTML)
+    parses = parse_count()
+
+    assert page.find_text("h1", "header-title") == "Floating Shelf"
+    # Classes match whole tokens only
+    steps = page.find_all("div", "step-body")
+    assert [step.text_content().strip() for step in steps] == ["Cut the board.", "Sand the edges. Sander"]
+    assert page.find("div", "missing") is None
+    assert page.hrefs(steps[1]) == ["/tools/sander/"]
+    assert page.canonical_url() == "https://www.instructables.com/shelf/"
+    assert page.find("h1") is page.find("h1", "main")
+    assert parse_count() == parses + 1
+
+
+def test_links_are_extracted_from_the_shared_tree() -> None:
+    crawler = WebCrawler(logger=logging.getLogger("test_parsed_page"), homepage="https://www.instructables.com/sitemap/")
+    page = ParsedPage("https://www.instructables.com/shelf/", PAGE_HTML)
+    assert crawler.extract_internal_links(page.url, page) == [
+        "https://www.instructables.com/tools/sander/",
+        "https://www.instructables.com/table/",
+    ]
+    # Raw HTML is parsed on the fly
+    assert crawler.extract_internal_links(page.url, PAGE_HTML) == crawler.extract_internal_links(page.url, page)
+
+    assert ParsedPage("https://example.com/", "").find("a") is None
+    assert ParsedPage("https://example.com/", '<?xml version="1.0" encoding="utf-8"?><html><a href="/x">x</a></html>').hrefs() == ["/x"]
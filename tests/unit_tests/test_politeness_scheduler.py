@@ -0,0 +1,131 @@
+import threading
+import time
+
+import pytest
+import requests
+
+from Scraper.PolitenessScheduler import RETRY_LATER, PolitenessScheduler
+
+ROBOTS_TXT = """User-agent: *
+Disallow: /private/
+Crawl-delay: 2
+"""
+
+
+class FakeResponse:
+    def __init__(self, status_code, text=""):
+        self.status_code = status_code
+        self.text = text
+
+
+class FakeTransport:
+    def __init__(self, responses):
+        self.responses = responses  # robots.txt URL -> FakeResponse, exception or callable
+        self.requested = []
+
+    def get(self, url):
+        self.requested.append(url)
+        response = self.responses[url]
+        if callable(response):
+            response = response()
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+
+def test_robots_rules_and_crawl_delay_cap_the_domain() -> None:
+    transport = FakeTransport({"https://example.com/robots.txt": FakeResponse(200, ROBOTS_TXT)})
+    scheduler = PolitenessScheduler(transport, initial_rate=2.0, max_rate=10.0)
+
+    assert scheduler.can_fetch("https://example.com/page/")
+    assert not scheduler.can_fetch("https://example.com/private/page/")
+    assert scheduler.reserve("https://example.com/private/page/") is None
+    # Crawl-delay: 2 caps the domain at 0.5 requests/s, below the initial rate
+    assert scheduler.rates()["example.com"]["max_rate"] == 0.5
+    assert scheduler.rates()["example.com"]["rate"] == 0.5
+    # robots.txt is cached
+    scheduler.can_fetch("https://example.com/other/")
+    assert transport.requested == ["https://example.com/robots.txt"]
+
+
+@pytest.mark.parametrize("response, allowed", [
+    (FakeResponse(404), True),
+    (FakeResponse(403), False),
+    (FakeResponse(500), False),
+    (FakeResponse(503), False),
+    (requests.exceptions.ConnectionError("refused"), False),
+])
+def test_unavailable_robots_allows_all_and_unreachable_disallows_all(response, allowed) -> None:
+    scheduler = PolitenessScheduler(FakeTransport({"https://example.com/robots.txt": response}))
+    assert scheduler.can_fetch("https://example.com/page/") is allowed
+
+
+def test_unreachable_robots_asks_to_retry_later_until_it_is_fetched() -> None:
+    responses = {"https://example.com/robots.txt": FakeResponse(503)}
+    scheduler = PolitenessScheduler(FakeTransport(responses), unreachable_retry=0)
+    # Not a final answer, unlike a Disallow rule or a 403
+    assert scheduler.reserve("https://example.com/page/") is RETRY_LATER
+    assert scheduler.wait("https://example.com/page/") is RETRY_LATER
+
+    responses["https://example.com/robots.txt"] = FakeResponse(200, ROBOTS_TXT)
+    assert scheduler.wait("https://example.com/page/") is True
+    assert scheduler.reserve("https://example.com/private/page/") is None
+
+
+def test_request_rate_with_zero_seconds_is_ignored() -> None:
+    robots_txt = "User-agent: *\nRequest-rate: 1/0\n"
+    scheduler = PolitenessScheduler(FakeTransport({"https://example.com/robots.txt": FakeResponse(200, robots_txt)}),
+                                    max_rate=10.0)
+    assert scheduler.can_fetch("https://example.com/page/")
+    assert scheduler.rates()["example.com"]["max_rate"] == 10.0
+
+
+def test_unreachable_robots_keeps_the_previous_rules_and_is_retried_sooner() -> None:
+    responses = {"https://example.com/robots.txt": FakeResponse(200, ROBOTS_TXT)}
+    transport = FakeTransport(responses)
+    scheduler = PolitenessScheduler(transport, robots_ttl=0, unreachable_retry=3600)
+    assert scheduler.can_fetch("https://example.com/page/")
+
+    responses["https://example.com/robots.txt"] = FakeResponse(500)
+    assert scheduler.can_fetch("https://example.com/page/")
+    assert not scheduler.can_fetch("https://example.com/private/page/")
+    # The unreachable answer is kept for unreachable_retry seconds
+    scheduler.can_fetch("https://example.com/page/")
+    assert len(transport.requested) == 2
+
+
+def test_rate_backs_off_on_throttling_and_grows_while_fast() -> None:
+    transport = FakeTransport({"https://example.com/robots.txt": FakeResponse(404)})
+    scheduler = PolitenessScheduler(transport, initial_rate=2.0, min_rate=0.1, max_rate=10.0, target_latency=1.0)
+    url = "https://example.com/page/"
+
+    scheduler.record(url, 200, 0.1)
+    assert scheduler.rates()["example.com"]["rate"] == 2.2
+    scheduler.record(url, 429, 0.1)
+    assert scheduler.rates()["example.com"]["rate"] == 1.1
+    scheduler.record(url, None, 0.1)
+    assert scheduler.rates()["example.com"]["rate"] == 0.55
+    # Slow responses shrink the rate more gently, down to the floor
+    for _ in range(60):
+        scheduler.record(url, 200, 10.0)
+    assert scheduler.rates()["example.com"]["rate"] == 0.1
+    assert scheduler.rates()["example.com"]["throttled"] == 2
+
+
+def test_slow_robots_fetch_only_delays_its_own_domain() -> None:
+    release = threading.Event()
+    transport = FakeTransport({
+        "https://slow.example.com/robots.txt": lambda: release.wait(5) and FakeResponse(404),
+        "https://fast.example.com/robots.txt": FakeResponse(404),
+    })
+    scheduler = PolitenessScheduler(transport)
+    slow = threading.Thread(target=scheduler.can_fetch, args=("https://slow.example.com/page/",))
+    slow.start()
+    try:
+        while "https://slow.example.com/robots.txt" not in transport.requested:
+            time.sleep(0.01)
+        assert scheduler.wait("https://fast.example.com/page/")
+        assert slow.is_alive()
+    finally:
+        release.set()
+        slow.join()
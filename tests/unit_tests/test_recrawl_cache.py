@@ -0,0 +1,48 @@
+from Scraper.RecrawlCache import RecrawlCache
+
+URL = "https://example.com/a/"
+
+
+def test_recrawl_cache_answers_conditional_and_unchanged_checks(tmp_path) -> None:
+    cache = RecrawlCache(str(tmp_path / "recrawl.db"))
+    assert cache.conditional_headers(URL) == {}
+    assert not cache.is_body_unchanged(URL, "body")
+
+    cache.record_fetch(URL, '"v1"', "Mon, 01 Jan 2024 00:00:00 GMT", "body", ["https://example.com/b/"],
+                       topic="Craft", lastmod="2024-01-01")
+    assert cache.conditional_headers(URL) == {
+        "If-None-Match": '"v1"', "If-Modified-Since": "Mon, 01 Jan 2024 00:00:00 GMT"
+    }
+    assert cache.is_body_unchanged(URL, "body")
+    assert not cache.is_body_unchanged(URL, "changed body")
+    assert cache.is_lastmod_unchanged(URL, "2024-01-01")
+    assert not cache.is_lastmod_unchanged(URL, "2024-02-01")
+    assert cache.cached_page(URL) == (["https://example.com/b/"], "Craft")
+
+    # Pages that only have a content hash (e.g. replayed from the archive) get no conditional headers
+    cache.record_content_hash("https://example.com/c/", "hash")
+    assert cache.conditional_headers("https://example.com/c/") == {}
+    assert cache.is_content_unchanged("https://example.com/c/", "hash")
+    assert cache.stats() == {
+        "not_modified": 0, "unchanged_bodies": 1, "unchanged_contents": 1, "unchanged_lastmods": 1
+    }
+    cache.close()
+
+
+def test_recrawl_cache_holds_back_fetches_until_the_page_is_stored(tmp_path) -> None:
+    cache = RecrawlCache(str(tmp_path / "recrawl.db"))
+    canonical_url = "https://example.com/canonical/"
+    cache.record_fetch(URL, '"v1"', None, "body", [], topic="Craft", stored_url=canonical_url)
+    assert cache.get(URL) is None
+    assert not cache.is_body_unchanged(URL, "body")
+
+    cache.record_content_hash(canonical_url, "hash")
+    assert cache.is_body_unchanged(URL, "body")
+    assert cache.get(canonical_url)["content_hash"] == "hash"
+
+    # A page whose ingestion failed is fetched and processed again on the next crawl
+    cache.record_fetch("https://example.com/failed/", None, None, "body", [], stored_url="https://example.com/failed/")
+    cache.discard_pending("https://example.com/failed/")
+    cache.record_content_hash("https://example.com/failed/", "hash")
+    assert not cache.is_body_unchanged("https://example.com/failed/", "body")
+    cache.close()
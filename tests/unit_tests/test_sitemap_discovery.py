@@ -0,0 +1,81 @@
+import gzip
+import io
+
+import requests
+
+from Scraper.SitemapDiscovery import SitemapDiscovery
+
+SITEMAP_INDEX = b"""<?xml version="1.0" encoding="UTF-8"?>
+<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">
+  <sitemap><loc>https://example.com/sitemap-pages.xml.gz</loc></sitemap>
+  <sitemap><loc>https://example.com/sitemap-nested.xml</loc></sitemap>
+</sitemapindex>"""
+PAGES_SITEMAP = b"""<?xml version="1.0" encoding="UTF-8"?>
+<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">
+  <url><loc>https://example.com/shelf/</loc><lastmod>2024-05-01</lastmod></url>
+  <url><loc> https://example.com/table/ </loc></url>
+  <url><loc>https://example.com/tag/wood/</loc><lastmod>2024-05-02</lastmod></url>
+</urlset>"""
+NESTED_INDEX = b"""<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">
+  <sitemap><loc>https://example.com/sitemap-deep.xml</loc></sitemap>
+</sitemapindex>"""
+DEEP_SITEMAP = b"""<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">
+  <url><loc>https://example.com/chair/</loc></url>
+</urlset>"""
+
+
+class FakeResponse:
+    def __init__(self, status_code, body):
+        self.status_code = status_code
+        self.raw = io.BytesIO(body)
+        self.closed = False
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.exceptions.HTTPError(f"{self.status_code} error")
+
+    def close(self):
+        self.closed = True
+
+
+class FakeTransport:
+    def __init__(self, sitemaps):
+        self.sitemaps = sitemaps  # Sitemap URL -> (status code, body)
+        self.requested = []
+
+    def get(self, url, stream=False):
+        self.requested.append(url)
+        return FakeResponse(*self.sitemaps[url])
+
+
+def test_sitemap_index_is_followed_and_gzip_unpacked() -> None:
+    transport = FakeTransport({
+        "https://example.com/sitemap.xml": (200, SITEMAP_INDEX),
+        "https://example.com/sitemap-pages.xml.gz": (200, gzip.compress(PAGES_SITEMAP)),
+        "https://example.com/sitemap-nested.xml": (200, NESTED_INDEX),
+        "https://example.com/sitemap-deep.xml": (200, DEEP_SITEMAP),
+    })
+    discovery = SitemapDiscovery(transport, url_filter=lambda url: "/tag/" not in url)
+
+    urls = discovery.iter_urls("https://example.com/sitemap.xml")
+    # URLs are yielded lazily, before the remaining sitemaps are fetched
+    assert next(urls) == ("https://example.com/shelf/", "2024-05-01")
+    assert "https://example.com/sitemap-nested.xml" not in transport.requested
+    assert list(urls) == [("https://example.com/table/", None), ("https://example.com/chair/", None)]
+    assert len(transport.requested) == 4
+
+
+def test_broken_and_too_deep_sitemaps_are_skipped() -> None:
+    transport = FakeTransport({
+        "https://example.com/sitemap.xml": (200, SITEMAP_INDEX),
+        "https://example.com/sitemap-pages.xml.gz": (200, PAGES_SITEMAP[:150]),
+        "https://example.com/sitemap-nested.xml": (404, b""),
+        "https://example.com/sitemap-deep.xml": (200, DEEP_SITEMAP),
+    })
+    # Works without a logger
+    assert list(SitemapDiscovery(transport).iter_urls("https://example.com/sitemap.xml")) == []
+
+    transport.sitemaps["https://example.com/sitemap-nested.xml"] = (200, NESTED_INDEX)
+    discovery = SitemapDiscovery(transport, max_depth=1)
+    assert list(discovery.iter_urls("https://example.com/sitemap.xml")) == []
+    assert "https://example.com/sitemap-deep.xml" not in transport.requested
@@ -0,0 +1,16 @@
+from Scraper.TokenBucket import TokenBucket
+
+
+def test_token_bucket_queues_reservations_beyond_capacity() -> None:
+    bucket = TokenBucket(rate=10, capacity=2)
+    assert bucket.reserve() == 0
+    assert bucket.reserve() == 0
+
+    # Each further reservation waits one more refill interval (0.1s at 10 tokens/s)
+    first_delay = bucket.reserve()
+    second_delay = bucket.reserve()
+    assert 0.05 < first_delay <= 0.1
+    assert 0.15 < second_delay <= 0.2
+
+    bucket.set_rate(1)
+    assert bucket.reserve() > 2
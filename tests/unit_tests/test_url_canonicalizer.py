@@ -0,0 +1,27 @@
+from Scraper.UrlCanonicalizer import UrlCanonicalizer
+
+
+def test_canonicalizer_collapses_url_variants() -> None:
+    canonicalizer = UrlCanonicalizer()
+    variants = [
+        "https://www.instructables.com/id/foo/",
+        "https://www.instructables.com/id/foo",
+        "https://www.instructables.com/id/foo/?utm_source=x&fbclid=abc",
+        "https://www.instructables.com/id/foo/#step2",
+        "HTTPS://WWW.Instructables.com:443/id/foo",
+    ]
+    assert {canonicalizer.canonicalize(url) for url in variants} == {"https://www.instructables.com/id/foo/"}
+
+    assert canonicalizer.canonicalize("https://example.com/search?q=a&page=2&utm_medium=mail") == \
+        "https://example.com/search/?page=2&q=a"
+    assert canonicalizer.canonicalize("https://example.com/image.png") == "https://example.com/image.png"
+    assert canonicalizer.canonicalize("mailto:someone@example.com") == "mailto:someone@example.com"
+    assert UrlCanonicalizer(trailing_slash=False).canonicalize("http://example.com/a/") == "http://example.com/a"
+
+
+def test_canonicalizer_follows_recorded_aliases() -> None:
+    canonicalizer = UrlCanonicalizer()
+    canonical = canonicalizer.record_alias("https://www.instructables.com/id/foo", "https://www.instructables.com/Foo/")
+    assert canonical == "https://www.instructables.com/Foo/"
+    assert canonicalizer.canonicalize("https://www.instructables.com/id/foo/?utm_source=x") == canonical
+    assert canonicalizer.stats() == {"aliases": 1}
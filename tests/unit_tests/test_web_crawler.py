@@ -0,0 +1,222 @@
+import logging
+import threading
+import time
+
+from Scraper.CrawlStateStore import CrawlStateStore
+from Scraper.PolitenessScheduler import PolitenessScheduler
+from Scraper.WebCrawler import WebCrawler
+
+# Seed and blacklist of Scraper/main.py
+HOMEPAGE = "https://www.instructables.com/sitemap"
+BLACKLIST = [
+    "https://www.instructables.com/",
+    "https://www.instructables.com/projects/",
+    "https://www.instructables.com/contest/",
+    "https://www.instructables.com/teachers/",
+    "https://www.instructables.com/contact/",
+    "https://www.instructables.com/circuits/",
+    "https://www.instructables.com/workshop/",
+    "https://www.instructables.com/craft/",
+    "https://www.instructables.com/cooking/",
+    "https://www.instructables.com/living/",
+    "https://www.instructables.com/outside/",
+    "https://www.instructables.com/about/",
+    "https://www.instructables.com/create/",
+    "https://www.instructables.com/sitemap/",
+    "https://www.instructables.com/how-to-write-a-great-instructable/",
+]
+SITEMAP_HTML = """<html><body>
+<div class="group-section"><ul class="sitemap-listing">
+<li><a href="/circuits/">Circuits</a></li>
+<li><a href="/sitemap/">Sitemap</a></li>
+<li><a href="/circuits/arduino/projects/">Arduino</a></li>
+</ul></div>
+</body></html>"""
+
+
+class FixtureCrawler(WebCrawler):
+    def __init__(self, pages, **kwargs):
+        super().__init__(logger=logging.getLogger("test_web_crawler"), **kwargs)
+        self.pages = pages
+        self.fetched = []
+
+    def fetch_page(self, url, wait=True):
+        self.fetched.append(url)
+        return self.pages.get(url)
+
+
+class SlowFixtureCrawler(FixtureCrawler):
+    def __init__(self, pages, **kwargs):
+        super().__init__(pages, **kwargs)
+        self.lock = threading.Lock()
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    def fetch_page(self, url, wait=True):
+        with self.lock:
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        time.sleep(0.05)
+        with self.lock:
+            self.in_flight -= 1
+        return super().fetch_page(url, wait)
+
+
+class GuardedSet(set):
+    def __init__(self, lock, items=()):
+        super().__init__(items)
+        self.lock = lock
+        self.unguarded_changes = 0
+
+    def add(self, item):
+        self.unguarded_changes += not self.lock._is_owned()
+        super().add(item)
+
+    def discard(self, item):
+        self.unguarded_changes += not self.lock._is_owned()
+        super().discard(item)
+
+
+class FakeScheduler:
+    def __init__(self, disallowed=()):
+        self.disallowed = set(disallowed)
+
+    def reserve(self, url):
+        return None if url in self.disallowed else 0
+
+
+class FakeResponse:
+    def __init__(self, status_code, text=""):
+        self.status_code = status_code
+        self.text = text
+        self.headers = {}
+
+    def raise_for_status(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class SiteTransport:
+    user_agent = "*"
+
+    def __init__(self, robots_statuses, pages):
+        self.robots_statuses = robots_statuses  # Status codes answered for robots.txt, in order (the last repeats)
+        self.pages = pages
+        self.requested = []
+
+    def get(self, url, headers=None, stream=False):
+        self.requested.append(url)
+        if url.endswith("/robots.txt"):
+            status_code = self.robots_statuses.pop(0) if len(self.robots_statuses) > 1 else self.robots_statuses[0]
+            return FakeResponse(status_code)
+        return FakeResponse(200, self.pages[url])
+
+    def read_text(self, response):
+        return response.text, len(response.text), None
+
+
+class FakeExtractor:
+    def __init__(self):
+        self.extracted = []
+        self.threads = set()
+
+    def extract_content_from_html(self, url, page, on_done=None):
+        self.extracted.append(url)
+        self.threads.add(threading.current_thread().name)
+        if on_done:
+            on_done()
+
+
+def test_seed_is_crawled_even_if_blacklist_holds_its_canonical_form() -> None:
+    pages = {
+        "https://www.instructables.com/sitemap/": SITEMAP_HTML,
+        "https://www.instructables.com/circuits/arduino/projects/": "<html><body>Arduino</body></html>",
+    }
+    crawler = FixtureCrawler(pages, homepage=HOMEPAGE, max_seen_urls=100, blacklist=BLACKLIST)
+    extractor = FakeExtractor()
+    crawler.crawl_and_process(extractor)
+
+    # The seed is fetched once; blacklisted links on it (including the seed itself) are not followed
+    assert crawler.fetched == [
+        "https://www.instructables.com/sitemap/",
+        "https://www.instructables.com/circuits/arduino/projects/",
+    ]
+    assert extractor.extracted == ["https://www.instructables.com/circuits/arduino/projects/"]
+
+
+def test_async_crawl_fetches_concurrently_and_processes_serially() -> None:
+    projects = [f"https://www.instructables.com/project-{number}/" for number in range(8)]
+    links = "".join(f'<li><a href="{url}">Project</a></li>' for url in projects)
+    pages = {"https://www.instructables.com/sitemap/":
+             f'<div class="group-section"><ul class="sitemap-listing">{links}</ul></div>'}
+    pages.update({url: "<html><body>Project</body></html>" for url in projects[:-1]})
+    # The last project fails to fetch, the disallowed one is never fetched
+    disallowed = "https://www.instructables.com/project-0/"
+    crawler = SlowFixtureCrawler(pages, homepage=HOMEPAGE, max_seen_urls=100,
+                                 scheduler=FakeScheduler([disallowed]))
+    extractor = FakeExtractor()
+
+    visited = crawler.crawl_and_process_async(extractor, concurrency=4, per_host_concurrency=3,
+                                              random_jump_frequency=None)
+    assert visited == {"https://www.instructables.com/sitemap/", *projects}
+    assert sorted(crawler.fetched) == sorted(["https://www.instructables.com/sitemap/", *projects[1:]])
+    assert sorted(extractor.extracted) == projects[1:-1]
+    # Fetches overlap up to the per-host cap, while extraction runs on a single thread
+    assert crawler.max_in_flight == 3
+    assert len(extractor.threads) == 1
+
+
+def test_async_crawl_changes_the_crawl_state_only_under_the_state_lock() -> None:
+    projects = [f"https://www.instructables.com/project-{number}/" for number in range(6)]
+    links = "".join(f'<li><a href="{url}">Project</a></li>' for url in projects)
+    pages = {"https://www.instructables.com/sitemap/":
+             f'<div class="group-section"><ul class="sitemap-listing">{links}</ul></div>'}
+    # Each project declares another canonical URL, which the processing thread marks as visited
+    pages.update({
+        url: f'<html><head><link rel="canonical" href="{url}canonical/"></head><body>Project</body></html>'
+        for url in projects
+    })
+    crawler = SlowFixtureCrawler(pages, homepage=HOMEPAGE, max_seen_urls=100, scheduler=FakeScheduler())
+    crawler.visited_links = GuardedSet(crawler._state_lock, crawler.visited_links)
+    extractor = FakeExtractor()
+    extracting_under_lock = []
+    extract_content_from_html = extractor.extract_content_from_html
+    extractor.extract_content_from_html = lambda *args, **kwargs: (
+        extracting_under_lock.append(crawler._state_lock._is_owned()), extract_content_from_html(*args, **kwargs)
+    )
+
+    crawler.crawl_and_process_async(extractor, concurrency=4, per_host_concurrency=3, random_jump_frequency=None)
+    assert sorted(extractor.extracted) == [f"{url}canonical/" for url in projects]
+    assert {f"{url}canonical/" for url in projects} <= crawler.visited_links
+    assert crawler.visited_links.unguarded_changes == 0
+    # The extractor runs outside the lock, so the event loop keeps dispatching fetches meanwhile
+    assert extracting_under_lock == [False] * len(projects)
+
+
+def test_pages_behind_an_unreachable_robots_txt_are_retried_not_dropped() -> None:
+    seed = "https://www.instructables.com/sitemap/"
+    transport = SiteTransport([503, 404], {seed: "<html><body>Sitemap</body></html>"})
+    scheduler = PolitenessScheduler(transport, unreachable_retry=0.05)
+    crawler = WebCrawler(seed, max_seen_urls=10, logger=logging.getLogger("test_web_crawler"),
+                         transport=transport, scheduler=scheduler)
+
+    assert crawler.crawl_and_process(FakeExtractor()) == {seed}
+    assert transport.requested == ["https://www.instructables.com/robots.txt"] * 2 + [seed]
+
+
+def test_pages_given_up_on_stay_pending_for_the_next_run(tmp_path) -> None:
+    seed = "https://www.instructables.com/sitemap/"
+    state_store = CrawlStateStore(str(tmp_path / "crawl_state.db"))
+    transport = SiteTransport([503], {})
+    crawler = WebCrawler(seed, max_seen_urls=10, logger=logging.getLogger("test_web_crawler"), state_store=state_store,
+                         transport=transport, scheduler=PolitenessScheduler(transport, unreachable_retry=0.01))
+    crawler.restore_state()
+
+    assert crawler.crawl_and_process(FakeExtractor()) == set()
+    # Fetched again after every deferral, then given up without being recorded as visited
+    assert len(transport.requested) == 4
+    visited, pending, _ = state_store.load()
+    assert visited == set() and pending == [(seed, None)]
+    state_store.close()